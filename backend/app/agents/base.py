@@ -24,10 +24,20 @@ class BaseAgent:
 
     name: str = "base"
 
-    def __init__(self, db=None, llm=None, memory=None):
+    def __init__(self, db=None, llm=None, memory=None, snapshot=None):
         self.db = db
         self.llm = llm
         self.memory = memory
+        # services.snapshot.UserFinancialSnapshot shared with the route, if any
+        self.snapshot = snapshot
+
+    def snapshot_for(self, user_id: str):
+        """The request's snapshot for `user_id`, or a fresh one over `self.db`."""
+        if self.snapshot is not None and self.snapshot.user_id == user_id:
+            return self.snapshot
+        from ..services.snapshot import UserFinancialSnapshot
+        self.snapshot = UserFinancialSnapshot(self.db, user_id)
+        return self.snapshot
 
     async def run(self, payload: Dict[str, Any], user_id: Optional[str] = None) -> AgentResponse:
         raise NotImplementedError
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from typing import Any, Dict
 from .base import BaseAgent, AgentResponse
-from ..utils.ids import to_obj_id
 
 
 class BudgetOptimizationAgent(BaseAgent):
@@ -38,7 +37,7 @@ class BudgetOptimizationAgent(BaseAgent):
             cat_shares = {k: max(v / cat_total, 0.0) for k, v in cat_map.items()}
 
             # Risk-aware savings share (load user profile)
-            user = await db["users"].find_one({"_id": to_obj_id(uid)})
+            user = await self.snapshot_for(uid).user()
         except Exception:
             user = None
 
@@ -11,8 +11,6 @@ class ChatAgent(BaseAgent):
         user = (payload or {}).get("q") or (payload or {}).get("text") or ""
         if not user:
             return AgentResponse.fail("Missing message")
-        # Use LLM for a friendly reply
-        ans = await self.llm.longcat_chat("You are a friendly finance assistant.", user)
-        if not ans.get("ok"):
-            ans = await self.llm.gemini_chat("You are a friendly finance assistant.", user)
+        # Use LLM for a friendly reply (Longcat first, Gemini hedged behind it)
+        ans = await self.llm.hedged_chat("You are a friendly finance assistant.", user, order=("longcat", "gemini"))
         return AgentResponse.ok(reply=ans.get("output"))
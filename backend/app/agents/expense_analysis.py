@@ -2,10 +2,21 @@ from __future__ import annotations
 
 from typing import Any, Dict
 from .base import BaseAgent, AgentResponse
+from ..services import forecasting
 
 
 class ExpenseAnalysisAgent(BaseAgent):
     name = "expense-analysis"
 
     async def run(self, payload: Dict[str, Any], user_id: str | None = None) -> AgentResponse:
-        return AgentResponse.ok(insight="Spending increased in food category", recommendation="Cut delivery by 15%")
+        if not user_id or self.db is None:
+            return AgentResponse.fail("No user context")
+        fc = await forecasting.forecast_user(self.db, user_id, payload.get("month"))
+        cats = fc["categories"]
+        if not cats:
+            return AgentResponse.ok(forecast=fc, insight="Not enough expense history to forecast yet", recommendation="Keep logging expenses")
+        top = max(cats, key=lambda c: cats[c]["prediction"])
+        share = cats[top]["prediction"] / fc["total"]["prediction"] if fc["total"]["prediction"] else 0.0
+        insight = f"Expected spend for {fc['month']}: ₹{fc['total']['prediction']:.0f}, led by {top} (₹{cats[top]['prediction']:.0f})"
+        recommendation = f"Cut {top} by 15% to save about ₹{cats[top]['prediction'] * 0.15:.0f}" if share >= 0.2 else "Spending is well spread; keep it steady"
+        return AgentResponse.ok(forecast=fc, insight=insight, recommendation=recommendation)
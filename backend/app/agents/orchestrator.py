@@ -20,11 +20,6 @@ class OrchestratorAgent(BaseAgent):
         if not query:
             return AgentResponse.fail("Missing query")
 
-        # Intent detection via LLMs (prefer Gemini for real content)
-        lc = await self.llm.longcat_chat(MASTER_PROMPT, f"User: {query}")
-        gm = await self.llm.gemini_chat(MASTER_PROMPT, f"User: {query}")
-        primary_text = (gm.get("output") if gm.get("ok") else lc.get("output")) or ""
-
         intent = "insight" if "spend" in query.lower() else "chat"
         agent_calls: list[dict] = []
 
@@ -68,6 +63,9 @@ class OrchestratorAgent(BaseAgent):
             agent_calls.append({"agent": "GoalTrackingAgent", "input": query, "output": {"progress": 42}})
             final = "Reported goal progress."
         else:
+            # Only free-form questions need the LLM; race Gemini (preferred) against Longcat
+            res = await self.llm.hedged_chat(MASTER_PROMPT, f"User: {query}", order=("gemini", "longcat"))
+            primary_text = (res.get("output") if res.get("ok") else "") or ""
             agent_calls.append({"agent": "ChatAgent", "input": query, "output": primary_text})
             final = primary_text
 
@@ -1,8 +1,8 @@
 from fastapi import HTTPException, Depends
-import bcrypt
 from ..utils.dbConnect import get_db
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
+from ..utils.passwords import hash_password, needs_rehash, verify_password
 from ..utils.jwtHandler import create_access_token, create_refresh_token, get_current_user_id
 from ..models.userModel import UserCreate, UserLogin, UserOut, UserUpdate
 
@@ -13,8 +13,8 @@ async def signup(payload: UserCreate):
     exist = await users.find_one({"email": payload.email})
     if exist:
         raise HTTPException(status_code=409, detail="Email already registered")
-    # Use bcrypt library directly to avoid passlib backend issues
-    hashed = bcrypt.hashpw(payload.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    # bcrypt runs in the password pool, off the event loop
+    hashed = await hash_password(payload.password)
     doc = {
         "name": payload.name,
         "email": payload.email,
@@ -34,8 +34,15 @@ async def login(payload: UserLogin):
     db = await get_db()
     users = db.get_collection("users")
     user = await users.find_one({"email": payload.email})
-    if not user or not bcrypt.checkpw(payload.password.encode('utf-8'), str(user.get("passwordHash", "")).encode('utf-8')):
+    stored = str((user or {}).get("passwordHash", ""))
+    if not user or not await verify_password(payload.password, stored):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    # Upgrade hashes made with a different BCRYPT_ROUNDS while we have the plaintext
+    if needs_rehash(stored):
+        try:
+            await users.update_one({"_id": user["_id"], "passwordHash": stored}, {"$set": {"passwordHash": await hash_password(payload.password)}})
+        except Exception:
+            pass
     uid = str(user["_id"]) 
     return {
         "access_token": create_access_token(uid),
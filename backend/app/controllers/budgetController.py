@@ -3,6 +3,7 @@ from ..utils.dbConnect import get_db
 from ..models.budgetModel import BudgetCreate
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
+from ..utils.pagination import PageParams, paginate
 
 
 COL = "budgets"
@@ -15,10 +16,9 @@ async def create_budget(user_id: str, payload: BudgetCreate):
     return serialize_doc(await db[COL].find_one({"_id": res.inserted_id}))
 
 
-async def list_budgets(user_id: str):
+async def list_budgets(user_id: str, page: PageParams | None = None):
     db = await get_db()
-    cursor = db[COL].find({"userId": user_id})
-    return [serialize_doc(doc) async for doc in cursor]
+    return await paginate(db[COL], {"userId": user_id}, page or PageParams(), sort_field="month")
 
 
 async def update_budget(user_id: str, budget_id: str, payload: dict):
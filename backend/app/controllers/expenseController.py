@@ -3,7 +3,9 @@ from ..utils.dbConnect import get_db
 from ..models.expenseModel import ExpenseCreate
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
+from ..utils.pagination import PageParams, paginate
 from ..utils.notifier import notify
+from ..services import ledger_rollups, progress_cache
 
 
 COL = "expenses"
@@ -12,8 +14,12 @@ COL = "expenses"
 async def create_expense(user_id: str, payload: ExpenseCreate):
     db = await get_db()
     doc = {**payload.dict(), "userId": user_id}
-    res = await db[COL].insert_one(doc)
-    created = await db[COL].find_one({"_id": res.inserted_id})
+    # entry and rollup commit together where transactions are available (see ledger_rollups)
+    async with ledger_rollups.transaction(db) as session:
+        res = await db[COL].insert_one(doc, session=session)
+        created = await db[COL].find_one({"_id": res.inserted_id}, session=session)
+        await ledger_rollups.record(db, user_id, "expense", after=created, session=session)
+    await progress_cache.bump(db, user_id)
     # If paid from wallet, deduct wallet balance
     try:
         if (payload.paymentMethod or '').lower() == 'wallet':
@@ -36,30 +42,32 @@ async def create_expense(user_id: str, payload: ExpenseCreate):
     return serialize_doc(created)
 
 
-async def list_expenses(user_id: str, category: str | None = None):
+async def list_expenses(user_id: str, category: str | None = None, page: PageParams | None = None):
     db = await get_db()
     query = {"userId": user_id}
     if category:
         query["category"] = category
-    cursor = db[COL].find(query)
-    return [serialize_doc(doc) async for doc in cursor]
+    return await paginate(db[COL], query, page or PageParams())
 
 
 async def update_expense(user_id: str, expense_id: str, payload: dict):
     db = await get_db()
     oid = to_obj_id(expense_id)
+    async with ledger_rollups.transaction(db) as session:
+        existing = await db[COL].find_one({"_id": oid, "userId": user_id}, session=session)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        r = await db[COL].update_one({"_id": oid, "userId": user_id}, {"$set": payload}, session=session)
+        if r.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        updated = await db[COL].find_one({"_id": oid}, session=session)
+        await ledger_rollups.record(db, user_id, "expense", before=existing, after=updated, session=session)
     # Wallet adjustments if paymentMethod/amount changed
-    existing = await db[COL].find_one({"_id": oid, "userId": user_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Expense not found")
     old_pm = (existing.get("paymentMethod") or '').lower()
     old_amt = int(float(existing.get("amount") or 0))
     new_pm = (payload.get("paymentMethod", existing.get("paymentMethod")) or '').lower()
     new_amt = int(float(payload.get("amount", existing.get("amount", 0)) or 0))
-
-    r = await db[COL].update_one({"_id": oid, "userId": user_id}, {"$set": payload})
-    if r.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Expense not found")
+    await progress_cache.bump(db, user_id)
     # Compute wallet delta
     try:
         delta = 0
@@ -82,19 +90,21 @@ async def update_expense(user_id: str, expense_id: str, payload: dict):
         await notify(db, user_id, type="expense", title="Expense updated", text=f"{expense_id} has been updated")
     except Exception:
         pass
-    return serialize_doc(await db[COL].find_one({"_id": oid}))
+    return serialize_doc(updated)
 
 
 async def delete_expense(user_id: str, expense_id: str):
     db = await get_db()
     oid = to_obj_id(expense_id)
+    async with ledger_rollups.transaction(db) as session:
+        existing = await db[COL].find_one_and_delete({"_id": oid, "userId": user_id}, session=session)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        await ledger_rollups.record(db, user_id, "expense", before=existing, session=session)
+    await progress_cache.bump(db, user_id)
     # Refund wallet if this was paid from wallet
-    existing = await db[COL].find_one({"_id": oid, "userId": user_id})
-    r = await db[COL].delete_one({"_id": oid, "userId": user_id})
-    if r.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Expense not found")
     try:
-        if existing and (existing.get("paymentMethod") or '').lower() == 'wallet':
+        if (existing.get("paymentMethod") or '').lower() == 'wallet':
             amt = int(float(existing.get("amount") or 0))
             await db["users"].update_one({"_id": to_obj_id(user_id)}, {"$inc": {"walletBalance": amt}})
             try:
@@ -3,7 +3,11 @@ from ..utils.dbConnect import get_db
 from ..models.goalModel import GoalCreate, GoalUpdate
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
+from ..utils import metrics
+from ..services import progress_cache
+from ..services.snapshot import UserFinancialSnapshot
 from datetime import datetime
+from typing import Optional
 
 COL = "goals"
 
@@ -25,6 +29,7 @@ async def create_goal(user_id: str, payload: GoalCreate):
     if doc.get("active"):
         await db[COL].update_many({"userId": user_id}, {"$set": {"active": False}})
     res = await db[COL].insert_one({**doc, "createdAt": datetime.utcnow().isoformat()})
+    await progress_cache.bump(db, user_id)
     return serialize_doc(await db[COL].find_one({"_id": res.inserted_id}))
 
 
@@ -46,6 +51,7 @@ async def set_active_goal(user_id: str, goal_id: str):
         raise HTTPException(status_code=404, detail="Goal not found")
     await db[COL].update_many({"userId": user_id}, {"$set": {"active": False}})
     await db[COL].update_one({"_id": oid}, {"$set": {"active": True}})
+    await progress_cache.bump(db, user_id)
     return serialize_doc(await db[COL].find_one({"_id": oid}))
 
 
@@ -59,6 +65,7 @@ async def update_goal(user_id: str, goal_id: str, payload: GoalUpdate):
     r = await db[COL].update_one({"_id": oid, "userId": user_id}, {"$set": updates})
     if r.matched_count == 0:
         raise HTTPException(status_code=404, detail="Goal not found")
+    await progress_cache.bump(db, user_id)
     return serialize_doc(await db[COL].find_one({"_id": oid}))
 
 
@@ -68,30 +75,20 @@ async def delete_goal(user_id: str, goal_id: str):
     r = await db[COL].delete_one({"_id": oid, "userId": user_id})
     if r.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Goal not found")
+    await progress_cache.bump(db, user_id)
     return {"deleted": True}
 
 
-def _ym(date_str: str) -> str:
-    try:
-        d = datetime.fromisoformat(date_str.replace('Z',''))
-    except Exception:
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-        except Exception:
-            return "Unknown"
-    return f"{d.year}-{d.month:02d}"
-
-
 def _month_diff(a: datetime, b: datetime) -> int:
     return (b.year - a.year) * 12 + (b.month - a.month)
 
 
-async def compute_goal_progress(user_id: str):
-    db = await get_db()
-    goal = await db[COL].find_one({"userId": user_id, "active": True})
-    if not goal:
-        # fallback to most recent if available
-        goal = await db[COL].find_one({"userId": user_id})
+async def compute_goal_progress(user_id: str, snapshot: Optional[UserFinancialSnapshot] = None):
+    # Reuse the request's snapshot so the goal and ledger aren't read twice
+    snap = snapshot or UserFinancialSnapshot(await get_db(), user_id)
+    # Reads issued here (not already made by the caller) are labelled in /metrics
+    with metrics.section("compute_goal_progress"):
+        goal, ledger = await snap.load("goal", "ledger")
     if not goal:
         raise HTTPException(status_code=404, detail="No goal configured")
 
@@ -100,15 +97,9 @@ async def compute_goal_progress(user_id: str):
     if not target_amount or not target_date_str:
         raise HTTPException(status_code=400, detail="Invalid goal data")
 
-    # Aggregate monthly income and expenses
-    income_map = {}
-    async for inc in db["income"].find({"userId": user_id}):
-        k = _ym(inc.get("date", ""))
-        income_map[k] = income_map.get(k, 0) + float(inc.get("amount") or 0)
-    expense_map = {}
-    async for exp in db["expenses"].find({"userId": user_id}):
-        k = _ym(exp.get("date", ""))
-        expense_map[k] = expense_map.get(k, 0) + float(exp.get("amount") or 0)
+    # Monthly income and expenses from the ledger rollups
+    income_map = ledger["incomeByMonth"]
+    expense_map = ledger["expenseByMonth"]
 
     # Build sorted months and cumulative actual savings
     months = sorted(set(list(income_map.keys()) + list(expense_map.keys())))
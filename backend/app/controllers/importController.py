@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from ..utils.dbConnect import get_db
+from ..utils.env import env_int
+from ..models.expenseModel import ExpenseCreate
+from ..models.incomeModel import IncomeCreate
+from ..utils.notifier import notify
+from ..services import ledger_rollups, progress_cache
+
+
+# kind -> (collection, row model, label used in the summary notification)
+KINDS = {
+    "expense": ("expenses", ExpenseCreate, "expenses"),
+    "income": ("income", IncomeCreate, "income entries"),
+}
+
+CHUNK_SIZE = env_int("IMPORT_CHUNK_SIZE", 1000)
+MAX_ROWS = env_int("IMPORT_MAX_ROWS", 50000)
+MAX_BYTES = env_int("IMPORT_MAX_BYTES", 10 * 1024 * 1024)
+
+
+async def read_body(request) -> bytes:
+    """Read an upload body, refusing it with 413 once it exceeds MAX_BYTES.
+
+    A declared Content-Length is checked up front; bytes are also counted as
+    they stream in, for chunked uploads or a Content-Length that lies.
+    """
+    too_large = HTTPException(status_code=413, detail=f"Upload exceeds {MAX_BYTES} bytes")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_BYTES:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BYTES:
+            raise too_large
+    return bytes(body)
+
+
+def _detect_format(body: str, content_type: str, fmt: Optional[str]) -> str:
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in ("csv", "ndjson"):
+            raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+        return fmt
+    ct = (content_type or "").lower()
+    if "ndjson" in ct or "jsonl" in ct:
+        return "ndjson"
+    if "csv" in ct:
+        return "csv"
+    return "ndjson" if body.lstrip().startswith("{") else "csv"
+
+
+def parse_rows(body: str, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, raw row) pairs; row numbers are 1-based data rows."""
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(body))
+        for n, row in enumerate(reader, start=1):
+            # empty CSV cells mean "not given", not an empty string
+            yield n, {(k or "").strip(): (v.strip() if isinstance(v, str) else v) or None for k, v in row.items() if k}
+        return
+    n = 0
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        n += 1
+        try:
+            yield n, json.loads(line)
+        except ValueError as e:
+            yield n, e
+
+
+def _error_text(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors())
+    if isinstance(e, ValueError):
+        return f"invalid JSON: {e}"
+    return str(e)
+
+
+def validate_rows(rows: Iterator[Tuple[int, Any]], model: type[BaseModel]) -> Tuple[List[Tuple[int, dict]], List[Dict[str, Any]]]:
+    valid: List[Tuple[int, dict]] = []
+    errors: List[Dict[str, Any]] = []
+    for n, raw in rows:
+        if n > MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_ROWS} rows per import")
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            if not isinstance(raw, dict):
+                raise ValueError("expected an object per line")
+            valid.append((n, model(**{k: v for k, v in raw.items() if v is not None}).model_dump()))
+        except (ValidationError, ValueError) as e:
+            errors.append({"row": n, "error": _error_text(e)})
+    return valid, errors
+
+
+async def _insert_chunks(coll, rows: List[Tuple[int, dict]], errors: List[Dict[str, Any]]) -> List[dict]:
+    """insert_many in unordered chunks; returns the documents that were written."""
+    from pymongo.errors import BulkWriteError
+
+    inserted: List[dict] = []
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        docs = [doc for _, doc in chunk]
+        failed = set()
+        try:
+            await coll.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed.add(err["index"])
+                errors.append({"row": chunk[err["index"]][0], "error": err.get("errmsg", "write failed")})
+        inserted.extend(doc for j, doc in enumerate(docs) if j not in failed)
+    return inserted
+
+
+async def import_entries(user_id: str, kind: str, body: bytes, content_type: str = "", fmt: Optional[str] = None) -> Dict[str, Any]:
+    """Validate and bulk-insert a CSV/NDJSON statement.
+
+    Rollups, the wallet balance and notifications are updated once for the
+    whole import rather than per row.
+    """
+    col, model, label = KINDS[kind]
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 text")
+    rows, errors = validate_rows(parse_rows(text, _detect_format(text, content_type, fmt)), model)
+    for _, doc in rows:
+        doc["userId"] = user_id
+    db = await get_db()
+    inserted = await _insert_chunks(db[col], rows, errors) if rows else []
+    wallet_debit = 0
+    if kind == "expense":
+        # sum first, round once: truncating per row would lose every fractional amount
+        wallet_debit = round(sum(float(d.get("amount") or 0) for d in inserted if (d.get("paymentMethod") or "").lower() == "wallet"))
+    if inserted:
+        await ledger_rollups.record_many(db, user_id, kind, inserted)
+        # one users write for the data version and any wallet debit
+        await progress_cache.bump(db, user_id, **({"walletBalance": -wallet_debit} if wallet_debit else {}))
+    if inserted:
+        try:
+            total = sum(float(d.get("amount") or 0) for d in inserted)
+            text = f"₹{total:.0f} total"
+            if wallet_debit:
+                text += f" • wallet debited ₹{wallet_debit}"
+            await notify(db, user_id, type=kind, title=f"Imported {len(inserted)} {label}", text=text)
+        except Exception:
+            pass
+    errors.sort(key=lambda e: e["row"])
+    return {"inserted": len(inserted), "failed": len(errors), "walletDebited": wallet_debit, "errors": errors}
@@ -3,7 +3,9 @@ from ..utils.dbConnect import get_db
 from ..models.incomeModel import IncomeCreate
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
+from ..utils.pagination import PageParams, paginate
 from ..utils.notifier import notify
+from ..services import ledger_rollups, progress_cache
 
 
 COL = "income"
@@ -12,8 +14,12 @@ COL = "income"
 async def create_income(user_id: str, payload: IncomeCreate):
     db = await get_db()
     doc = {**payload.dict(), "userId": user_id}
-    res = await db[COL].insert_one(doc)
-    created = await db[COL].find_one({"_id": res.inserted_id})
+    # entry and rollup commit together where transactions are available (see ledger_rollups)
+    async with ledger_rollups.transaction(db) as session:
+        res = await db[COL].insert_one(doc, session=session)
+        created = await db[COL].find_one({"_id": res.inserted_id}, session=session)
+        await ledger_rollups.record(db, user_id, "income", after=created, session=session)
+    await progress_cache.bump(db, user_id)
     try:
         amt = float(payload.amount or 0)
         src = payload.source or "Income"
@@ -23,31 +29,37 @@ async def create_income(user_id: str, payload: IncomeCreate):
     return serialize_doc(created)
 
 
-async def list_income(user_id: str):
+async def list_income(user_id: str, page: PageParams | None = None):
     db = await get_db()
-    cursor = db[COL].find({"userId": user_id})
-    return [serialize_doc(doc) async for doc in cursor]
+    return await paginate(db[COL], {"userId": user_id}, page or PageParams())
 
 
 async def update_income(user_id: str, income_id: str, payload: dict):
     db = await get_db()
     oid = to_obj_id(income_id)
-    r = await db[COL].update_one({"_id": oid, "userId": user_id}, {"$set": payload})
-    if r.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Income not found")
+    async with ledger_rollups.transaction(db) as session:
+        existing = await db[COL].find_one_and_update({"_id": oid, "userId": user_id}, {"$set": payload}, session=session)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Income not found")
+        updated = await db[COL].find_one({"_id": oid}, session=session)
+        await ledger_rollups.record(db, user_id, "income", before=existing, after=updated, session=session)
+    await progress_cache.bump(db, user_id)
     try:
         await notify(db, user_id, type="income", title="Income updated", text=f"{income_id} has been updated")
     except Exception:
         pass
-    return serialize_doc(await db[COL].find_one({"_id": oid}))
+    return serialize_doc(updated)
 
 
 async def delete_income(user_id: str, income_id: str):
     db = await get_db()
     oid = to_obj_id(income_id)
-    r = await db[COL].delete_one({"_id": oid, "userId": user_id})
-    if r.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Income not found")
+    async with ledger_rollups.transaction(db) as session:
+        existing = await db[COL].find_one_and_delete({"_id": oid, "userId": user_id}, session=session)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Income not found")
+        await ledger_rollups.record(db, user_id, "income", before=existing, session=session)
+    await progress_cache.bump(db, user_id)
     try:
         await notify(db, user_id, type="income", title="Income deleted", text=f"{income_id} has been removed")
     except Exception:
@@ -3,6 +3,7 @@ from ..utils.dbConnect import get_db
 from ..models.investmentModel import InvestmentCreate
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
+from ..utils.pagination import PageParams, paginate
 from ..utils.notifier import notify
 
 
@@ -23,10 +24,29 @@ async def create_investment(user_id: str, payload: InvestmentCreate):
     return serialize_doc(created)
 
 
-async def list_investments(user_id: str):
+async def list_investments(user_id: str, page: PageParams | None = None):
     db = await get_db()
-    cursor = db[COL].find({"userId": user_id})
-    return [serialize_doc(doc) async for doc in cursor]
+    return await paginate(db[COL], {"userId": user_id}, page or PageParams())
+
+
+async def summarize_investments(db, user_id: str):
+    """Amount per type and the amount-weighted ROI, grouped in one aggregation."""
+    rows = await db[COL].aggregate([
+        {"$match": {"userId": user_id}},
+        {"$group": {
+            "_id": "$type",
+            "amount": {"$sum": "$amount"},
+            "weighted": {"$sum": {"$multiply": ["$amount", "$roi"]}},
+        }},
+    ]).to_list(length=None)
+    by_type: dict = {}
+    weighted = 0.0
+    for r in rows:
+        key = r["_id"] or "Other"
+        by_type[key] = by_type.get(key, 0.0) + float(r.get("amount") or 0)
+        weighted += float(r.get("weighted") or 0)
+    total = sum(by_type.values())
+    return {"total": total, "byType": by_type, "weightedRoi": weighted / total if total else 0.0}
 
 
 async def update_investment(user_id: str, inv_id: str, payload: dict):
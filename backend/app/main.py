@@ -1,5 +1,9 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .routes.authRoutes import router as auth_router
 from .routes.expenseRoutes import router as expense_router
 from .routes.incomeRoutes import router as income_router
@@ -9,8 +13,15 @@ from .routes.aiRoutes import router as ai_router
 from .routes.paymentRoutes import router as payment_router
 from .routes.goalRoutes import router as goal_router
 from .routes.notificationRoutes import router as notification_router
+from .routes.exportRoutes import router as export_router
+from .routes.summaryRoutes import router as summary_router
+from .utils.compression import CompressionMiddleware
+from .utils.metrics import MetricsMiddleware, metrics_enabled
+from .utils.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="FinAura API", version="0.1.0")
+app = FastAPI(title="FinAura API", version="0.1.0", default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -19,11 +30,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# Compress large buffered responses; streams (SSE, export) pass through
+app.add_middleware(CompressionMiddleware)
+# Outermost, so timings include compression and the other middleware
+if metrics_enabled():
+    app.add_middleware(MetricsMiddleware)
 
 # Health
 @app.get("/health")
 def health():
+    if _index_errors:
+        return {"status": "degraded", "indexes": _index_errors}
     return {"status": "ok"}
 
 @app.get("/health/db")
@@ -31,13 +50,85 @@ async def health_db():
     from .utils.dbConnect import ping_db
     return await ping_db()
 
+@app.get("/health/stats")
+def health_stats():
+    from .utils.llm_cache import get_llm_cache
+    from .utils.notifier import get_notification_pipeline
+    from .utils.realtime import get_bus
+    from .utils.jwtHandler import token_cache
+    from .scheduler import get_scheduler
+    from .services.progress_cache import get_progress_cache
+    return {
+        "auth": token_cache.stats(),
+        "llmCache": get_llm_cache().stats(),
+        "realtime": get_bus().stats(),
+        "notifications": get_notification_pipeline().stats(),
+        "scheduler": get_scheduler().stats(),
+        "goalProgress": get_progress_cache().stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    from .utils.metrics import render
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+_background_tasks = set()
+
+
+# Index reconciliation failures and conflicts, reported by /health
+_index_errors = []
+
+
+async def _reconcile_indexes(only):
+    # Reconcile the index registry (see utils/indexes.py)
+    from .utils.dbConnect import get_db
+    from .utils.indexes import ensure_indexes
+    try:
+        report = await ensure_indexes(await get_db(), only)
+    except Exception as e:
+        logger.exception("Index reconciliation failed")
+        _index_errors.append(f"{type(e).__name__}: {e}")
+        return
+    _index_errors.extend(f"conflict: {name}" for name in report["conflicts"])
+
 @app.on_event("startup")
 async def on_startup():
-    # Create unique index on users.email for safety
-    from .utils.dbConnect import get_db
-    db = await get_db()
-    await db["users"].create_index("email", unique=True)
-    await db["goals"].create_index("userId", unique=True)
+    from .utils.realtime import get_bus
+    from .utils.notifier import get_notification_pipeline
+    from .utils.indexes import INDEXES, UNIQUE_COLLECTIONS
+    from .scheduler import get_scheduler, scheduler_enabled
+    # Upserts into these rely on their unique index, so it must exist before traffic
+    await _reconcile_indexes(UNIQUE_COLLECTIONS)
+    # The other builds can take a while on a cold database; serve meanwhile
+    task = asyncio.create_task(_reconcile_indexes([c for c in INDEXES if c not in UNIQUE_COLLECTIONS]))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    await get_bus().start()
+    await get_notification_pipeline().start()
+    if scheduler_enabled():
+        await get_scheduler().start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    from .utils.llm_connector import close_llm_client
+    from .services.memory_db import close_memory_db
+    from .utils.passwords import shutdown as shutdown_password_pool
+    from .utils.payment import close_stripe_client
+    from .utils.realtime import get_bus
+    from .utils.notifier import get_notification_pipeline
+    from .scheduler import get_scheduler
+    for task in list(_background_tasks):
+        task.cancel()
+    await get_scheduler().stop()
+    # Flush buffered notifications before the bus they publish to goes away
+    await get_notification_pipeline().stop()
+    await get_bus().stop()
+    await close_llm_client()
+    await close_stripe_client()
+    close_memory_db()
+    shutdown_password_pool()
 
 # Routers
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
@@ -49,3 +140,5 @@ app.include_router(payment_router, prefix="/api/payment", tags=["payment"])
 app.include_router(ai_router, prefix="/api/ai", tags=["ai"])
 app.include_router(goal_router, prefix="/api/goals", tags=["goals"])
 app.include_router(notification_router, prefix="/api/notifications", tags=["notifications"])
+app.include_router(export_router, prefix="/api/export", tags=["export"])
+app.include_router(summary_router, prefix="/api/summary", tags=["summary"])
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends
-from ..utils.jwtHandler import get_current_user_id
+import json
+import re
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from ..utils.jwtHandler import get_current_user_id, verify_token
 from ..utils.dbConnect import get_db
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
-from ..utils.llm_connector import LLMClient
-from ..services.memory_db import MemoryDB
+from ..utils.llm_connector import LLMClient, LLMError, get_llm_client
+from ..services.memory_db import MemoryDB, get_memory_db
+from ..services.snapshot import UserFinancialSnapshot, get_snapshot
+from ..services.progress_cache import get_progress_cache
 from ..agents import (
     OrchestratorAgent,
     BudgetOptimizationAgent,
@@ -16,67 +23,77 @@ from ..utils.dbConnect import get_db
 
 router = APIRouter()
 
+_MONTH_PARAM = re.compile(r"^[0-9]{4}-(0[1-9]|1[0-2])$")
+
 
 @router.get("/expense-predict")
-async def expense_predict(user_id: str = Depends(get_current_user_id)):
+async def expense_predict(month: str | None = None, user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), mem: MemoryDB = Depends(get_memory_db)):
+    """Per-category expense forecast for `month` (YYYY-MM, default the current month)."""
+    if month is not None and not _MONTH_PARAM.match(month):
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
     db = await get_db()
-    llm = LLMClient()
-    mem = MemoryDB()
     agent = ExpenseAnalysisAgent(db=db, llm=llm, memory=mem)
-    return await agent.run({}, user_id)
+    return await agent.run({"month": month} if month else {}, user_id)
 
 
 @router.get("/investment-recommend")
-async def investment_recommend(user_id: str = Depends(get_current_user_id)):
-    db = await get_db()
-    oid = to_obj_id(user_id)
-    user = await db["users"].find_one({"_id": oid})
-    # Estimate budget from average income minus expense
-    incomes = [i.get("amount", 0) async for i in db["income"].find({"userId": user_id}).limit(50)]
-    expenses = [e.get("amount", 0) async for e in db["expenses"].find({"userId": user_id}).limit(50)]
-    budget = max(sum(incomes) - sum(expenses), 0)
+async def investment_recommend(user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), mem: MemoryDB = Depends(get_memory_db), snap: UserFinancialSnapshot = Depends(get_snapshot)):
+    user, ledger = await snap.load("user", "ledger")
+    # Estimate budget from income minus expense
+    budget = max(ledger["totalIncome"] - ledger["totalExpense"], 0)
     risk = (user or {}).get("riskProfile", "moderate")
     # Use agents path (stubbed): return a simple rule-based plan for now
     from ..agents.investment_advisor import InvestmentAdvisorAgent
-    llm = LLMClient()
-    mem = MemoryDB()
-    agent = InvestmentAdvisorAgent(db=db, llm=llm, memory=mem)
+    agent = InvestmentAdvisorAgent(db=snap.db, llm=llm, memory=mem, snapshot=snap)
     res = await agent.run({"risk": risk, "budget": budget}, user_id=user_id)
     return res
 
 
 # New multi-agent endpoints (orchestrated)
 @router.get("/query")
-async def ai_query(q: str, user_id: str = Depends(get_current_user_id)):
+async def ai_query(q: str, user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), mem: MemoryDB = Depends(get_memory_db)):
     db = await get_db()
-    llm = LLMClient()
-    mem = MemoryDB()
     orch = OrchestratorAgent(db=db, llm=llm, memory=mem)
     return await orch.run({"q": q}, user_id)
 
 
-@router.get("/chat")
-async def ai_chat(q: str, model: str = "gemini", user_id: str = Depends(get_current_user_id)):
-    """Direct chat with a chosen model (gemini|longcat), constrained to FinAura data only.
+# Special-case: identity/about developer/self questions or request for more detail
+IDENTITY_TERMS = [
+    "who are you", "your name", "about yourself", "about your self", "who developed you",
+    "who created you", "developer", "made you", "who build you", "who built you", "who devlop you", "who develop you"
+]
+# Guard: decline out-of-scope/software/app requests explicitly
+OUT_OF_SCOPE_TERMS = ["chatgpt", "openai", "whatsapp", "instagram", "facebook", "tiktok", "youtube", "android app", "ios app", "software", "install", "download"]
+# Streamed output is cut off if the model starts talking about other apps
+EXTERNAL_APP_TERMS = ["chatgpt", "openai", "whatsapp", "instagram", "facebook", "tiktok", "youtube"]
+DECLINE_REPLY = "I can only answer based on your FinAura data and general finance knowledge."
+# held back from the client until the next chunk: one less than the longest term
+_GUARD_HOLD = max(len(t) for t in EXTERNAL_APP_TERMS) - 1
 
-    - If the user asks about other apps/software or topics outside FinAura data, we decline.
-    - Provides a minimal per-user financial context to the model.
-    """
-    db = await get_db()
-    # Quick per-user context
-    incomes = [i.get("amount", 0) async for i in db["income"].find({"userId": user_id}).limit(180)]
-    expenses = [e.get("amount", 0) async for e in db["expenses"].find({"userId": user_id}).limit(180)]
-    investments = [inv.get("amount", 0) async for inv in db["investment"].find({"userId": user_id}).limit(180)]
-    user_doc = await db["users"].find_one({"_id": to_obj_id(user_id)})
-    risk = (user_doc or {}).get("riskProfile", "moderate")
-    wallet = int((user_doc or {}).get("walletBalance", 0))
-    goal = await db["goals"].find_one({"userId": user_id, "active": True}) or await db["goals"].find_one({"userId": user_id})
 
-    # Special-case: identity/about developer/self questions or request for more detail
-    identity_terms = [
-        "who are you", "your name", "about yourself", "about your self", "who developed you",
-        "who created you", "developer", "made you", "who build you", "who built you", "who devlop you", "who develop you"
-    ]
+async def _guarded(chunks: AsyncIterator[str]):
+    """Relay `chunks` as {"delta"} events, or end with {"replace"} once a term appears.
+
+    The last _GUARD_HOLD characters wait for the next chunk, so a term split
+    across chunks is caught before any of it is sent, and each check only
+    scans that tail plus the new chunk.
+    """
+    pending = ""
+    async for chunk in chunks:
+        pending += chunk
+        if any(t in pending.lower() for t in EXTERNAL_APP_TERMS):
+            yield {"replace": DECLINE_REPLY}
+            return
+        cut = len(pending) - _GUARD_HOLD
+        if cut > 0:
+            yield {"delta": pending[:cut]}
+            pending = pending[cut:]
+    if pending:
+        yield {"delta": pending}
+
+
+def _chat_canned_reply(q: str):
+    """Return a fixed reply for identity/out-of-scope questions, else None."""
     ql = (q or "").lower()
     about_finaura = (
         "FinAura is an AI-assisted personal finance platform that lets you track income, expenses, and investments; "
@@ -92,28 +109,28 @@ async def ai_chat(q: str, model: str = "gemini", user_id: str = Depends(get_curr
         "Why FinAura: Unlike typical trackers, FinAura combines agentic suggestions with one-click apply actions, real-time notifications, and a finance-aware assistant—all in one place. "
         "For more, see the maintainer GitHub: https://github.com/Harshtiwari1131"
     )
-    if any(t in ql for t in identity_terms) or "more detail" in ql or "more details" in ql:
-        return {"ok": True, "model": (model or "").lower(), "reply": about_finaura}
-
-    # Guard: decline out-of-scope/software/app requests explicitly
-    out_of_scope_terms = ["chatgpt", "openai", "whatsapp", "instagram", "facebook", "tiktok", "youtube", "android app", "ios app", "software", "install", "download"]
-    if any(t in ql for t in out_of_scope_terms):
-        return {
-            "ok": True,
-            "model": (model or "").lower(),
-            "reply": "I can only answer based on your financial data in FinAura (income, expenses, investments, goals, wallet). I can’t advise about other apps or software.",
-        }
-
-    # Compose strict system prompt
+    if any(t in ql for t in IDENTITY_TERMS) or "more detail" in ql or "more details" in ql:
+        return about_finaura
+    if any(t in ql for t in OUT_OF_SCOPE_TERMS):
+        return "I can only answer based on your financial data in FinAura (income, expenses, investments, goals, wallet). I can’t advise about other apps or software."
+    return None
+
+
+async def _chat_system_prompt(snap: UserFinancialSnapshot) -> str:
+    """Compose the strict system prompt with a minimal per-user financial context."""
+    ledger, invested, user_doc, goal = await snap.load("ledger", "invested", "user", "goal")
+    risk = (user_doc or {}).get("riskProfile", "moderate")
+    wallet = int((user_doc or {}).get("walletBalance", 0))
+
     ctx = {
-        "total_income": sum(incomes),
-        "total_expenses": sum(expenses),
-        "net": sum(incomes) - sum(expenses),
-        "invested": sum(investments),
+        "total_income": ledger["totalIncome"],
+        "total_expenses": ledger["totalExpense"],
+        "net": ledger["totalIncome"] - ledger["totalExpense"],
+        "invested": invested,
         "wallet": wallet,
         "riskProfile": risk,
         "hasGoal": bool(goal),
-        "goal": {"title": (goal or {}).get("title"), "target": (goal or {}).get("target"), "targetDate": (goal or {}).get("targetDate") } if goal else None,
+        "goal": {"title": (goal or {}).get("name"), "target": (goal or {}).get("targetAmount"), "targetDate": (goal or {}).get("targetDate") } if goal else None,
     }
     # Finance knowledge base (compact, safe, and non-prescriptive)
     finance_kb = (
@@ -135,46 +152,98 @@ async def ai_chat(q: str, model: str = "gemini", user_id: str = Depends(get_curr
         f"User Data Summary (approx): {ctx}\n\n"
         f"Knowledge Base: {finance_kb}"
     )
+    return system
+
 
-    llm = LLMClient()
+@router.get("/chat")
+async def ai_chat(q: str, model: str = "gemini", user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), snap: UserFinancialSnapshot = Depends(get_snapshot)):
+    """Direct chat with a chosen model (gemini|longcat), constrained to FinAura data only.
+
+    - If the user asks about other apps/software or topics outside FinAura data, we decline.
+    - Provides a minimal per-user financial context to the model.
+    """
     m = (model or "").lower()
+    canned = _chat_canned_reply(q)
+    if canned is not None:
+        return {"ok": True, "model": m, "reply": canned}
+
+    system = await _chat_system_prompt(snap)
     if m == "longcat":
         res = await llm.longcat_chat(system, f"User: {q}")
     else:
         res = await llm.gemini_chat(system, f"User: {q}")
     ok = bool(res.get("ok"))
     out = res.get("output") if ok else (res.get("message") or "No response")
-    # Final guard if model ignores instruction
     if not ok:
         return {"ok": False, "model": m, "reply": out}
-    if any(t in ql for t in out_of_scope_terms):
-        return {"ok": True, "model": m, "reply": "I can only answer based on your FinAura data and general finance knowledge."}
     return {"ok": True, "model": m, "reply": out}
 
 
+@router.get("/chat/stream")
+async def ai_chat_stream(q: str, token: str, model: str = "gemini", llm: LLMClient = Depends(get_llm_client)):
+    """Streaming variant of /chat relayed as text/event-stream.
+
+    EventSource cannot set headers, so the access token comes as a query param
+    (same as /api/notifications/sse). Events carry `{"delta": ...}` chunks,
+    then `{"done": true}`; `{"replace": ...}` swaps the text sent so far if the
+    guard trips (flagged text itself is never sent) and `{"error": ...}`
+    reports a provider failure.
+    """
+    try:
+        payload = verify_token(token)
+        user_id = str(payload.get("sub"))
+    except Exception:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    m = (model or "").lower()
+    canned = _chat_canned_reply(q)
+    system = None
+    if canned is None:
+        system = await _chat_system_prompt(UserFinancialSnapshot(await get_db(), user_id))
+
+    def event(data: dict) -> str:
+        return f"data: {json.dumps(data)}\n\n"
+
+    async def event_gen():
+        if canned is not None:
+            yield event({"delta": canned})
+            yield event({"done": True, "model": m})
+            return
+        stream = llm.longcat_stream(system, f"User: {q}") if m == "longcat" else llm.gemini_stream(system, f"User: {q}")
+        try:
+            async for data in _guarded(stream):
+                yield event(data)
+            yield event({"done": True, "model": m})
+        except LLMError as e:
+            yield event({"error": str(e), "model": m})
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        event_gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/suggestions")
-async def ai_suggestions(model: str = "gemini", notify_user: bool = False, user_id: str = Depends(get_current_user_id)):
+async def ai_suggestions(model: str = "gemini", notify_user: bool = False, user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), snap: UserFinancialSnapshot = Depends(get_snapshot)):
     """Compute actionable spending/income/investment suggestions.
 
     Returns a small list of suggestions, each with title, detail, and action. If `notify_user=true`, also push 1-2 concise notifications.
     """
-    db = await get_db()
-    # Load user data
-    incomes = [i async for i in db["income"].find({"userId": user_id})]
-    expenses = [e async for e in db["expenses"].find({"userId": user_id})]
-    investments = [inv async for inv in db["investment"].find({"userId": user_id})]
-    user_doc = await db["users"].find_one({"_id": to_obj_id(user_id)})
-    goal = await db["goals"].find_one({"userId": user_id, "active": True}) or await db["goals"].find_one({"userId": user_id})
-
-    tot_inc = sum(float(x.get("amount") or 0) for x in incomes)
-    tot_exp = sum(float(x.get("amount") or 0) for x in expenses)
+    db = snap.db
+    # Load user data concurrently; compute_goal_progress below reuses it
+    ledger, user_doc, goal = await snap.load("ledger", "user", "goal")
+
+    tot_inc = ledger["totalIncome"]
+    tot_exp = ledger["totalExpense"]
     net = tot_inc - tot_exp
 
     # Category breakdown
     cat = {}
-    for e in expenses:
-        k = (e.get("category") or "Other").title()
-        cat[k] = cat.get(k, 0.0) + float(e.get("amount") or 0)
+    for name, total in ledger["expenseByCategory"].items():
+        k = name.title()
+        cat[k] = cat.get(k, 0.0) + total
     top_cat = None
     if cat:
         top_cat = max(cat.items(), key=lambda kv: kv[1])  # (name, total)
@@ -207,8 +276,7 @@ async def ai_suggestions(model: str = "gemini", notify_user: bool = False, user_
 
     # Suggestion 3: Savings target toward goal
     if goal:
-        from ..controllers.goalController import compute_goal_progress
-        stats = await compute_goal_progress(user_id)
+        stats = await get_progress_cache().get(user_id, snap)
         if stats:
             monthly = stats.get("suggestedMonthly", 0)
             suggestions.append({
@@ -238,7 +306,6 @@ async def ai_suggestions(model: str = "gemini", notify_user: bool = False, user_
                 "Do not mention external apps. Keep it focused and helpful."
             )
             bullets = "\n".join([f"- {s['title']}: {s['detail']}" for s in suggestions])
-            llm = LLMClient()
             res = await (llm.longcat_chat(system, bullets) if (model or '').lower()=="longcat" else llm.gemini_chat(system, bullets))
             if res.get("ok"):
                 suggestions.insert(0, {"title": "Summary", "detail": res.get("output", ""), "type": "summary"})
@@ -259,23 +326,17 @@ async def ai_suggestions(model: str = "gemini", notify_user: bool = False, user_
 
 
 @router.post("/apply/monthly-savings-to-wallet")
-async def apply_monthly_savings_to_wallet(user_id: str = Depends(get_current_user_id)):
+async def apply_monthly_savings_to_wallet(user_id: str = Depends(get_current_user_id), snap: UserFinancialSnapshot = Depends(get_snapshot)):
     """Compute monthly savings target and move that amount from net balance (income - expenses to date) into wallet.
 
     This is a simplified action: it does NOT move bank money; it records a wallet top-up equal to the target, capped by net positive balance.
     """
-    db = await get_db()
+    db = snap.db
     # Aggregate totals
-    tot_inc = 0
-    async for i in db["income"].find({"userId": user_id}):
-        tot_inc += float(i.get("amount") or 0)
-    tot_exp = 0
-    async for e in db["expenses"].find({"userId": user_id}):
-        tot_exp += float(e.get("amount") or 0)
-    net = tot_inc - tot_exp
-    from ..controllers.goalController import compute_goal_progress
+    ledger = await snap.ledger()
+    net = ledger["totalIncome"] - ledger["totalExpense"]
     try:
-        stats = await compute_goal_progress(user_id)
+        stats = await get_progress_cache().get(user_id, snap)
         monthly = float(stats.get("suggestedMonthly") or 0)
     except Exception:
         monthly = 0.0
@@ -283,8 +344,7 @@ async def apply_monthly_savings_to_wallet(user_id: str = Depends(get_current_use
     if amount <= 0:
         return {"ok": False, "message": "No net balance available for transfer."}
     # Credit wallet and reflect net movement (store a running net shadow to avoid confusion)
-    users = (await get_db())["users"]
-    from ..utils.ids import to_obj_id
+    users = db["users"]
     oid = to_obj_id(user_id)
     await users.update_one({"_id": oid}, {"$inc": {"walletBalance": int(amount), "netShadow": -int(amount)}})
     # Notify
@@ -331,27 +391,20 @@ async def apply_trim_categories(user_id: str = Depends(get_current_user_id)):
 
 
 @router.post("/plan-budget")
-async def plan_budget(user_id: str = Depends(get_current_user_id)):
-    db = await get_db()
-    llm = LLMClient()
-    mem = MemoryDB()
-    agent = BudgetOptimizationAgent(db=db, llm=llm, memory=mem)
+async def plan_budget(user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), mem: MemoryDB = Depends(get_memory_db), snap: UserFinancialSnapshot = Depends(get_snapshot)):
+    agent = BudgetOptimizationAgent(db=snap.db, llm=llm, memory=mem, snapshot=snap)
     return await agent.run({}, user_id)
 
 
 @router.get("/insights")
-async def ai_insights(user_id: str = Depends(get_current_user_id)):
+async def ai_insights(user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), mem: MemoryDB = Depends(get_memory_db)):
     db = await get_db()
-    llm = LLMClient()
-    mem = MemoryDB()
     agent = ExpenseAnalysisAgent(db=db, llm=llm, memory=mem)
     return await agent.run({}, user_id)
 
 
 @router.get("/goal-progress")
-async def goal_progress(user_id: str = Depends(get_current_user_id)):
+async def goal_progress(user_id: str = Depends(get_current_user_id), llm: LLMClient = Depends(get_llm_client), mem: MemoryDB = Depends(get_memory_db)):
     db = await get_db()
-    llm = LLMClient()
-    mem = MemoryDB()
     agent = GoalTrackingAgent(db=db, llm=llm, memory=mem)
     return await agent.run({}, user_id)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from ..controllers import expenseController as ctl
+from ..controllers import importController
 from ..models.expenseModel import ExpenseCreate
 from ..utils.jwtHandler import get_current_user_id
+from ..utils.pagination import PageParams, page_params, page_response
 
 router = APIRouter()
 
@@ -11,9 +13,16 @@ async def create(payload: ExpenseCreate, user_id: str = Depends(get_current_user
     return await ctl.create_expense(user_id, payload)
 
 
+@router.post("/import")
+async def import_rows(request: Request, format: str | None = None, user_id: str = Depends(get_current_user_id)):
+    # raw CSV or NDJSON body, at most IMPORT_MAX_BYTES; format is sniffed from Content-Type or the content when omitted
+    return await importController.import_entries(user_id, "expense", await importController.read_body(request), request.headers.get("content-type", ""), format)
+
+
 @router.get("")
-async def list(category: str | None = None, user_id: str = Depends(get_current_user_id)):
-    return await ctl.list_expenses(user_id, category)
+async def list(category: str | None = None, page: PageParams = Depends(page_params), user_id: str = Depends(get_current_user_id)):
+    items, next_cursor = await ctl.list_expenses(user_id, category, page)
+    return page_response(items, next_cursor)
 
 
 @router.put("/{expense_id}")
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from ..controllers import exportController as ctl
+from ..utils.compression import choose_encoding
+from ..utils.jwtHandler import get_current_user_id
+
+router = APIRouter()
+
+
+@router.get("")
+async def export_ledger(
+    request: Request,
+    format: str = "ndjson",
+    kinds: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Stream expenses, income, investments and goals as NDJSON or CSV.
+
+    `kinds` is a comma-separated subset (default: all); `start`/`end` bound the
+    entry date and don't apply to goals. Compressed with gzip when the client
+    accepts gzip (`gzip;q=0` refuses it).
+    """
+    fmt = format.lower()
+    if fmt not in ctl.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    selected = ctl.parse_kinds(kinds)
+    # same negotiation as CompressionMiddleware, minus brotli, which the stream doesn't do
+    gzip = choose_encoding(request.headers.get("accept-encoding", ""), brotli_available=False) == "gzip"
+    filename = f"finaura-export-{datetime.now(timezone.utc):%Y%m%d}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        ctl.stream_export(user_id, selected, fmt, start, end, gzip=gzip),
+        media_type=ctl.FORMATS[fmt],
+        headers=headers,
+    )
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from ..controllers import goalController as ctl
 from ..models.goalModel import GoalCreate, GoalUpdate
 from ..utils.jwtHandler import get_current_user_id
-from ..utils.dbConnect import get_db
 from ..utils.notifier import notify
+from ..services.snapshot import UserFinancialSnapshot, get_snapshot
+from ..services.progress_cache import get_progress_cache
 
 router = APIRouter()
 
@@ -36,10 +37,10 @@ async def delete(goal_id: str, user_id: str = Depends(get_current_user_id)):
   return await ctl.delete_goal(user_id, goal_id)
 
 @router.post("/notify-progress")
-async def notify_progress(user_id: str = Depends(get_current_user_id)):
+async def notify_progress(user_id: str = Depends(get_current_user_id), snap: UserFinancialSnapshot = Depends(get_snapshot)):
   # Compute goal progress and notify user with a concise message
-  stats = await ctl.compute_goal_progress(user_id)
-  db = await get_db()
+  stats = await get_progress_cache().get(user_id, snap)
+  db = snap.db
   if stats:
     ahead = stats.get("ahead")
     ahead_by = stats.get("aheadBy")
@@ -55,5 +56,11 @@ async def notify_progress(user_id: str = Depends(get_current_user_id)):
 
 
 @router.get("/progress")
-async def progress(user_id: str = Depends(get_current_user_id)):
-  return await ctl.compute_goal_progress(user_id)
+async def progress(request: Request, response: Response, user_id: str = Depends(get_current_user_id), snap: UserFinancialSnapshot = Depends(get_snapshot)):
+  # Cached per data version; polls with a current If-None-Match get a bodyless 304
+  etag, stats = await get_progress_cache().lookup(user_id, snap, request.headers.get("if-none-match"))
+  headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+  if stats is None:
+    return Response(status_code=304, headers=headers)
+  response.headers.update(headers)
+  return stats
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from ..controllers import investmentController as ctl
 from ..models.investmentModel import InvestmentCreate
 from ..utils.jwtHandler import get_current_user_id
+from ..utils.pagination import PageParams, page_params, page_response
 
 router = APIRouter()
 
@@ -12,8 +13,9 @@ async def create(payload: InvestmentCreate, user_id: str = Depends(get_current_u
 
 
 @router.get("")
-async def list(user_id: str = Depends(get_current_user_id)):
-    return await ctl.list_investments(user_id)
+async def list(page: PageParams = Depends(page_params), user_id: str = Depends(get_current_user_id)):
+    items, next_cursor = await ctl.list_investments(user_id, page)
+    return page_response(items, next_cursor)
 
 
 @router.put("/{inv_id}")
@@ -7,7 +7,8 @@ from ..utils.dbConnect import get_db
 from ..utils.jwtHandler import get_current_user_id, verify_token
 from ..utils.ids import to_obj_id
 from ..utils.serialization import serialize_doc
-from ..utils.realtime import subscribe, unsubscribe, publish
+from ..utils.responses import ORJSONResponse
+from ..utils.realtime import RESYNC, subscribe, unsubscribe, publish
 
 router = APIRouter()
 
@@ -15,8 +16,8 @@ router = APIRouter()
 @router.get("")
 async def list_notifications(user_id: str = Depends(get_current_user_id)):
     db = await get_db()
-    items = [serialize_doc(n) async for n in db["notifications"].find({"userId": user_id}).sort("ts", -1).limit(200)]
-    return items
+    items = await db["notifications"].find({"userId": user_id}).sort("ts", -1).limit(200).to_list(length=200)
+    return ORJSONResponse(items)
 
 
 @router.post("")
@@ -72,6 +73,10 @@ async def notification_stream(token: str):
             while True:
                 item = await q.get()
                 import json
+                if item.get("event") == RESYNC:
+                    # queue overflowed under the coalesce policy; client should refetch
+                    yield f"event: {RESYNC}\ndata: {json.dumps(item)}\n\n"
+                    continue
                 yield f"data: {json.dumps(serialize_doc(item))}\n\n"
         finally:
             unsubscribe(user_id, q)
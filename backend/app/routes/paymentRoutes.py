@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from ..utils.dbConnect import get_db
 from ..utils.ids import to_obj_id
-import stripe
 from ..utils.jwtHandler import get_current_user_id
-from ..utils.payment import create_checkout_session, verify_webhook
+from ..utils.payment import StripeError, create_checkout_session, retrieve_checkout_session, verify_webhook
 from ..utils.notifier import notify
 
 router = APIRouter()
@@ -11,7 +10,10 @@ router = APIRouter()
 
 @router.post("/initiate")
 async def initiate(amount: int, user_id: str = Depends(get_current_user_id)):
-    session = await create_checkout_session(amount_inr_paise=amount, customer_ref=user_id)
+    try:
+        session = await create_checkout_session(amount_inr_paise=amount, customer_ref=user_id)
+    except StripeError as e:
+        raise HTTPException(status_code=502, detail=f"Payment provider error: {e}")
     return session
 
 
@@ -19,14 +21,17 @@ async def initiate(amount: int, user_id: str = Depends(get_current_user_id)):
 async def webhook(request: Request):
     payload = await request.body()
     sig = request.headers.get('stripe-signature', '')
-    event = verify_webhook(sig, payload)
+    try:
+        event = verify_webhook(sig, payload)
+    except StripeError as e:
+        raise HTTPException(status_code=e.status or 400, detail=str(e))
     # Handle a subset of events
     if event['type'] == 'checkout.session.completed':
         # Credit user's wallet
         db = await get_db()
         users = db.get_collection("users")
         session = event['data']['object']
-        user_id = session.get('metadata', {}).get('userId')
+        user_id = (session.get('metadata') or {}).get('userId')
         amount_total = int(session.get('amount_total') or 0)  # paise
         if user_id and amount_total > 0:
             rupees = amount_total // 100
@@ -47,11 +52,11 @@ async def confirm(session_id: str, user_id: str = Depends(get_current_user_id)):
     db = await get_db()
     users = db.get_collection("users")
     try:
-        s = stripe.checkout.Session.retrieve(session_id)
+        s = await retrieve_checkout_session(session_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid session")
     if (s.get('payment_status') == 'paid'):
-        meta_uid = s.get('metadata', {}).get('userId')
+        meta_uid = (s.get('metadata') or {}).get('userId')
         if meta_uid == user_id:
             amount_total = int(s.get('amount_total') or 0)
             rupees = amount_total // 100
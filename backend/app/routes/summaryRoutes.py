@@ -0,0 +1,17 @@
+import asyncio
+
+from fastapi import APIRouter, Depends
+from ..controllers.investmentController import summarize_investments
+from ..services.snapshot import UserFinancialSnapshot, get_snapshot
+
+router = APIRouter()
+
+
+@router.get("")
+async def summary(snap: UserFinancialSnapshot = Depends(get_snapshot)):
+    """Ledger totals from the rollups plus the investment breakdown.
+
+    Dashboards chart these instead of downloading every entry.
+    """
+    ledger, investments = await asyncio.gather(snap.ledger(), summarize_investments(snap.db, snap.user_id))
+    return {**ledger, "investments": investments}
@@ -1,19 +1,517 @@
+"""In-process scheduler for the nightly per-user jobs.
+
+Each job has a cron schedule (UTC) and a batch handler. When the schedule
+fires, every worker waits a random jitter and then joins the same run:
+
+- The user base is split into `_id` ranges (shards). Boundaries are sampled
+  once per run and stored in `scheduler_leases`, so every worker agrees on
+  them.
+- A worker claims a shard by inserting its lease document. An expired lease
+  can be taken over. So each shard is processed by one worker at a time.
+  Workers stay in the run until every shard's lease is done, retrying held
+  shards as their leases expire, so a crashed or stalled worker's shard is
+  picked up after SCHEDULER_LEASE_SECONDS.
+- Inside a shard, users are read in `_id` order through the `_id` index,
+  SCHEDULER_BATCH_SIZE at a time. After each batch the lease is renewed and
+  the last `_id` is checkpointed, so a takeover resumes where the last owner
+  stopped.
+- A worker runs at most `concurrency` shards of a job at once. Per-user
+  handlers (`each_user`) cap the users in flight within a batch.
+
+Run timings and counters are reported under "scheduler" in `/health/stats`.
+Start the scheduler with SCHEDULER_ENABLED=true, or run one pass by hand:
+
+    python -m app.scheduler --run goal-progress forecasts
+"""
+
 from __future__ import annotations
 
 import asyncio
-from .utils.llm_connector import LLMClient
-from .services.memory_db import MemoryDB
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
 from .utils.dbConnect import get_db
-from .agents.goal_tracking import GoalTrackingAgent
-from .agents.notification_agent import NotificationAgent
-
-
-async def run_scheduled_jobs():
-    db = await get_db()
-    llm = LLMClient()
-    mem = MemoryDB()
-    goal = GoalTrackingAgent(db=db, llm=llm, memory=mem)
-    notif = NotificationAgent(db=db, llm=llm, memory=mem)
-    # This is a no-op stub; plug a real scheduler like APScheduler or Celery
-    await goal.run({}, user_id=None)
-    await notif.run({}, user_id=None)
+from .utils.env import env_flag, env_int
+from .utils.ids import to_obj_id
+from .utils.notifier import notify
+from .services import forecasting, ledger_rollups, progress_cache
+
+logger = logging.getLogger(__name__)
+
+LEASES = "scheduler_leases"
+
+_SCHEDULER: Optional["Scheduler"] = None
+
+# handler(db, user_ids) -> number of users that failed (or None)
+Handler = Callable[[Any, List[str]], Awaitable[Optional[int]]]
+
+
+# --- cron -------------------------------------------------------------------
+
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+# (low, high) for minute, hour, day of month, month, day of week
+_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_field(text: str, lo: int, hi: int) -> frozenset:
+    values = set()
+    for part in text.split(","):
+        rng, _, step = part.partition("/")
+        step_n = int(step) if step else 1
+        if rng == "*":
+            a, b = lo, hi
+        elif "-" in rng:
+            a, b = (int(x) for x in rng.split("-", 1))
+        else:
+            a = int(rng)
+            b = hi if step else a
+        if step_n < 1 or not (lo <= a <= b <= hi):
+            raise ValueError(f"invalid cron field {text!r}")
+        values.update(range(a, b + 1, step_n))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week)."""
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        parts = _ALIASES.get(expr.strip(), expr).split()
+        if len(parts) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        fields = [_parse_field(p, lo, hi) for p, (lo, hi) in zip(parts, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        # 0 and 7 are both Sunday
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        # as in cron, a restricted day-of-month OR day-of-week matches
+        self._either_day = parts[2] != "*" and parts[4] != "*"
+
+    def _day_matches(self, t: datetime) -> bool:
+        dom = t.day in self.days
+        dow = (t.weekday() + 1) % 7 in self.weekdays
+        return (dom or dow) if self._either_day else (dom and dow)
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`."""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron expression never fires: {self.expr!r}")
+
+
+# --- jobs -------------------------------------------------------------------
+
+@dataclass
+class Job:
+    name: str
+    cron: CronSchedule
+    handler: Handler
+    shards: int = 16
+    batch_size: int = 500
+    concurrency: int = 4  # shards of this job one worker runs at once
+    jitter: float = 60.0  # seconds
+    lease_seconds: float = 300.0
+    batch_timeout: float = 120.0
+    poll_seconds: float = 5.0  # how often to recheck shards held by other workers
+
+
+def each_user(fn: Callable[[Any, str], Awaitable[Any]], limit: int = 16) -> Handler:
+    """Turn a per-user coroutine into a batch handler with at most `limit` users in flight."""
+
+    async def handler(db, user_ids: List[str]) -> int:
+        sem = asyncio.Semaphore(max(1, limit))
+
+        async def one(uid: str) -> int:
+            async with sem:
+                try:
+                    await fn(db, uid)
+                    return 0
+                except Exception:
+                    logger.exception("Scheduled job failed for user %s", uid)
+                    return 1
+
+        return sum(await asyncio.gather(*(one(u) for u in user_ids)))
+
+    return handler
+
+
+class JobMetrics:
+    def __init__(self):
+        self.runs = 0
+        self.running = 0
+        self.failed_runs = 0
+        self.users = 0
+        self.user_errors = 0
+        self.batches = 0
+        self.batch_errors = 0
+        self.shards_run = 0
+        self.shards_skipped = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._batch_ms: deque = deque(maxlen=1024)
+
+    def record_batch(self, ms: float, users: int, failed: int, error: bool):
+        self.batches += 1
+        self.users += users
+        self.user_errors += failed
+        self.batch_errors += int(error)
+        self._batch_ms.append(ms)
+
+    def stats(self) -> Dict[str, Any]:
+        ms = sorted(self._batch_ms)
+        pick = lambda q: round(ms[min(len(ms) - 1, int(len(ms) * q))], 1) if ms else None
+        return {
+            "runs": self.runs,
+            "running": self.running,
+            "failedRuns": self.failed_runs,
+            "users": self.users,
+            "userErrors": self.user_errors,
+            "batches": self.batches,
+            "batchErrors": self.batch_errors,
+            "shardsRun": self.shards_run,
+            "shardsSkipped": self.shards_skipped,
+            "batchP50Ms": pick(0.5),
+            "batchP95Ms": pick(0.95),
+            "lastRun": self.last_run,
+        }
+
+
+# --- scheduler --------------------------------------------------------------
+
+class Scheduler:
+    def __init__(self, jobs: List[Job], *, owner: Optional[str] = None):
+        self.jobs = {j.name: j for j in jobs}
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.metrics = {j.name: JobMetrics() for j in jobs}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _loop(self, job: Job):
+        while True:
+            fire = job.cron.next_after(datetime.utcnow())
+            delay = (fire - datetime.utcnow()).total_seconds()
+            # jitter spreads workers out so they don't all hit Mongo on the same second
+            await asyncio.sleep(max(0.0, delay) + random.uniform(0, job.jitter))
+            try:
+                await self.run_job(job.name, fire)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scheduled run of %s failed", job.name)
+
+    async def run_job(self, name: str, fire: Optional[datetime] = None, db=None) -> Dict[str, Any]:
+        """Take part in the run of `name` for `fire` (default: now). Returns this worker's share."""
+        job = self.jobs[name]
+        db = db if db is not None else await get_db()
+        fire = (fire or datetime.utcnow()).replace(second=0, microsecond=0)
+        run = f"{job.name}@{fire:%Y-%m-%dT%H:%M}"
+        m = self.metrics[name]
+        m.runs += 1
+        m.running += 1
+        started = datetime.utcnow()
+        t0 = time.perf_counter()
+        try:
+            bounds = await self._plan(db, run, job.shards)
+            edges = [None, *bounds, None]
+            shards = [(i, edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+            # workers start on different shards instead of queueing on the same lease
+            random.shuffle(shards)
+            sem = asyncio.Semaphore(max(1, job.concurrency))
+
+            async def guarded(shard):
+                async with sem:
+                    return shard[0], await self._run_shard(db, job, run, *shard)
+
+            ran: set = set()
+            users = errors = 0
+            pending = shards
+            while True:
+                for shard, result in await asyncio.gather(*(guarded(s) for s in pending)):
+                    if result is not None:
+                        ran.add(shard)
+                        users += result[0]
+                        errors += result[1]
+                # shards held by other workers: wait for them to finish, or take
+                # over once a lease expires (its owner died or stalled)
+                pending, wait = await self._unfinished(db, run, pending, job.lease_seconds)
+                if not pending:
+                    break
+                await asyncio.sleep(min(wait, job.poll_seconds))
+        except Exception:
+            m.failed_runs += 1
+            raise
+        finally:
+            m.running -= 1
+        m.shards_skipped += len(shards) - len(ran)
+        summary = {
+            "run": run,
+            "startedAt": started.isoformat(),
+            "durationMs": round((time.perf_counter() - t0) * 1000, 1),
+            "shards": len(ran),
+            "skipped": len(shards) - len(ran),
+            "users": users,
+            "errors": errors,
+        }
+        m.last_run = summary
+        logger.info("Scheduled run %s: %s", run, summary)
+        return summary
+
+    async def _plan(self, db, run: str, shards: int) -> List[Any]:
+        """Shard boundaries for `run`; the first worker samples them, the rest read them."""
+        from pymongo.errors import DuplicateKeyError
+
+        existing = await db[LEASES].find_one({"_id": run})
+        if existing is not None:
+            return list(existing.get("bounds") or [])
+        ids = sorted([d["_id"] async for d in db["users"].aggregate([
+            {"$sample": {"size": max(1, shards) * 32}},
+            {"$project": {"_id": 1}},
+        ])])
+        bounds: List[Any] = []
+        for k in range(1, max(1, shards)):
+            b = ids[len(ids) * k // shards] if ids else None
+            if b is not None and (not bounds or b > bounds[-1]):
+                bounds.append(b)
+        try:
+            await db[LEASES].insert_one({"_id": run, "bounds": bounds, "createdAt": datetime.utcnow()})
+        except DuplicateKeyError:
+            # another worker planned first; use its boundaries
+            bounds = list((await db[LEASES].find_one({"_id": run}) or {}).get("bounds") or [])
+        return bounds
+
+    async def _unfinished(self, db, run: str, shards: List[tuple], ttl: float) -> Tuple[List[tuple], float]:
+        """Shards of `run` not yet done, and how long to wait before the next try."""
+        keys = {f"{run}#{s[0]}": s for s in shards}
+        leases = {d["_id"]: d async for d in db[LEASES].find({"_id": {"$in": list(keys)}})}
+        pending = [s for k, s in keys.items() if not leases.get(k, {}).get("done")]
+        now = datetime.utcnow()
+        wait = ttl
+        for shard, *_ in pending:
+            expires = leases.get(f"{run}#{shard}", {}).get("expiresAt")
+            wait = min(wait, (expires - now).total_seconds() if expires else 0.0)
+        # a little past the expiry, so the takeover's `$lte now` matches
+        return pending, max(0.0, wait) + 0.05
+
+    async def _acquire(self, db, key: str, run: str, shard: int, ttl: float) -> Optional[dict]:
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.utcnow()
+        doc = {
+            "_id": key,
+            "run": run,
+            "shard": shard,
+            "owner": self.owner,
+            "expiresAt": now + timedelta(seconds=ttl),
+            "done": False,
+            "lastId": None,
+            "processed": 0,
+            "createdAt": now,
+        }
+        try:
+            await db[LEASES].insert_one(doc)
+            return doc
+        except DuplicateKeyError:
+            pass
+        return await db[LEASES].find_one_and_update(
+            {"_id": key, "done": False, "expiresAt": {"$lte": now}},
+            {"$set": {"owner": self.owner, "expiresAt": now + timedelta(seconds=ttl)}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _run_shard(self, db, job: Job, run: str, shard: int, lo: Any, hi: Any) -> Optional[Tuple[int, int]]:
+        """Process one shard if its lease is free; returns (users, failed users) or None if skipped."""
+        m = self.metrics[job.name]
+        key = f"{run}#{shard}"
+        lease = await self._acquire(db, key, run, shard, job.lease_seconds)
+        if lease is None:
+            return None
+        m.shards_run += 1
+        last = lease.get("lastId")
+        processed = int(lease.get("processed") or 0)
+        users = failed = 0
+        while True:
+            cond: Dict[str, Any] = {}
+            if lo is not None:
+                cond["$gte"] = lo
+            if hi is not None:
+                cond["$lt"] = hi
+            if last is not None:
+                cond["$gt"] = last
+            cursor = db["users"].find({"_id": cond} if cond else {}, {"_id": 1}).sort("_id", 1).limit(job.batch_size)
+            ids = [d["_id"] async for d in cursor]
+            if not ids:
+                break
+            t0 = time.perf_counter()
+            error = False
+            bad = 0
+            try:
+                bad = await asyncio.wait_for(job.handler(db, [str(i) for i in ids]), job.batch_timeout) or 0
+            except asyncio.TimeoutError:
+                error, bad = True, len(ids)
+                logger.warning("%s: batch after %s timed out", key, last)
+            except Exception:
+                error, bad = True, len(ids)
+                logger.exception("%s: batch after %s failed", key, last)
+            m.record_batch((time.perf_counter() - t0) * 1000, len(ids), bad, error)
+            users += len(ids)
+            failed += bad
+            last = ids[-1]
+            processed += len(ids)
+            renewed = await db[LEASES].update_one(
+                {"_id": key, "owner": self.owner},
+                {"$set": {"lastId": last, "processed": processed, "expiresAt": datetime.utcnow() + timedelta(seconds=job.lease_seconds)}},
+            )
+            if renewed.matched_count == 0:
+                logger.warning("%s: lease lost to another worker", key)
+                return users, failed
+            if len(ids) < job.batch_size:
+                break
+        await db[LEASES].update_one(
+            {"_id": key, "owner": self.owner},
+            {"$set": {"done": True, "finishedAt": datetime.utcnow()}},
+        )
+        return users, failed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "running": self.running,
+            "jobs": {name: {"cron": job.cron.expr, **self.metrics[name].stats()} for name, job in self.jobs.items()},
+        }
+
+
+# --- nightly jobs -----------------------------------------------------------
+
+async def _goal_progress(db, user_id: str):
+    """Store the goal's progress and remind users who are behind schedule."""
+    from .controllers.goalController import compute_goal_progress
+    from .services.snapshot import UserFinancialSnapshot
+
+    try:
+        stats = await compute_goal_progress(user_id, UserFinancialSnapshot(db, user_id))
+    except HTTPException:
+        # no goal, or one without a target: nothing to track
+        return
+    goal = stats["goal"]
+    await db["goals"].update_one(
+        {"_id": to_obj_id(goal["_id"])},
+        {"$set": {"progress": stats["progressPercent"], "progressUpdatedAt": datetime.utcnow().isoformat()}},
+    )
+    # the goal document is part of the cached progress response
+    await progress_cache.bump(db, user_id)
+    if stats["ahead"] or stats["progressPercent"] >= 100:
+        return
+    try:
+        await notify(
+            db, user_id, type="goal", title="Goal Reminder",
+            text=f"Behind by ₹{stats['aheadBy']} • save ₹{stats['suggestedMonthly']}/month to reach '{goal.get('name')}'",
+        )
+    except Exception:
+        pass
+
+
+def goal_progress_handler(limit: int = 16) -> Handler:
+    per_user = each_user(_goal_progress, limit)
+
+    async def handler(db, user_ids: List[str]) -> int:
+        # one indexed query per batch instead of a goal lookup for every user
+        with_goals = set(await db["goals"].distinct("userId", {"userId": {"$in": user_ids}}))
+        return await per_user(db, [u for u in user_ids if u in with_goals])
+
+    return handler
+
+
+async def _forecasts(db, user_ids: List[str]) -> int:
+    await forecasting.store_forecasts(db, user_ids)
+    return 0
+
+
+async def _ledger_repair(db, user_ids: List[str]) -> int:
+    await ledger_rollups.repair(db, user_ids)
+    return 0
+
+
+def default_jobs() -> List[Job]:
+    common = dict(
+        shards=env_int("SCHEDULER_SHARDS", 16),
+        batch_size=env_int("SCHEDULER_BATCH_SIZE", 500),
+        concurrency=env_int("SCHEDULER_CONCURRENCY", 4),
+        jitter=float(env_int("SCHEDULER_JITTER_SECONDS", 60)),
+        lease_seconds=float(env_int("SCHEDULER_LEASE_SECONDS", 300)),
+        batch_timeout=float(env_int("SCHEDULER_BATCH_TIMEOUT", 120)),
+    )
+    return [
+        Job("goal-progress", CronSchedule(os.getenv("SCHEDULER_GOALS_CRON", "0 2 * * *")),
+            goal_progress_handler(env_int("SCHEDULER_USER_CONCURRENCY", 16)), **common),
+        Job("forecasts", CronSchedule(os.getenv("SCHEDULER_FORECASTS_CRON", "30 2 * * *")), _forecasts, **common),
+        Job("ledger-repair", CronSchedule(os.getenv("SCHEDULER_LEDGER_REPAIR_CRON", "0 1 * * *")), _ledger_repair, **common),
+    ]
+
+
+def get_scheduler() -> Scheduler:
+    """Return the per-process scheduler configured from env."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = Scheduler(default_jobs())
+    return _SCHEDULER
+
+
+def scheduler_enabled() -> bool:
+    return env_flag("SCHEDULER_ENABLED")
+
+
+async def run_scheduled_jobs(names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the given jobs (default: all) once, now."""
+    scheduler = get_scheduler()
+    return {name: await scheduler.run_job(name) for name in (names or list(scheduler.jobs))}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Run scheduled jobs once")
+    ap.add_argument("--run", nargs="*", metavar="JOB", help="jobs to run (default: all)")
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(run_scheduled_jobs(args.run or None)), indent=2))
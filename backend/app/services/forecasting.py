@@ -0,0 +1,213 @@
+"""Per-category expense forecasts from the ledger rollups.
+
+For each user the expense buckets in `ledger_rollups` become a month x
+category matrix (plus a total column) over the complete months before
+`as_of`. Every column is fitted at once with one `np.linalg.lstsq` call on a
+shared design matrix:
+
+- intercept only with fewer than 3 months of history,
+- intercept + linear trend from 3 months,
+- trend + yearly seasonality (one sin/cos harmonic) from 12 months.
+
+The forecast for `as_of` comes with a prediction interval from the residual
+variance. In batch mode, users whose history has the same length share one
+design matrix, so their columns are stacked and solved together. That is one
+`lstsq` per distinct history length, not one fit per user or category.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.lazy import lazy_import
+from .ledger_rollups import COL as ROLLUPS
+
+np = lazy_import("numpy")
+
+COL = "forecasts"
+
+HISTORY_MONTHS = 24
+TOTAL = "__total__"
+# two-sided 90% normal quantile
+Z90 = 1.6449
+
+
+def _month_index(month: str) -> Optional[int]:
+    try:
+        y, m = month.split("-")[:2]
+        return int(y) * 12 + int(m) - 1
+    except (ValueError, AttributeError):
+        return None
+
+
+def _month_label(index: int) -> str:
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def current_month() -> str:
+    now = datetime.utcnow()
+    return f"{now.year}-{now.month:02d}"
+
+
+def design_matrix(first: int, periods: int) -> Tuple[np.ndarray, np.ndarray, str]:
+    """(X for the history, x row for the next month, model name) for `periods` months from `first`."""
+    t = np.arange(periods + 1, dtype=float)
+    cols = [np.ones(periods + 1)]
+    model = "mean"
+    if periods >= 3:
+        cols.append(t - t[:periods].mean())
+        model = "trend"
+    if periods >= 12:
+        angle = 2 * np.pi * ((first + t) % 12) / 12
+        cols += [np.sin(angle), np.cos(angle)]
+        model = "trend+seasonal"
+    full = np.column_stack(cols)
+    return full[:periods], full[periods], model
+
+
+def fit(X: np.ndarray, x_next: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares fit of every column of Y; returns (predictions, standard errors)."""
+    beta, _, rank, _ = np.linalg.lstsq(X, Y, rcond=None)
+    pred = x_next @ beta
+    n, p = X.shape
+    dof = n - rank
+    if dof > 0:
+        resid = Y - X @ beta
+        sigma2 = (resid ** 2).sum(axis=0) / dof
+        leverage = float(x_next @ np.linalg.pinv(X.T @ X) @ x_next)
+        se = np.sqrt(sigma2 * (1.0 + leverage))
+    else:
+        # no residual degrees of freedom: fall back to the spread of the history
+        se = Y.std(axis=0) if n > 1 else np.abs(pred) * 0.5
+    return pred, se
+
+
+def build_matrix(buckets: Iterable[dict], as_of: str, history: int = HISTORY_MONTHS) -> Optional[Tuple[int, List[str], np.ndarray]]:
+    """(first month index, categories, month x category totals) for complete months before `as_of`."""
+    end = _month_index(as_of)
+    if end is None:
+        return None
+    cells: Dict[Tuple[int, str], float] = {}
+    for b in buckets:
+        idx = _month_index(b.get("month", ""))
+        if idx is None or not (end - history <= idx < end):
+            continue
+        key = (idx, str(b.get("category") or "Other"))
+        cells[key] = cells.get(key, 0.0) + float(b.get("total") or 0)
+    if not cells:
+        return None
+    first = min(i for i, _ in cells)
+    cats = sorted({c for _, c in cells})
+    col = {c: j for j, c in enumerate(cats)}
+    Y = np.zeros((end - first, len(cats) + 1))
+    for (i, c), v in cells.items():
+        Y[i - first, col[c]] = v
+    Y[:, -1] = Y[:, :-1].sum(axis=1)
+    return first, cats + [TOTAL], Y
+
+
+def _interval(pred: float, se: float) -> Dict[str, float]:
+    p = max(float(pred), 0.0)
+    return {
+        "prediction": round(p, 2),
+        "lower": round(max(float(pred - Z90 * se), 0.0), 2),
+        "upper": round(max(float(pred + Z90 * se), p), 2),
+    }
+
+
+def forecast_matrices(mats: Dict[str, Tuple[int, List[str], np.ndarray]], as_of: str) -> Dict[str, Dict[str, Any]]:
+    """Forecast many users, solving users with equal history length in one lstsq."""
+    groups: Dict[int, List[str]] = {}
+    end = _month_index(as_of)
+    for uid, (_, _, Y) in mats.items():
+        # histories all end at `as_of`, so equal length means an identical design matrix
+        groups.setdefault(Y.shape[0], []).append(uid)
+    out: Dict[str, Dict[str, Any]] = {}
+    for periods, uids in groups.items():
+        X, x_next, model = design_matrix(end - periods, periods)
+        stacked = np.hstack([mats[u][2] for u in uids])
+        pred, se = fit(X, x_next, stacked)
+        offset = 0
+        for uid in uids:
+            _, cats, Y = mats[uid]
+            width = Y.shape[1]
+            p, s = pred[offset:offset + width], se[offset:offset + width]
+            offset += width
+            out[uid] = {
+                "month": as_of,
+                "model": model,
+                "historyMonths": periods,
+                "total": _interval(p[-1], s[-1]),
+                "categories": {c: _interval(p[j], s[j]) for j, c in enumerate(cats[:-1])},
+            }
+    return out
+
+
+def empty_forecast(as_of: str) -> Dict[str, Any]:
+    return {
+        "month": as_of,
+        "model": "none",
+        "historyMonths": 0,
+        "total": {"prediction": 0.0, "lower": 0.0, "upper": 0.0},
+        "categories": {},
+    }
+
+
+async def forecast_users(db, user_ids: List[str], as_of: Optional[str] = None, history: int = HISTORY_MONTHS) -> Dict[str, Dict[str, Any]]:
+    """Next-month (`as_of`, default the current month) expense forecasts for many users."""
+    as_of = as_of or current_month()
+    end = _month_index(as_of) or 0
+    first_month = _month_label(end - history)
+    by_user: Dict[str, List[dict]] = {u: [] for u in user_ids}
+    cursor = db[ROLLUPS].find(
+        {"userId": {"$in": list(user_ids)}, "kind": "expense", "count": {"$gt": 0}, "month": {"$gte": first_month, "$lt": as_of}},
+        {"_id": 0, "userId": 1, "month": 1, "category": 1, "total": 1},
+    )
+    async for b in cursor:
+        by_user.setdefault(b["userId"], []).append(b)
+    mats = {}
+    for uid, buckets in by_user.items():
+        m = build_matrix(buckets, as_of, history)
+        if m is not None:
+            mats[uid] = m
+    out = forecast_matrices(mats, as_of)
+    return {uid: out.get(uid) or empty_forecast(as_of) for uid in user_ids}
+
+
+async def forecast_user(db, user_id: str, as_of: Optional[str] = None) -> Dict[str, Any]:
+    return (await forecast_users(db, [user_id], as_of))[user_id]
+
+
+async def store_forecasts(db, user_ids: List[str], as_of: Optional[str] = None) -> int:
+    """Compute and upsert forecasts for one batch of users; returns the number written."""
+    from pymongo import UpdateOne
+
+    results = await forecast_users(db, user_ids, as_of)
+    ops = [
+        UpdateOne({"userId": uid}, {"$set": {**fc, "userId": uid, "updatedAt": datetime.utcnow()}}, upsert=True)
+        for uid, fc in results.items()
+    ]
+    if ops:
+        await db[COL].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def refresh_forecasts(db, batch_size: int = 500, as_of: Optional[str] = None) -> Dict[str, int]:
+    """Recompute and store every user's forecast in `forecasts`, `batch_size` users at a time.
+
+    The nightly run goes through the sharded scheduler (app/scheduler.py);
+    this single pass is for scripts and small deployments.
+    """
+    as_of = as_of or current_month()
+    users = written = 0
+    batch: List[str] = []
+    async for u in db["users"].find({}, {"_id": 1}):
+        batch.append(str(u["_id"]))
+        users += 1
+        if len(batch) >= batch_size:
+            written += await store_forecasts(db, batch, as_of)
+            batch = []
+    if batch:
+        written += await store_forecasts(db, batch, as_of)
+    return {"users": users, "written": written}
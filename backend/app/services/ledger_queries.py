@@ -0,0 +1,147 @@
+"""Aggregation pipelines for ledger analytics.
+
+Everything here runs server-side with `$match`/`$group`/`$facet` so callers
+receive a few dozen grouped numbers instead of streaming every income and
+expense document across the wire.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+
+# kind -> (source collection, field used as the bucket category)
+SOURCES = {
+    "expense": ("expenses", "category"),
+    "income": ("income", "source"),
+}
+
+
+# A date string starting "YYYY-MM" with a real month. `ledger_rollups.month_key`
+# applies the same pattern in Python, so rollups and raw aggregations agree.
+MONTH_PATTERN = r"^[0-9]{4}-(0[1-9]|1[0-2])"
+
+
+def month_expr(field: str = "$date") -> dict:
+    """YYYY-MM prefix of an ISO date string, or "Unknown" when it doesn't look like one."""
+    as_str = {"$toString": {"$ifNull": [field, ""]}}
+    return {
+        "$cond": [
+            {"$regexMatch": {"input": as_str, "regex": MONTH_PATTERN}},
+            # the pattern guarantees an ASCII prefix, so byte and code point offsets agree
+            {"$substr": [as_str, 0, 7]},
+            "Unknown",
+        ]
+    }
+
+
+def _category_expr(field: str) -> dict:
+    return {
+        "$let": {
+            "vars": {"c": {"$toString": {"$ifNull": [field, ""]}}},
+            "in": {"$cond": [{"$eq": ["$$c", ""]}, "Other", "$$c"]},
+        }
+    }
+
+
+def _amount_expr() -> dict:
+    return {"$convert": {"input": "$amount", "to": "double", "onError": 0.0, "onNull": 0.0}}
+
+
+def entry_stages(kind: str, match: dict) -> List[dict]:
+    """Stages projecting raw `kind` documents to {userId, kind, month, category, amount}."""
+    _, cat_field = SOURCES[kind]
+    return [
+        {"$match": match},
+        {"$project": {
+            "_id": 0,
+            "userId": 1,
+            "kind": {"$literal": kind},
+            "month": month_expr(),
+            "category": _category_expr(f"${cat_field}"),
+            "amount": _amount_expr(),
+        }},
+    ]
+
+
+def summary_facet(amount_field: str = "$amount") -> dict:
+    """`$facet` stage grouping {kind, month, category} rows by month and by category."""
+    return {"$facet": {
+        "byMonth": [
+            {"$group": {"_id": {"kind": "$kind", "month": "$month"}, "total": {"$sum": amount_field}}},
+        ],
+        "byCategory": [
+            {"$group": {"_id": {"kind": "$kind", "category": "$category"}, "total": {"$sum": amount_field}}},
+        ],
+    }}
+
+
+def raw_summary_pipeline(user_id: str) -> List[dict]:
+    """Single pipeline over `expenses` that unions `income` and facets both.
+
+    Run it against the expenses collection.
+    """
+    match = {"userId": user_id}
+    income_col, _ = SOURCES["income"]
+    return [
+        *entry_stages("expense", match),
+        {"$unionWith": {"coll": income_col, "pipeline": entry_stages("income", match)}},
+        summary_facet(),
+    ]
+
+
+def rollup_pipeline(kind: str, match: dict) -> List[dict]:
+    """Group raw `kind` documents into ledger rollup buckets."""
+    return [
+        *entry_stages(kind, match),
+        {"$group": {
+            "_id": {"userId": "$userId", "month": "$month", "category": "$category"},
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "userId": "$_id.userId",
+            "month": "$_id.month",
+            "kind": {"$literal": kind},
+            "category": "$_id.category",
+            "total": 1,
+            "count": 1,
+        }},
+    ]
+
+
+def empty_summary() -> Dict[str, Any]:
+    return {
+        "incomeByMonth": {},
+        "expenseByMonth": {},
+        "incomeBySource": {},
+        "expenseByCategory": {},
+        "totalIncome": 0.0,
+        "totalExpense": 0.0,
+    }
+
+
+def shape_summary(facet: dict | None) -> Dict[str, Any]:
+    """Turn a `summary_facet` result document into the summary dict used by controllers."""
+    out = empty_summary()
+    by_month = {"income": out["incomeByMonth"], "expense": out["expenseByMonth"]}
+    by_cat = {"income": out["incomeBySource"], "expense": out["expenseByCategory"]}
+    for row in (facet or {}).get("byMonth", []):
+        key = row.get("_id") or {}
+        if key.get("kind") in by_month:
+            by_month[key["kind"]][key.get("month")] = float(row.get("total") or 0)
+    for row in (facet or {}).get("byCategory", []):
+        key = row.get("_id") or {}
+        if key.get("kind") in by_cat:
+            by_cat[key["kind"]][key.get("category")] = float(row.get("total") or 0)
+    out["totalIncome"] = sum(out["incomeByMonth"].values())
+    out["totalExpense"] = sum(out["expenseByMonth"].values())
+    return out
+
+
+async def raw_summary(db, user_id: str) -> Dict[str, Any]:
+    """Ledger summary computed straight from the raw collections in one round trip."""
+    expense_col, _ = SOURCES["expense"]
+    rows = await db[expense_col].aggregate(raw_summary_pipeline(user_id)).to_list(length=1)
+    return shape_summary(rows[0] if rows else None)
@@ -0,0 +1,249 @@
+"""Per-user monthly ledger rollups.
+
+One document per (userId, month, kind, category) holding the running `total`
+and `count` of the matching income/expense entries. The expense and income
+controllers keep it in sync with `$inc` upserts on every write, so analytics
+can read a few hundred small buckets instead of re-scanning the full history.
+
+Consistency: on a replica set or sharded cluster the controllers run the
+entry write and its rollup `$inc` in one transaction (`transaction()`), so
+both land or neither does. A standalone server has no transactions: if the
+rollup update fails after the entry was written, the user is recorded in
+`ledger_rollup_repairs` and the nightly `ledger-repair` scheduler job (or
+`--repair`) rebuilds their buckets from the raw collections.
+LEDGER_TRANSACTIONS=false turns transactions off.
+
+Rebuild or backfill from the raw collections with:
+
+    python -m app.services.ledger_rollups --rebuild [--user USER_ID]
+    python -m app.services.ledger_rollups --repair
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.lazy import lazy_import
+from .ledger_queries import MONTH_PATTERN, SOURCES, rollup_pipeline, shape_summary, summary_facet
+
+
+COL = "ledger_rollups"
+REPAIRS = "ledger_rollup_repairs"
+
+logger = logging.getLogger(__name__)
+
+pymongo = lazy_import("pymongo")
+
+# id(client) -> whether the deployment supports multi-document transactions
+_TRANSACTIONS: Dict[int, bool] = {}
+
+_MONTH = re.compile(MONTH_PATTERN)
+
+
+def month_key(date_str: str) -> str:
+    """Return the YYYY-MM bucket of an ISO-ish date string, or "Unknown".
+
+    Mirrors `ledger_queries.month_expr` so a rollup and a raw aggregation
+    put the same entry in the same month.
+    """
+    s = "" if date_str is None else str(date_str)
+    return s[:7] if _MONTH.match(s) else "Unknown"
+
+
+def bucket_of(kind: str, doc: Optional[dict]) -> Optional[Tuple[str, str, float]]:
+    """Map a ledger document to its (month, category, amount) bucket."""
+    if not doc:
+        return None
+    _, cat_field = SOURCES[kind]
+    try:
+        amount = float(doc.get("amount") or 0)
+    except (TypeError, ValueError):
+        amount = 0.0
+    category = str(doc.get(cat_field) or "Other")
+    return month_key(doc.get("date", "")), category, amount
+
+
+def _inc_op(user_id: str, kind: str, bucket: Tuple[str, str, float], sign: int) -> "pymongo.UpdateOne":
+    month, category, amount = bucket
+    return pymongo.UpdateOne(
+        {"userId": user_id, "month": month, "kind": kind, "category": category},
+        {"$inc": {"total": sign * amount, "count": sign}},
+        upsert=True,
+    )
+
+
+async def supports_transactions(db) -> bool:
+    """True on a replica set or sharded cluster; checked once per client."""
+    key = id(db.client)
+    if key not in _TRANSACTIONS:
+        try:
+            hello = await db.command("hello")
+            _TRANSACTIONS[key] = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        except Exception:
+            # writes fall back to repair markers rather than probing again on every write
+            logger.warning("Could not detect transaction support; ledger writes run without transactions", exc_info=True)
+            _TRANSACTIONS[key] = False
+    return _TRANSACTIONS[key]
+
+
+@asynccontextmanager
+async def transaction(db) -> AsyncIterator[Optional[Any]]:
+    """Yield a session with an open transaction, or None where there are none.
+
+    Pass the session to the entry write and to `record` so both commit
+    together; without one, `record` falls back to marking the user for repair.
+    """
+    if os.getenv("LEDGER_TRANSACTIONS", "true").lower() in ("0", "false", "no") or not await supports_transactions(db):
+        yield None
+        return
+    async with await db.client.start_session() as session:
+        async with session.start_transaction():
+            yield session
+
+
+async def mark_for_repair(db, user_id: str, kind: str, error: Exception):
+    logger.exception("Ledger rollup update failed for user %s (%s); marked for repair", user_id, kind)
+    try:
+        await db[REPAIRS].insert_one({"userId": user_id, "kind": kind, "error": str(error), "at": datetime.utcnow()})
+    except Exception:
+        logger.exception("Could not mark ledger rollups of user %s for repair", user_id)
+
+
+async def _apply(db, user_id: str, kind: str, ops: list, ordered: bool, session):
+    try:
+        await db[COL].bulk_write(ops, ordered=ordered, session=session)
+    except Exception as e:
+        if session is not None:
+            raise  # aborts the transaction, entry write included
+        # the entry write is already durable; leave the buckets to the repair job
+        await mark_for_repair(db, user_id, kind, e)
+
+
+async def record(db, user_id: str, kind: str, before: Optional[dict] = None, after: Optional[dict] = None, session=None):
+    """Move an entry's contribution from its `before` bucket to its `after` bucket.
+
+    - create: record(db, uid, kind, after=doc)
+    - update: record(db, uid, kind, before=old_doc, after=new_doc)
+    - delete: record(db, uid, kind, before=old_doc)
+    """
+    old = bucket_of(kind, before)
+    new = bucket_of(kind, after)
+    if old == new:
+        return
+    ops = []
+    if old:
+        ops.append(_inc_op(user_id, kind, old, -1))
+    if new:
+        ops.append(_inc_op(user_id, kind, new, 1))
+    await _apply(db, user_id, kind, ops, True, session)
+
+
+async def record_many(db, user_id: str, kind: str, docs: Iterable[dict]):
+    """Add many new entries at once with one `$inc` per touched bucket (bulk imports)."""
+    totals: Dict[Tuple[str, str], list] = {}
+    for doc in docs:
+        bucket = bucket_of(kind, doc)
+        if bucket:
+            agg = totals.setdefault(bucket[:2], [0.0, 0])
+            agg[0] += bucket[2]
+            agg[1] += 1
+    if not totals:
+        return
+    ops = [
+        pymongo.UpdateOne(
+            {"userId": user_id, "month": month, "kind": kind, "category": category},
+            {"$inc": {"total": total, "count": count}},
+            upsert=True,
+        )
+        for (month, category), (total, count) in totals.items()
+    ]
+    await _apply(db, user_id, kind, ops, False, None)
+
+
+async def summary(db, user_id: str) -> Dict[str, Any]:
+    """Return monthly income/expense maps, category breakdowns and totals for a user.
+
+    Buckets are grouped server-side in a single `$facet` round trip.
+    """
+    pipeline = [
+        {"$match": {"userId": user_id, "count": {"$gt": 0}}},
+        summary_facet("$total"),
+    ]
+    rows = await db[COL].aggregate(pipeline).to_list(length=1)
+    return shape_summary(rows[0] if rows else None)
+
+
+async def rebuild(db, user_id: Optional[str] = None) -> Dict[str, int]:
+    """Recompute rollups from the raw income/expenses collections.
+
+    Grouping happens in the server and results are written with `$merge`, so
+    no transaction documents are pulled into the process. When `user_id` is
+    given only that user's buckets are replaced. Run it while writes for the
+    affected users are quiet; concurrent `record` calls between the delete and
+    the merge would be lost.
+    """
+    from ..utils.indexes import ensure_indexes
+    from .progress_cache import bump
+
+    query = {"userId": user_id} if user_id else {}
+    await ensure_indexes(db, only=[COL])
+    await db[COL].delete_many(query)
+    merge = {"$merge": {
+        "into": COL,
+        "on": ["userId", "month", "kind", "category"],
+        "whenMatched": "replace",
+        "whenNotMatched": "insert",
+    }}
+    for kind, (col, _) in SOURCES.items():
+        await db[col].aggregate([*rollup_pipeline(kind, query), merge]).to_list(length=None)
+    # cached goal progress was computed from the old buckets
+    if user_id:
+        await bump(db, user_id)
+    else:
+        await db["users"].update_many({}, {"$inc": {"dataVersion": 1}})
+    return {"buckets": await db[COL].count_documents(query)}
+
+
+async def repair(db, user_ids: Optional[List[str]] = None) -> int:
+    """Rebuild the buckets of users marked in `ledger_rollup_repairs`.
+
+    Limited to `user_ids` when given. Returns how many users were rebuilt.
+    """
+    query = {"userId": {"$in": user_ids}} if user_ids is not None else {}
+    repaired = 0
+    for user_id in await db[REPAIRS].distinct("userId", query):
+        started = datetime.utcnow()
+        await rebuild(db, user_id)
+        # markers added while rebuilding stay for the next run
+        await db[REPAIRS].delete_many({"userId": user_id, "at": {"$lte": started}})
+        repaired += 1
+    return repaired
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    from ..utils.dbConnect import get_db
+
+    parser = argparse.ArgumentParser(description="Maintain FinAura ledger rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute rollups from income/expenses")
+    parser.add_argument("--repair", action="store_true", help="rebuild users whose rollup updates failed")
+    parser.add_argument("--user", default=None, help="limit the rebuild to a single userId")
+    args = parser.parse_args()
+
+    async def _main():
+        db = await get_db()
+        if args.rebuild:
+            print(await rebuild(db, args.user))
+        elif args.repair:
+            print({"repaired": await repair(db)})
+        else:
+            parser.print_help()
+
+    asyncio.run(_main())
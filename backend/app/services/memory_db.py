@@ -1,21 +1,323 @@
+"""Per-user semantic memory for the agents.
+
+Texts are embedded offline with signed feature hashing over word tokens and
+character trigrams, so no model download or API call is needed. Each user
+gets a contiguous float32 matrix used as a ring buffer: once it reaches
+MEMORY_CAPACITY rows the oldest memory is overwritten. Queries run cosine
+similarity as a single matrix-vector product and pick the top-k with
+`argpartition`. Above MEMORY_EXACT_LIMIT rows the scan is narrowed to the
+rows whose random-hyperplane (LSH) bucket is within one bit of the query's,
+then re-ranked exactly.
+
+With MEMORY_DB_DIR set, every user's matrix is a memory-mapped `<id>.f32`
+file next to a `<id>.jsonl` log of `{slot, text}` records, so memories
+survive restarts and are shared by every request in the worker. All file
+work (loading and re-embedding a user, log appends and flushes, growing the
+matrix) then runs on a single I/O thread, which also serialises access to
+the indexes, so the event loop never blocks on disk.
+
+Env: MEMORY_DIM, MEMORY_CAPACITY, MEMORY_EXACT_LIMIT, MEMORY_LSH_BITS,
+MEMORY_MAX_USERS, MEMORY_DB_DIR.
+"""
+
 from __future__ import annotations
 
-from typing import List, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ..utils.env import env_int
+from ..utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+_MEMORY: Optional["MemoryDB"] = None
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Stable hashed bag of words + char trigrams, L2-normalised."""
+
+    def __init__(self, dim: int = 256, trigram_weight: float = 0.5):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    def _features(self, text: str):
+        for word in _TOKEN.findall((text or "").lower()):
+            yield word, 1.0
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], self.trigram_weight
+
+    def embed(self, text: str) -> np.ndarray:
+        idx: List[int] = []
+        val: List[float] = []
+        for feat, weight in self._features(text):
+            h = zlib.crc32(feat.encode("utf-8"))
+            idx.append(h % self.dim)
+            val.append(weight if (h >> 16) & 1 else -weight)
+        vec = np.zeros(self.dim, dtype=np.float32)
+        if idx:
+            np.add.at(vec, np.asarray(idx), np.asarray(val, dtype=np.float32))
+            norm = float(np.linalg.norm(vec))
+            if norm > 0:
+                vec /= norm
+        return vec
+
+
+class _UserIndex:
+    """Ring buffer of embeddings for one user, optionally backed by files."""
+
+    def __init__(self, dim: int, capacity: int, planes: np.ndarray, path: Optional[str] = None):
+        self.dim = dim
+        self.capacity = capacity
+        self.planes = planes
+        self.path = path
+        self.size = 0
+        self.head = 0
+        self.texts: List[str] = []
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.codes = np.zeros(0, dtype=np.uint16)
+        self._log_lines = 0
+        self._log = None
+
+    # --- storage -------------------------------------------------------
+
+    def _reserve(self, rows: int):
+        """Grow the matrix (doubling) so it holds at least `rows` rows."""
+        have = self.vectors.shape[0]
+        if rows <= have:
+            return
+        new = min(self.capacity, max(rows, have * 2, 64))
+        if self.path:
+            if isinstance(self.vectors, np.memmap):
+                self.vectors.flush()
+            with open(self.path + ".f32", "ab") as f:
+                f.truncate(new * self.dim * 4)
+            self.vectors = np.memmap(self.path + ".f32", dtype=np.float32, mode="r+", shape=(new, self.dim))
+        else:
+            grown = np.zeros((new, self.dim), dtype=np.float32)
+            grown[:have] = self.vectors
+            self.vectors = grown
+        codes = np.zeros(new, dtype=np.uint16)
+        codes[:have] = self.codes
+        self.codes = codes
+        self.texts.extend([""] * (new - len(self.texts)))
+
+    def _code(self, vecs: np.ndarray) -> np.ndarray:
+        bits = (vecs @ self.planes) > 0
+        weights = (1 << np.arange(self.planes.shape[1])).astype(np.uint16)
+        return bits.astype(np.uint16) @ weights
+
+    def load(self, embed):
+        """Replay the text log and map the vector file; re-embed if it is missing or stale."""
+        if not self.path or not os.path.exists(self.path + ".jsonl"):
+            return
+        slots: Dict[int, str] = {}
+        order: List[int] = []
+        with open(self.path + ".jsonl", "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                    slot, text = int(rec["slot"]), str(rec["text"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if slot < 0 or slot >= self.capacity:
+                    continue
+                slots[slot] = text
+                order.append(slot)
+                self._log_lines += 1
+        if not slots:
+            return
+        self.size = len(slots)
+        self.head = (order[-1] + 1) % self.capacity
+        expected = max(slots) + 1
+        stale = True
+        f32 = self.path + ".f32"
+        if os.path.exists(f32) and os.path.getsize(f32) % (self.dim * 4) == 0:
+            rows = os.path.getsize(f32) // (self.dim * 4)
+            if expected <= rows <= self.capacity:
+                self.vectors = np.memmap(f32, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+                self.texts = [""] * rows
+                stale = False
+        if stale:
+            if os.path.exists(f32):
+                os.remove(f32)
+            self._reserve(expected)
+        for slot, text in slots.items():
+            self.texts[slot] = text
+            if stale:
+                self.vectors[slot] = embed(text)
+        self.codes = np.zeros(self.vectors.shape[0], dtype=np.uint16)
+        self.codes[:expected] = self._code(np.asarray(self.vectors[:expected]))
+
+    def _append_log(self, slot: int, text: str):
+        if not self.path:
+            return
+        if self._log is None:
+            self._log = open(self.path + ".jsonl", "a", encoding="utf-8")
+        self._log.write(json.dumps({"slot": slot, "text": text}) + "\n")
+        self._log.flush()
+        self._log_lines += 1
+        if self._log_lines > 2 * max(self.size, 1) + 1024:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log so it holds one record per live slot, oldest first."""
+        self.close()
+        tmp = self.path + ".jsonl.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for slot in self._slots_oldest_first():
+                f.write(json.dumps({"slot": slot, "text": self.texts[slot]}) + "\n")
+        os.replace(tmp, self.path + ".jsonl")
+        self._log_lines = self.size
+
+    def _slots_oldest_first(self) -> List[int]:
+        if self.size < self.capacity:
+            return list(range(self.size))
+        return list(range(self.head, self.capacity)) + list(range(self.head))
+
+    def close(self):
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # --- operations ----------------------------------------------------
+
+    def add(self, text: str, vec: np.ndarray):
+        slot = self.head
+        self._reserve(slot + 1)
+        self.vectors[slot] = vec
+        self.codes[slot] = self._code(vec[None, :])[0]
+        self.texts[slot] = text
+        self.head = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self._append_log(slot, text)
+
+    def search(self, q: np.ndarray, top_k: int, exact_limit: int) -> List[int]:
+        if self.size == 0 or top_k <= 0:
+            return []
+        rows = None
+        if self.size > exact_limit:
+            code = int(self._code(q[None, :])[0])
+            probes = [code] + [code ^ (1 << b) for b in range(self.planes.shape[1])]
+            cand = np.flatnonzero(np.isin(self.codes[:self.size], np.asarray(probes, dtype=np.uint16)))
+            if len(cand) >= top_k:
+                rows = cand
+        if rows is None:
+            scores = self.vectors[:self.size] @ q
+            rows = np.arange(self.size)
+        else:
+            scores = self.vectors[rows] @ q
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [int(rows[i]) for i in best if scores[i] > 0]
 
 
 class MemoryDB:
-    """Tiny in-memory vector-like store placeholder.
-    Replace with FAISS or Pinecone for production.
-    """
+    """Embedding-backed memory shared by every agent in the worker."""
+
+    def __init__(
+        self,
+        *,
+        dim: int = 256,
+        capacity: int = 10000,
+        exact_limit: int = 2000,
+        lsh_bits: int = 10,
+        max_users: int = 1000,
+        directory: Optional[str] = None,
+    ):
+        self.embedder = HashingEmbedder(dim)
+        self.dim = dim
+        self.capacity = capacity
+        self.exact_limit = exact_limit
+        self.max_users = max_users
+        self.directory = directory
+        self.planes = np.random.default_rng(dim).standard_normal((dim, max(1, min(lsh_bits, 16)))).astype(np.float32)
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        self._io: Optional[ThreadPoolExecutor] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-db")
 
-    def __init__(self):
-        self._items: List[Tuple[str, str]] = []  # (user_id, text)
+    async def _run(self, fn, *args):
+        """Run `fn` on the I/O thread when backed by files, inline otherwise."""
+        if self._io is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    def _index(self, user_id: str) -> _UserIndex:
+        index = self._users.get(user_id)
+        if index is not None:
+            self._users.move_to_end(user_id)
+            return index
+        path = None
+        if self.directory:
+            name = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+            path = os.path.join(self.directory, name)
+        index = _UserIndex(self.dim, self.capacity, self.planes, path)
+        index.load(self.embedder.embed)
+        self._users[user_id] = index
+        while len(self._users) > self.max_users:
+            _, old = self._users.popitem(last=False)
+            old.close()
+        return index
+
+    def _add(self, user_id: str, text: str):
+        self._index(user_id).add(text, self.embedder.embed(text))
+
+    def _query(self, user_id: str, q: str, top_k: int) -> List[str]:
+        index = self._index(user_id)
+        slots = index.search(self.embedder.embed(q), top_k, self.exact_limit)
+        return [index.texts[s] for s in slots]
 
     async def add(self, user_id: str, text: str):
-        self._items.append((user_id, text))
+        if not text:
+            return
+        await self._run(self._add, user_id, text)
 
     async def query(self, user_id: str, q: str, top_k: int = 3) -> List[str]:
-        # naive contains-based retrieval
-        texts = [t for (u, t) in self._items if u == user_id]
-        hits = [t for t in texts if any(w.lower() in t.lower() for w in q.split())]
-        return hits[:top_k]
+        return await self._run(self._query, user_id, q, top_k)
+
+    def _close_indexes(self):
+        for index in self._users.values():
+            index.close()
+
+    def close(self):
+        if self._io is None:
+            self._close_indexes()
+            return
+        # after any queued writes, on the thread that owns the files
+        self._io.submit(self._close_indexes).result()
+        self._io.shutdown(wait=True)
+        self._io = None
+
+
+def get_memory_db() -> MemoryDB:
+    """Return the per-process memory store configured from env."""
+    global _MEMORY
+    if _MEMORY is None:
+        _MEMORY = MemoryDB(
+            dim=env_int("MEMORY_DIM", 256),
+            capacity=env_int("MEMORY_CAPACITY", 10000),
+            exact_limit=env_int("MEMORY_EXACT_LIMIT", 2000),
+            lsh_bits=env_int("MEMORY_LSH_BITS", 10),
+            max_users=env_int("MEMORY_MAX_USERS", 1000),
+            directory=os.getenv("MEMORY_DB_DIR") or None,
+        )
+    return _MEMORY
+
+
+def close_memory_db():
+    if _MEMORY is not None:
+        _MEMORY.close()
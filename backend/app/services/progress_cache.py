@@ -0,0 +1,115 @@
+"""Goal progress cached per user and invalidated by a data version.
+
+Goal progress only changes when the user's ledger or goals change, or when
+the month rolls over. Every write to expenses, income or goals bumps
+`dataVersion` on the user document (`bump`). It is bumped after the write,
+so a result computed from the old data can never be cached under the new
+version. A result is reused while `(dataVersion, month)` is unchanged.
+
+The version is read from the request's snapshot user doc, so it is shared by
+all workers. That read is the only database round trip for a cache hit or a
+`304`. The strong ETag for `/api/goals/progress` is built from the same pair;
+`CompressionMiddleware` makes it weak on compressed bodies, since those bytes
+differ from the identity ones. `If-None-Match: *` only matches when the user
+has a goal, so a user without one still gets the 404.
+
+Env: GOAL_PROGRESS_CACHE_SIZE.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.env import env_int
+from ..utils.ids import to_obj_id
+from .snapshot import UserFinancialSnapshot
+
+_CACHE: Optional["ProgressCache"] = None
+
+
+async def bump(db, user_id: str, **inc: float):
+    """Mark the user's goal/ledger data as changed. Call after the write.
+
+    Extra keyword counters (e.g. walletBalance=-100) ride along in the same update.
+    """
+    await db["users"].update_one({"_id": to_obj_id(user_id)}, {"$inc": {"dataVersion": 1, **inc}})
+
+
+def _month() -> str:
+    now = datetime.utcnow()
+    return f"{now.year}-{now.month:02d}"
+
+
+def make_etag(user_id: str, version: int, month: str) -> str:
+    tag = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:10]
+    return f'"gp-{tag}-{version}-{month}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    for tag in (t.strip() for t in if_none_match.split(",")):
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class ProgressCache:
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[int, str, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def lookup(
+        self, user_id: str, snap: UserFinancialSnapshot, if_none_match: Optional[str] = None
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """(etag, progress); progress is None when `if_none_match` already has the current etag."""
+        from ..controllers.goalController import compute_goal_progress
+
+        user = await snap.user() or {}
+        version = int(user.get("dataVersion") or 0)
+        month = _month()
+        etag = make_etag(user_id, version, month)
+        if etag_matches(if_none_match, etag):
+            # `*` matches any current representation, and without a goal there is none
+            wildcard_only = not etag_matches(if_none_match.replace("*", ""), etag)
+            if not wildcard_only or await snap.goal() is not None:
+                self.not_modified += 1
+                return etag, None
+        hit = self._entries.get(user_id)
+        if hit is not None and hit[0] == version and hit[1] == month:
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return etag, hit[2]
+        self.misses += 1
+        stats = await compute_goal_progress(user_id, snap)
+        self._entries[user_id] = (version, month, stats)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return etag, stats
+
+    async def get(self, user_id: str, snap: UserFinancialSnapshot) -> Dict[str, Any]:
+        return (await self.lookup(user_id, snap))[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "notModified": self.not_modified,
+        }
+
+
+def get_progress_cache() -> ProgressCache:
+    """Return the per-process goal progress cache configured from env."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ProgressCache(env_int("GOAL_PROGRESS_CACHE_SIZE", 10000))
+    return _CACHE
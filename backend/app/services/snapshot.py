@@ -0,0 +1,86 @@
+"""Request-scoped view of one user's financial data.
+
+Routes, controllers and agents often need the same pieces within one
+request: the user document, the active goal and the ledger summary.
+`UserFinancialSnapshot` loads each piece at most once. The first caller
+starts the query and any later or concurrent caller awaits the same future.
+`load()` starts several pieces together so they share one round trip of
+latency:
+
+    user, goal, ledger = await snap.load("user", "goal", "ledger")
+
+Routes get a snapshot through `Depends(get_snapshot)`. FastAPI caches
+dependencies per request, so every dependency and the handler see the same
+instance. Pass it on to `compute_goal_progress(user_id, snap)` and to agents
+(`BaseAgent(snapshot=snap)`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Depends
+
+from ..utils.dbConnect import get_db
+from ..utils.ids import to_obj_id
+from ..utils.jwtHandler import get_current_user_id
+from . import ledger_rollups
+
+
+class UserFinancialSnapshot:
+    PARTS = ("user", "goal", "ledger", "invested")
+
+    def __init__(self, db, user_id: str):
+        self.db = db
+        self.user_id = user_id
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    def _memo(self, key: str, load: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        fut = self._futures.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(load())
+            self._futures[key] = fut
+        return fut
+
+    async def user(self) -> Optional[dict]:
+        """The user document without the password hash."""
+        return await self._memo("user", lambda: self.db["users"].find_one({"_id": to_obj_id(self.user_id)}, {"passwordHash": 0}))
+
+    async def goal(self) -> Optional[dict]:
+        """The active goal, else the user's most recent one."""
+
+        async def load():
+            # active goals sort first, so one query covers the fallback
+            docs = await self.db["goals"].find({"userId": self.user_id}).sort([("active", -1), ("_id", -1)]).limit(1).to_list(length=1)
+            return docs[0] if docs else None
+
+        return await self._memo("goal", load)
+
+    async def ledger(self) -> Dict[str, Any]:
+        """`ledger_rollups.summary` for the user."""
+        return await self._memo("ledger", lambda: ledger_rollups.summary(self.db, self.user_id))
+
+    async def invested(self) -> float:
+        """Sum of the user's investment amounts."""
+
+        async def load():
+            rows = await self.db["investments"].aggregate([
+                {"$match": {"userId": self.user_id}},
+                {"$group": {"_id": None, "total": {"$sum": "$amount"}}},
+            ]).to_list(length=1)
+            return float(rows[0]["total"] or 0) if rows else 0.0
+
+        return await self._memo("invested", load)
+
+    async def load(self, *parts: str) -> list:
+        """Fetch the named parts concurrently and return them in order."""
+        for p in parts:
+            if p not in self.PARTS:
+                raise ValueError(f"unknown snapshot part {p!r}")
+        return list(await asyncio.gather(*(getattr(self, p)() for p in parts)))
+
+
+async def get_snapshot(user_id: str = Depends(get_current_user_id)) -> UserFinancialSnapshot:
+    """FastAPI dependency: one snapshot per request for the authenticated user."""
+    return UserFinancialSnapshot(await get_db(), user_id)
@@ -0,0 +1,260 @@
+"""Shared in-memory stand-in for the Motor database the tests patch in.
+
+`FakeDB` creates collections on first access. Each `FakeCollection` keeps its
+documents in `docs` (keyed by `_id`) and appends `(operation, argument)` to
+`calls` for every round trip, so tests can assert on what was written and how
+many queries were made. Round trips only yield to the loop when `latency`
+(seconds) is set; cursors also yield between documents. Set `reject` to a
+predicate to have `insert_many` report matching documents as write errors.
+`create_collection` records its options (e.g. `capped`), which `options()`
+returns; collections created by first access have none.
+
+Only the query and update operators the app uses are understood.
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError
+
+_OPS = {
+    "$gte": lambda v, a: v is not None and v >= a,
+    "$gt": lambda v, a: v is not None and v > a,
+    "$lte": lambda v, a: v is not None and v <= a,
+    "$lt": lambda v, a: v is not None and v < a,
+    "$in": lambda v, a: v in a,
+    "$ne": lambda v, a: v != a,
+}
+
+
+def matches(doc, flt):
+    for key, cond in (flt or {}).items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in cond):
+                return False
+            continue
+        v = doc.get(key)
+        if isinstance(cond, dict):
+            if not all(_OPS[op](v, arg) for op, arg in cond.items()):
+                return False
+        elif v != cond:
+            return False
+    return True
+
+
+def project(doc, projection):
+    if not projection:
+        return dict(doc)
+    if not any(projection.values()):
+        return {k: v for k, v in doc.items() if k not in projection}
+    keep = {k for k, on in projection.items() if on} | ({"_id"} if projection.get("_id", 1) else set())
+    return {k: v for k, v in doc.items() if k in keep}
+
+
+def _apply(doc, update):
+    doc.update(update.get("$set", {}))
+    for k, n in update.get("$inc", {}).items():
+        doc[k] = doc.get(k, 0) + n
+
+
+def _eval(doc, expr):
+    """A "$field" path, a constant or {"$multiply": [...]}; missing values are None."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if isinstance(expr, dict):
+        (op, args), = expr.items()
+        assert op == "$multiply", op
+        values = [_eval(doc, a) for a in args]
+        if any(not isinstance(v, (int, float)) for v in values):
+            return None
+        out = 1
+        for v in values:
+            out *= v
+        return out
+    return expr
+
+
+def _sort_key(field):
+    # like Mongo, missing/null sorts below every value
+    return lambda d: (d.get(field) is not None, d.get(field))
+
+
+class FakeCursor:
+    def __init__(self, docs, latency=0.0):
+        self.docs = docs
+        self.latency = latency
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, d in reversed(keys):
+            self.docs.sort(key=_sort_key(field), reverse=d < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return list(self.docs if length is None else self.docs[:length])
+
+    def __aiter__(self):
+        async def gen():
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            for d in self.docs:
+                await asyncio.sleep(0)
+                yield d
+        return gen()
+
+
+class FakeCollection:
+    def __init__(self, latency=0.0):
+        self.docs = {}
+        self.calls = []
+        self.latency = latency
+        self.reject = None
+        self.collection_options = {}
+
+    async def options(self):
+        await self._round_trip("options", None)
+        return dict(self.collection_options)
+
+    async def _round_trip(self, op, arg):
+        self.calls.append((op, arg))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _matching(self, flt):
+        return [d for d in self.docs.values() if matches(d, flt)]
+
+    def find(self, flt=None, projection=None):
+        self.calls.append(("find", flt))
+        return FakeCursor([project(d, projection) for d in self._matching(flt)], self.latency)
+
+    async def find_one(self, flt=None, projection=None, session=None):
+        await self._round_trip("find_one", flt)
+        found = self._matching(flt)
+        return project(found[0], projection) if found else None
+
+    async def distinct(self, field, flt=None):
+        await self._round_trip("distinct", flt)
+        return list(dict.fromkeys(d[field] for d in self._matching(flt) if field in d))
+
+    def aggregate(self, pipeline):
+        self.calls.append(("aggregate", pipeline))
+        docs = [dict(d) for d in self.docs.values()]
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if matches(d, arg)]
+            elif op == "$sample":
+                docs = random.sample(docs, min(arg["size"], len(docs)))
+            elif op == "$project":
+                docs = [project(d, arg) for d in docs]
+            elif op == "$group":
+                # {"_id": None | "$field", out: {"$sum": <expression>}, ...}
+                groups = {}
+                for d in docs:
+                    key = _eval(d, arg["_id"])
+                    g = groups.setdefault(key, {"_id": key})
+                    for out, spec in arg.items():
+                        if out != "_id":
+                            g[out] = g.get(out, 0) + (_eval(d, spec["$sum"]) or 0)
+                docs = list(groups.values())
+            else:
+                raise NotImplementedError(op)
+        return FakeCursor(docs, self.latency)
+
+    async def insert_one(self, doc, session=None):
+        await self._round_trip("insert_one", doc)
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["_id"]] = dict(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True, session=None):
+        docs = list(docs)
+        await self._round_trip("insert_many", docs)
+        errors = []
+        for i, d in enumerate(docs):
+            d.setdefault("_id", ObjectId())
+            if d["_id"] in self.docs or (self.reject and self.reject(d)):
+                errors.append({"index": i, "code": 11000, "errmsg": "duplicate key"})
+                if ordered:
+                    break
+            else:
+                self.docs[d["_id"]] = dict(d)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+        return SimpleNamespace(inserted_ids=[d["_id"] for d in docs])
+
+    def _update(self, flt, update, upsert):
+        found = self._matching(flt)
+        if found:
+            _apply(found[0], update)
+            return found[0], False
+        if not upsert:
+            return None, False
+        doc = {k: v for k, v in flt.items() if not isinstance(v, dict)}
+        doc.update(update.get("$setOnInsert", {}))
+        _apply(doc, update)
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = doc
+        return doc, True
+
+    async def update_one(self, flt, update, upsert=False, session=None):
+        await self._round_trip("update_one", update)
+        doc, inserted = self._update(flt, update, upsert)
+        matched = int(doc is not None and not inserted)
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=doc["_id"] if inserted else None)
+
+    async def update_many(self, flt, update, session=None):
+        await self._round_trip("update_many", update)
+        found = self._matching(flt)
+        for d in found:
+            _apply(d, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found))
+
+    async def find_one_and_update(self, flt, update, projection=None, upsert=False, return_document=False, session=None):
+        await self._round_trip("find_one_and_update", update)
+        before = next(iter(self._matching(flt)), None)
+        before = dict(before) if before is not None else None
+        doc, _ = self._update(flt, update, upsert)
+        out = doc if return_document else before
+        return project(out, projection) if out is not None else None
+
+    async def find_one_and_delete(self, flt, session=None):
+        await self._round_trip("find_one_and_delete", flt)
+        found = next(iter(self._matching(flt)), None)
+        return self.docs.pop(found["_id"]) if found is not None else None
+
+    async def bulk_write(self, ops, ordered=True, session=None):
+        await self._round_trip("bulk_write", ops)
+        for op in ops:
+            self._update(op._filter, op._doc, op._upsert)
+
+
+class FakeDB(dict):
+    def __init__(self, data=None, latency=0.0):
+        super().__init__()
+        self.latency = latency
+        for name, docs in (data or {}).items():
+            for d in docs:
+                self[name].docs[d["_id"]] = dict(d)
+
+    async def create_collection(self, name, **options):
+        if name in self:
+            raise CollectionInvalid(f"collection {name} already exists")
+        self[name].collection_options = options
+        return self[name]
+
+    def __missing__(self, name):
+        self[name] = FakeCollection(self.latency)
+        return self[name]
@@ -0,0 +1,75 @@
+"""Minimal local stand-in for the Gemini and Longcat chat APIs.
+
+Serves Gemini `generateContent`, `streamGenerateContent?alt=sse` and model
+metadata GETs, plus Longcat's OpenAI-compatible `/chat/completions` (with and
+without `stream: true`). Replies wait `app.state.latency_ms` before the
+first byte. Streams then send `app.state.chunks` pieces,
+`app.state.chunk_delay_ms` apart. Use it in-process through
+httpx.ASGITransport, or run it for local dev:
+
+    uvicorn app.tests.llm_stub:app --port 12112
+    GEMINI_BASE_URL=http://localhost:12112 GEMINI_API_KEY=stub \
+    LONGCAT_BASE_URL=http://localhost:12112 LONGCAT_API_KEY=stub ...
+"""
+
+import asyncio
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY = "Keep your spending on food steady and move a little more into savings each month. This is educational, not financial advice."
+
+app = FastAPI()
+app.state.latency_ms = 0.0
+app.state.chunks = 8
+app.state.chunk_delay_ms = 0.0
+app.state.requests = 0
+
+
+def _pieces(text: str, n: int) -> list:
+    words = text.split(" ")
+    n = max(1, min(n, len(words)))
+    size = -(-len(words) // n)
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+
+
+async def _stream(frames):
+    await asyncio.sleep(app.state.latency_ms / 1000)
+    for i, frame in enumerate(frames):
+        if i and app.state.chunk_delay_ms:
+            await asyncio.sleep(app.state.chunk_delay_ms / 1000)
+        yield f"data: {frame}\n\n"
+
+
+@app.middleware("http")
+async def count(request: Request, call_next):
+    app.state.requests += 1
+    return await call_next(request)
+
+
+@app.get("/{version}/models/{model}")
+async def gemini_model(version: str, model: str):
+    return {"name": f"models/{model}"}
+
+
+@app.post("/{version}/models/{target}")
+async def gemini_generate(version: str, target: str):
+    model, _, method = target.partition(":")
+    if method == "streamGenerateContent":
+        frames = [json.dumps({"candidates": [{"content": {"parts": [{"text": p}]}}]}) for p in _pieces(REPLY, app.state.chunks)]
+        return StreamingResponse(_stream(frames), media_type="text/event-stream")
+    if method != "generateContent":
+        return JSONResponse({"error": {"message": f"unknown method {method}"}}, status_code=404)
+    await asyncio.sleep(app.state.latency_ms / 1000)
+    return {"candidates": [{"content": {"parts": [{"text": REPLY}]}}], "modelVersion": model}
+
+
+@app.post("/chat/completions")
+async def longcat_chat(request: Request):
+    body = await request.json()
+    if body.get("stream"):
+        frames = [json.dumps({"choices": [{"delta": {"content": p}}]}) for p in _pieces(REPLY, app.state.chunks)]
+        return StreamingResponse(_stream([*frames, "[DONE]"]), media_type="text/event-stream")
+    await asyncio.sleep(app.state.latency_ms / 1000)
+    return {"model": body.get("model"), "choices": [{"message": {"role": "assistant", "content": REPLY}}]}
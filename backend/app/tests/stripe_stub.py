@@ -0,0 +1,83 @@
+"""Minimal local stand-in for the Stripe checkout API.
+
+Serves POST /v1/checkout/sessions and GET /v1/checkout/sessions/{id} from
+memory, honours Idempotency-Key, and can be told to fail the next N requests
+(`app.state.fail_next`, `app.state.fail_status`) to exercise retries.
+Use it in-process through httpx.ASGITransport, or run it for local dev:
+
+    uvicorn app.tests.stripe_stub:app --port 12111
+    STRIPE_API_BASE=http://localhost:12111 STRIPE_SECRET_KEY=sk_test_stub ...
+"""
+
+import re
+import uuid
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+app.state.sessions = {}
+app.state.idempotency = {}
+app.state.requests = []
+app.state.fail_next = 0
+app.state.fail_status = 500
+
+
+def _unflatten(body: bytes) -> dict:
+    """Rebuild nested params from Stripe's bracketed form keys."""
+    out: dict = {}
+    for key, value in parse_qsl(body.decode("utf-8")):
+        parts = re.findall(r"[^\[\]]+", key)
+        node = out
+        for part, nxt in zip(parts, parts[1:]):
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return out
+
+
+def _error(status: int, message: str):
+    return JSONResponse({"error": {"message": message, "type": "api_error"}}, status_code=status)
+
+
+@app.middleware("http")
+async def record_and_fail(request: Request, call_next):
+    app.state.requests.append((request.method, request.url.path, dict(request.headers)))
+    if not request.headers.get("authorization", "").startswith("Bearer sk_"):
+        return _error(401, "Invalid API Key provided")
+    if app.state.fail_next > 0:
+        app.state.fail_next -= 1
+        return _error(app.state.fail_status, "stub failure")
+    return await call_next(request)
+
+
+@app.post("/v1/checkout/sessions")
+async def create_session(request: Request):
+    key = request.headers.get("idempotency-key")
+    if key and key in app.state.idempotency:
+        return app.state.idempotency[key]
+    params = _unflatten(await request.body())
+    item = params["line_items"]["0"]
+    sid = f"cs_test_{uuid.uuid4().hex[:16]}"
+    session = {
+        "id": sid,
+        "object": "checkout.session",
+        "url": f"https://checkout.stripe.test/pay/{sid}",
+        "amount_total": int(item["price_data"]["unit_amount"]) * int(item.get("quantity", 1)),
+        "currency": item["price_data"]["currency"],
+        "metadata": params.get("metadata", {}),
+        "payment_status": "unpaid",
+        "success_url": params.get("success_url"),
+    }
+    app.state.sessions[sid] = session
+    if key:
+        app.state.idempotency[key] = session
+    return session
+
+
+@app.get("/v1/checkout/sessions/{session_id}")
+async def retrieve_session(session_id: str):
+    session = app.state.sessions.get(session_id)
+    if session is None:
+        return _error(404, f"No such checkout.session: '{session_id}'")
+    return session
@@ -9,3 +9,16 @@ async def test_health():
         r = await ac.get('/health')
         assert r.status_code == 200
         assert r.json()['status'] == 'ok'
+
+
+@pytest.mark.asyncio
+async def test_expense_predict_rejects_malformed_month():
+    from app.utils.jwtHandler import get_current_user_id
+    app.dependency_overrides[get_current_user_id] = lambda: "507f1f77bcf86cd799439011"
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            for month in ("2025-3", "2025-13", "March", "2025-03-01"):
+                r = await ac.get('/api/ai/expense-predict', params={"month": month})
+                assert r.status_code == 400, month
+    finally:
+        app.dependency_overrides.clear()
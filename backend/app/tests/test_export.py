@@ -0,0 +1,72 @@
+import gzip
+import json
+
+import pytest
+from bson import ObjectId
+from httpx import ASGITransport, AsyncClient
+
+from app.controllers import exportController as ctl
+from app.main import app
+from app.utils.jwtHandler import get_current_user_id
+from app.tests.conftest import FakeDB
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    data = {
+        "expenses": [
+            {"_id": ObjectId(), "userId": "u1", "date": "2025-02-01", "amount": 20.0, "category": "Food"},
+            {"_id": ObjectId(), "userId": "u1", "date": "2025-01-05", "amount": 5.0, "category": "Bus", "note": 'a "quoted", note'},
+            {"_id": ObjectId(), "userId": "u2", "date": "2025-01-05", "amount": 99.0, "category": "Food"},
+        ],
+        "income": [{"_id": ObjectId(), "userId": "u1", "date": "2025-01-01", "amount": 100.0, "source": "Salary"}],
+        "goals": [{"_id": ObjectId(), "userId": "u1", "name": "Trip", "targetAmount": 500.0, "targetDate": "2025-12"}],
+    }
+
+    async def get_db():
+        return FakeDB(data)
+
+    monkeypatch.setattr(ctl, "get_db", get_db)
+    return data
+
+
+async def _collect(gen):
+    return b"".join([chunk async for chunk in gen])
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_filters_by_user_and_range(fake_db):
+    body = await _collect(ctl.stream_export("u1", ctl.parse_kinds("expenses,goals"), "ndjson", start="2025-01-01", end="2025-01-31"))
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert [(r["kind"], r.get("amount") or r.get("name")) for r in rows] == [("expense", 5.0), ("goal", "Trip")]
+    assert all("userId" not in r for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_csv_export_gzip(fake_db):
+    body = await _collect(ctl.stream_export("u1", ctl.parse_kinds(None), "csv", gzip=True))
+    lines = gzip.decompress(body).decode().splitlines()
+    assert lines[0].split(",") == ctl.CSV_COLUMNS
+    assert len(lines) == 5
+    assert '"a ""quoted"", note"' in lines[1]
+    assert lines[3].startswith("income,")
+
+
+@pytest.mark.asyncio
+async def test_export_route_honours_refused_gzip(fake_db):
+    app.dependency_overrides[get_current_user_id] = lambda: "u1"
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            refused = await ac.get("/api/export", params={"format": "csv"}, headers={"Accept-Encoding": "gzip;q=0, identity"})
+            accepted = await ac.get("/api/export", params={"format": "csv"}, headers={"Accept-Encoding": "br, gzip;q=0.5"})
+    finally:
+        app.dependency_overrides.clear()
+    assert "content-encoding" not in refused.headers
+    assert refused.text.splitlines()[0].split(",") == ctl.CSV_COLUMNS
+    assert accepted.headers["content-encoding"] == "gzip"
+    assert accepted.text.splitlines()[0].split(",") == ctl.CSV_COLUMNS  # httpx decoded it
+
+
+def test_parse_kinds_rejects_unknown():
+    with pytest.raises(Exception):
+        ctl.parse_kinds("expenses,stocks")
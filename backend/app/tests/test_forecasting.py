@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services import forecasting
+
+
+def _buckets(months, per_cat):
+    out = []
+    for i, month in enumerate(months):
+        for cat, fn in per_cat.items():
+            out.append({"month": month, "category": cat, "total": fn(i)})
+    return out
+
+
+MONTHS_2024 = [f"2024-{m:02d}" for m in range(1, 13)]
+
+
+def test_trend_is_extrapolated_per_category():
+    buckets = _buckets(MONTHS_2024[:6], {"Food": lambda i: 100 + 10 * i, "Rent": lambda i: 500})
+    first, cats, Y = forecasting.build_matrix(buckets, "2024-07")
+    assert cats == ["Food", "Rent", forecasting.TOTAL]
+    assert Y.shape == (6, 3)
+    fc = forecasting.forecast_matrices({"u": (first, cats, Y)}, "2024-07")["u"]
+    assert fc["model"] == "trend"
+    assert fc["categories"]["Food"]["prediction"] == 160.0
+    assert fc["categories"]["Rent"]["prediction"] == 500.0
+    assert fc["total"]["prediction"] == 660.0
+    # perfect fit -> zero-width interval
+    assert fc["categories"]["Food"]["lower"] == fc["categories"]["Food"]["upper"] == 160.0
+
+
+def test_seasonality_and_missing_months():
+    season = lambda i: 300 + 100 * np.cos(2 * np.pi * i / 12)
+    buckets = _buckets(MONTHS_2024 + [f"2025-{m:02d}" for m in range(1, 13)], {"Travel": season})
+    fc = forecasting.forecast_matrices({"u": forecasting.build_matrix(buckets, "2026-01")}, "2026-01")["u"]
+    assert fc["model"] == "trend+seasonal"
+    assert abs(fc["categories"]["Travel"]["prediction"] - 400) < 1
+
+    # a month with no spending counts as zero rather than being skipped
+    gappy = [b for b in buckets if b["month"] != "2025-03"]
+    _, _, Y = forecasting.build_matrix(gappy, "2026-01")
+    assert Y.shape[0] == 24 and Y[14].sum() == 0
+    fc = forecasting.forecast_matrices({"u": forecasting.build_matrix(gappy, "2026-01")}, "2026-01")["u"]
+    lo, hi = fc["categories"]["Travel"]["lower"], fc["categories"]["Travel"]["upper"]
+    assert lo < fc["categories"]["Travel"]["prediction"] < hi
+
+
+def test_batch_matches_individual_fits():
+    rng = np.random.default_rng(0)
+    mats = {}
+    for u in range(20):
+        n = 3 + u % 10
+        months = [forecasting._month_label(forecasting._month_index("2025-01") - n + i) for i in range(n)]
+        cats = {c: (lambda i, a=rng.uniform(50, 500), b=rng.uniform(-5, 5): a + b * i + rng.normal(0, 5)) for c in ("A", "B", "C")}
+        mats[f"u{u}"] = forecasting.build_matrix(_buckets(months, cats), "2025-01")
+    batch = forecasting.forecast_matrices(mats, "2025-01")
+    for uid, mat in mats.items():
+        assert forecasting.forecast_matrices({uid: mat}, "2025-01")[uid] == batch[uid]
+
+
+def test_history_window_and_empty():
+    assert forecasting.build_matrix([{"month": "2020-01", "category": "X", "total": 5}], "2025-01") is None
+    assert forecasting.build_matrix([], "bad") is None
+    fc = forecasting.forecast_matrices({"u": forecasting.build_matrix([{"month": "2024-12", "category": "X", "total": 5}], "2025-01")}, "2025-01")["u"]
+    assert fc["model"] == "mean" and fc["total"]["prediction"] == 5.0
@@ -0,0 +1,50 @@
+import httpx
+import pytest
+
+from app.utils.llm_cache import LLMCache
+from app.utils.llm_connector import LLMClient, _GEMINI_ROUTES
+
+OK = {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}
+
+
+def _llm(handler):
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return LLMClient(gemini_key="k", http_client=http, cache=LLMCache(ttl=0))
+
+
+@pytest.mark.asyncio
+async def test_resolved_route_is_reused_with_one_request():
+    _GEMINI_ROUTES.forget("gemini-old")
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if "gemini-old" in request.url.path or request.url.path.startswith("/v1beta/models/gemini-2.0"):
+            return httpx.Response(404)
+        return httpx.Response(200, json=OK)
+
+    llm = _llm(handler)
+    first = await llm.gemini_chat("s", "u", model="gemini-old")
+    assert first["ok"] and (first["model"], first["version"]) == ("gemini-2.0-flash", "v1")
+    assert len(calls) == 4  # old/v1beta, old/v1, 2.0/v1beta, 2.0/v1
+
+    calls.clear()
+    await llm.gemini_chat("s", "u2", model="gemini-old")
+    assert calls == ["/v1/models/gemini-2.0-flash:generateContent"]
+    await llm.close()
+
+
+@pytest.mark.asyncio
+async def test_transient_error_on_known_route_does_not_rediscover():
+    _GEMINI_ROUTES.remember("gemini-x", "gemini-x", "v1beta")
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    llm = _llm(handler)
+    res = await llm.gemini_chat("s", "u", model="gemini-x")
+    assert not res["ok"] and res["message"].endswith("503")
+    assert len(calls) == 1
+    await llm.close()
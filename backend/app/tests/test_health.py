@@ -8,3 +8,12 @@ async def test_health():
         r = await ac.get('/health')
         assert r.status_code == 200
         assert r.json()['status'] == 'ok'
+
+
+@pytest.mark.asyncio
+async def test_health_reports_index_failures(monkeypatch):
+    import app.main as main
+    monkeypatch.setattr(main, "_index_errors", ["conflict: forecasts.userId_1"])
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get('/health')
+        assert r.json() == {"status": "degraded", "indexes": ["conflict: forecasts.userId_1"]}
@@ -0,0 +1,93 @@
+import pytest
+
+from app.controllers import importController as ctl
+from app.tests.conftest import FakeDB
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB()
+    for name in ("expenses", "income"):
+        fake[name].reject = lambda d: d.get("note") == "dup"
+    notes = []
+
+    async def get_db():
+        return fake
+
+    async def notify(db, user_id, **kw):
+        notes.append(kw)
+
+    monkeypatch.setattr(ctl, "get_db", get_db)
+    monkeypatch.setattr(ctl, "notify", notify)
+    monkeypatch.setattr(ctl, "CHUNK_SIZE", 2)
+    fake.notes = notes
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_csv_import_aggregates_side_effects(db):
+    body = (
+        "category,amount,date,note,paymentMethod\n"
+        "Food,100,2025-01-02,,Wallet\n"
+        "Food,50.5,2025-01-03,lunch,Card\n"
+        "Rent,abc,2025-01-04,,\n"
+        "Travel,20,2025-02-01,dup,Wallet\n"
+        "Bus,30,2025-02-02,,wallet\n"
+    ).encode()
+    res = await ctl.import_entries("507f1f77bcf86cd799439011", "expense", body, "text/csv")
+    assert res["inserted"] == 3
+    assert [e["row"] for e in res["errors"]] == [3, 4]
+    assert res["walletDebited"] == 130
+    assert [len(docs) for _, docs in db["expenses"].calls] == [2, 2]  # four valid rows in chunks of two
+    assert db["users"].calls == [("update_one", {"$inc": {"dataVersion": 1, "walletBalance": -130}})]
+    assert [(op, len(ops)) for op, ops in db["ledger_rollups"].calls] == [("bulk_write", 2)]  # Food/2025-01 and Bus/2025-02
+    assert len(db.notes) == 1 and db.notes[0]["title"] == "Imported 3 expenses"
+    assert all(d["userId"] == "507f1f77bcf86cd799439011" for d in db["expenses"].docs.values())
+
+
+@pytest.mark.asyncio
+async def test_ndjson_income_import_reports_bad_lines(db):
+    body = b'{"source": "Salary", "amount": 1000, "date": "2025-01-01"}\nnot json\n\n{"amount": 5}\n'
+    res = await ctl.import_entries("u1", "income", body)
+    assert res["inserted"] == 1
+    assert [e["row"] for e in res["errors"]] == [2, 3]
+    assert "invalid JSON" in res["errors"][0]["error"]
+    assert "source" in res["errors"][1]["error"]
+    # only the goal-progress data version is bumped; no wallet change for income
+    assert db["users"].calls == [("update_one", {"$inc": {"dataVersion": 1}})]
+
+
+@pytest.mark.asyncio
+async def test_wallet_debit_rounds_the_total_not_each_row(db):
+    body = "category,amount,date,paymentMethod\n" + "Tea,0.5,2025-01-02,wallet\n" * 7
+    res = await ctl.import_entries("507f1f77bcf86cd799439011", "expense", body.encode(), "text/csv")
+    assert res["inserted"] == 7
+    assert res["walletDebited"] == 4  # 3.5 rounded once; per-row truncation gave 0
+    assert db["users"].calls == [("update_one", {"$inc": {"dataVersion": 1, "walletBalance": -4}})]
+
+
+class FakeRequest:
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+        self.read = 0
+
+    async def stream(self):
+        for c in self.chunks:
+            self.read += 1
+            yield c
+
+
+@pytest.mark.asyncio
+async def test_read_body_caps_upload_size(monkeypatch):
+    from fastapi import HTTPException
+    monkeypatch.setattr(ctl, "MAX_BYTES", 10)
+    assert await ctl.read_body(FakeRequest([b"abc", b"def"])) == b"abcdef"
+    declared = FakeRequest([b"x" * 11], {"content-length": "11"})
+    with pytest.raises(HTTPException) as e:
+        await ctl.read_body(declared)
+    assert e.value.status_code == 413 and declared.read == 0
+    chunked = FakeRequest([b"x" * 6, b"x" * 6, b"x" * 6])
+    with pytest.raises(HTTPException):
+        await ctl.read_body(chunked)
+    assert chunked.read == 2
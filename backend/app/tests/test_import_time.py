@@ -0,0 +1,31 @@
+import os
+import re
+import subprocess
+import sys
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# cumulative microseconds spent importing app.main; FastAPI alone is most of it
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+LAZY = ("numpy", "httpx", "motor", "pymongo", "bcrypt", "jwt")
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=BACKEND, capture_output=True, text=True, timeout=60,
+    )
+
+
+def test_import_time_within_budget():
+    proc = _run("import app.main", "-X", "importtime")
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    m = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app\.main$", proc.stderr, re.M)
+    assert m, "app.main missing from -X importtime output"
+    took_ms = int(m.group(1)) / 1000
+    assert took_ms <= BUDGET_MS, f"import app.main took {took_ms:.0f} ms (budget {BUDGET_MS:.0f} ms)"
+
+
+def test_heavy_dependencies_are_lazy():
+    proc = _run(f"import sys, app.main; print(','.join(m for m in {LAZY!r} if m in sys.modules))")
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert proc.stdout.strip() == ""
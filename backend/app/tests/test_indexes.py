@@ -0,0 +1,19 @@
+from app.utils.indexes import HOT_QUERIES, INDEXES, UNIQUE_COLLECTIONS, plan_stages
+
+
+def test_plan_stages_flags_collscan():
+    plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "userId_1_date_1"}}
+    assert plan_stages(plan) == ["FETCH", "IXSCAN"]
+    sbe = {"queryPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}
+    assert "COLLSCAN" in plan_stages(sbe)
+
+
+def test_every_hot_query_collection_has_indexes():
+    for _, col, _, _ in HOT_QUERIES:
+        assert INDEXES.get(col), f"no registry index for {col}"
+
+
+def test_upsert_targets_are_built_before_serving():
+    for col in ("ledger_rollups", "forecasts", "goals", "users"):
+        assert col in UNIQUE_COLLECTIONS
+    assert "expenses" not in UNIQUE_COLLECTIONS
@@ -0,0 +1,149 @@
+import mongomock
+import pytest
+
+from app.controllers import expenseController, incomeController
+from app.models.expenseModel import ExpenseCreate
+from app.models.incomeModel import IncomeCreate
+from app.services import ledger_rollups
+from app.services.ledger_rollups import bucket_of, month_key
+from app.services.ledger_queries import SOURCES, month_expr, shape_summary
+from app.tests.conftest import FakeDB
+
+
+def test_month_key_formats():
+    assert month_key("2025-03-14") == "2025-03"
+    assert month_key("2025-03-14T10:20:00Z") == "2025-03"
+    assert month_key("not a date") == "Unknown"
+    assert month_key("") == "Unknown"
+
+
+def test_month_key_matches_month_expr_on_odd_dates():
+    dates = [
+        "2025-03-05", "2025-03-05T10:20:00Z", "2025-3-05", "2025-13-01", "2025-00-10",
+        "2025-12", "25-03-05", "20250305", " 2025-03-05", "", None, 20250305,
+    ]
+    col = mongomock.MongoClient().db.entries
+    col.insert_many([{"i": i, "date": d} for i, d in enumerate(dates)])
+    server = {r["i"]: r["month"] for r in col.aggregate([{"$project": {"i": 1, "month": month_expr()}}])}
+    assert [server[i] for i in range(len(dates))] == [month_key(d) for d in dates]
+    assert [month_key(d) for d in dates[:5]] == ["2025-03", "2025-03", "Unknown", "Unknown", "Unknown"]
+
+
+def test_bucket_of_uses_kind_category_field():
+    exp = {"category": "Food", "amount": "120.5", "date": "2025-01-02"}
+    inc = {"source": "Salary", "amount": 5000, "date": "2025-01-31"}
+    assert bucket_of("expense", exp) == ("2025-01", "Food", 120.5)
+    assert bucket_of("income", inc) == ("2025-01", "Salary", 5000.0)
+    assert bucket_of("expense", {"amount": None, "date": "x"}) == ("Unknown", "Other", 0.0)
+    assert bucket_of("expense", None) is None
+
+
+def test_shape_summary_from_facet():
+    facet = {
+        "byMonth": [
+            {"_id": {"kind": "expense", "month": "2025-01"}, "total": 150},
+            {"_id": {"kind": "income", "month": "2025-01"}, "total": 1000},
+        ],
+        "byCategory": [
+            {"_id": {"kind": "expense", "category": "Food"}, "total": 150},
+            {"_id": {"kind": "income", "category": "Salary"}, "total": 1000},
+        ],
+    }
+    out = shape_summary(facet)
+    assert out["expenseByMonth"] == {"2025-01": 150.0}
+    assert out["incomeBySource"] == {"Salary": 1000.0}
+    assert out["totalIncome"] - out["totalExpense"] == 850.0
+    assert shape_summary(None)["totalExpense"] == 0.0
+
+
+class _Rollups:
+    async def bulk_write(self, ops, ordered=True, session=None):
+        raise RuntimeError("write conflict")
+
+
+class _Repairs:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+class _StandaloneDB(dict):
+    client = object()
+
+    def __init__(self):
+        super().__init__(ledger_rollups=_Rollups(), ledger_rollup_repairs=_Repairs())
+
+    async def command(self, name):
+        return {"isWritablePrimary": True}
+
+
+@pytest.mark.asyncio
+async def test_failed_rollup_update_is_marked_for_repair_without_a_transaction():
+    db = _StandaloneDB()
+    entry = {"category": "Food", "amount": 10, "date": "2025-01-02"}
+    async with ledger_rollups.transaction(db) as session:
+        assert session is None
+        await ledger_rollups.record(db, "u1", "expense", after=entry, session=session)
+    [marker] = db["ledger_rollup_repairs"].docs
+    assert marker["userId"] == "u1" and marker["kind"] == "expense"
+    # inside a transaction the failure propagates and aborts the entry write too
+    with pytest.raises(RuntimeError):
+        await ledger_rollups.record(db, "u1", "expense", after=entry, session=object())
+
+
+def _fresh_buckets(db, user_id):
+    """What a rebuild from the raw collections would produce."""
+    out = {}
+    for kind, (col, _) in SOURCES.items():
+        for doc in db[col].docs.values():
+            if doc["userId"] == user_id:
+                month, category, amount = bucket_of(kind, doc)
+                total, count = out.get((kind, month, category), (0.0, 0))
+                out[(kind, month, category)] = (total + amount, count + 1)
+    return out
+
+
+def _rolled_up(db, user_id):
+    return {
+        (d["kind"], d["month"], d["category"]): (pytest.approx(d["total"]), d["count"])
+        for d in db["ledger_rollups"].docs.values()
+        if d["userId"] == user_id and d["count"]
+    }
+
+
+@pytest.mark.asyncio
+async def test_controller_writes_keep_rollups_equal_to_a_fresh_aggregation(monkeypatch):
+    db = FakeDB()
+
+    async def get_db():
+        return db
+
+    async def notify(*args, **kwargs):
+        pass
+
+    for ctl in (expenseController, incomeController):
+        monkeypatch.setattr(ctl, "get_db", get_db)
+        monkeypatch.setattr(ctl, "notify", notify)
+    monkeypatch.setenv("LEDGER_TRANSACTIONS", "false")
+    uid = "64b000000000000000000001"
+
+    food = await expenseController.create_expense(uid, ExpenseCreate(category="Food", amount=120.5, date="2025-01-02"))
+    rent = await expenseController.create_expense(uid, ExpenseCreate(category="Rent", amount=900, date="2025-01-05"))
+    await expenseController.create_expense(uid, ExpenseCreate(category="Food", amount=30, date="2025-02-01"))
+    salary = await incomeController.create_income(uid, IncomeCreate(source="Salary", amount=5000, date="2025-01-31"))
+    await incomeController.create_income(uid, IncomeCreate(source="Gift", amount=200, date="2025-02-14"))
+    assert _rolled_up(db, uid) == _fresh_buckets(db, uid)
+
+    # category change, month change, amount-only change
+    await expenseController.update_expense(uid, food["_id"], {"category": "Travel"})
+    await expenseController.update_expense(uid, rent["_id"], {"date": "2025-02-05", "amount": 950})
+    await incomeController.update_income(uid, salary["_id"], {"source": "Bonus", "date": "2025-03-01"})
+    assert _rolled_up(db, uid) == _fresh_buckets(db, uid)
+
+    await expenseController.delete_expense(uid, food["_id"])
+    await incomeController.delete_income(uid, salary["_id"])
+    assert _rolled_up(db, uid) == _fresh_buckets(db, uid)
+    assert ("expense", "2025-01", "Travel") not in _rolled_up(db, uid)
+    assert db["ledger_rollup_repairs"].docs == {}
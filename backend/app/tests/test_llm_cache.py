@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.utils.llm_cache import LLMCache
+
+
+@pytest.mark.asyncio
+async def test_fetch_caches_only_ok_and_shares_inflight():
+    cache = LLMCache(ttl=60, max_entries=10)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"ok": True, "output": "hi", "raw": {"big": "payload"}}
+
+    key = LLMCache.make_key("gemini", "m", "sys", "user", {"temperature": 0.4})
+    first, second = await asyncio.gather(cache.fetch(key, call), cache.fetch(key, call))
+    assert calls == 1
+    assert first["output"] == second["output"] == "hi"
+    third = await cache.fetch(key, call)
+    assert third["cached"] is True and "raw" not in third
+    assert cache.stats()["hits"] == 1
+
+    async def failing():
+        return {"ok": False, "message": "boom"}
+
+    other = LLMCache.make_key("gemini", "m", "sys", "other", {})
+    await cache.fetch(other, failing)
+    assert await cache.get(other) is None
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_first_caller_does_not_cancel_waiters():
+    cache = LLMCache(ttl=60, max_entries=10)
+    release = asyncio.Event()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"ok": True, "output": "hi"}
+
+    key = LLMCache.make_key("gemini", "m", "sys", "user", {})
+    leader = asyncio.ensure_future(cache.fetch(key, call))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(cache.fetch(key, call))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    release.set()
+    assert (await waiter)["output"] == "hi"
+    assert calls == 1
+    assert (await cache.fetch(key, call))["cached"] is True
+
+
+def test_lru_evicts_oldest():
+    cache = LLMCache(ttl=60, max_entries=2)
+    for k in ("a", "b"):
+        cache._put_local(k, {"ok": True}, 60)
+    cache._get_local("a")
+    cache._put_local("c", {"ok": True}, 60)
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.evictions == 1
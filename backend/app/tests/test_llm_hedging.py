@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.utils.llm_cache import LLMCache
+from app.utils.llm_connector import LLMClient
+
+
+def _client(gemini, longcat):
+    llm = LLMClient(cache=LLMCache(ttl=0))
+    llm.gemini_chat = gemini
+    llm.longcat_chat = longcat
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_after_delay_and_cancels_loser():
+    cancelled = asyncio.Event()
+
+    async def slow(system, user, **kw):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return {"ok": True, "output": "slow"}
+
+    async def fast(system, user, **kw):
+        return {"ok": True, "output": "fast"}
+
+    llm = _client(slow, fast)
+    res = await asyncio.wait_for(llm.hedged_chat("s", "u", hedge_delay=0.01), 1)
+    assert res["output"] == "fast"
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_failure_fails_over_without_waiting():
+    started = []
+
+    async def broken(system, user, **kw):
+        started.append("gemini")
+        return {"ok": False, "message": "Missing GEMINI_API_KEY"}
+
+    async def backup(system, user, **kw):
+        started.append("longcat")
+        return {"ok": True, "output": "backup"}
+
+    llm = _client(broken, backup)
+    res = await asyncio.wait_for(llm.hedged_chat("s", "u", hedge_delay=10), 1)
+    assert res["output"] == "backup"
+    assert started == ["gemini", "longcat"]
@@ -0,0 +1,77 @@
+import json
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.routes.aiRoutes import DECLINE_REPLY, _guarded
+from app.utils.jwtHandler import create_access_token
+from app.utils.llm_connector import LLMClient, _GEMINI_ROUTES
+
+
+def _sse(*chunks):
+    return "".join(f"data: {json.dumps(c)}\n\n" for c in chunks)
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_falls_back_on_404_and_yields_chunks():
+    _GEMINI_ROUTES.forget("gemini-missing")
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(request.url.path)
+        if "gemini-missing" in request.url.path:
+            return httpx.Response(404, text="not found")
+        body = _sse(
+            {"candidates": [{"content": {"parts": [{"text": "Save "}]}}]},
+            {"candidates": [{"content": {"parts": [{"text": "more."}]}}]},
+        )
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    llm = LLMClient(gemini_key="k", http_client=http)
+    chunks = [c async for c in llm.gemini_stream("sys", "hi", model="gemini-missing")]
+    assert "".join(chunks) == "Save more."
+    assert seen[:2] == [
+        "/v1beta/models/gemini-missing:streamGenerateContent",
+        "/v1/models/gemini-missing:streamGenerateContent",
+    ]
+    await llm.close()
+
+
+@pytest.mark.asyncio
+async def test_longcat_stream_reads_openai_deltas():
+    def handler(request: httpx.Request):
+        assert json.loads(request.content)["stream"] is True
+        body = _sse({"choices": [{"delta": {"content": "Hi"}}]}, {"choices": [{"delta": {}}]}) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=body)
+
+    llm = LLMClient(longcat_key="k", http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    assert [c async for c in llm.longcat_stream("sys", "hi")] == ["Hi"]
+    await llm.close()
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_route_relays_canned_reply():
+    token = create_access_token("507f1f77bcf86cd799439011")
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/api/ai/chat/stream", params={"q": "who are you", "token": token})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[6:]) for line in r.text.splitlines() if line.startswith("data: ")]
+        assert events[0]["delta"].startswith("FinAura")
+        assert events[-1]["done"] is True
+
+
+async def _chunks(*parts):
+    for p in parts:
+        yield p
+
+
+@pytest.mark.asyncio
+async def test_stream_guard_never_sends_flagged_text():
+    events = [e async for e in _guarded(_chunks("Try Insta", "gram for ", "tips"))]
+    assert events == [{"delta": "T"}, {"replace": DECLINE_REPLY}]
+    clean = [e async for e in _guarded(_chunks("Save ", "a bit ", "more each month."))]
+    assert "".join(e["delta"] for e in clean) == "Save a bit more each month."
@@ -0,0 +1,26 @@
+import httpx
+import pytest
+
+from app.tests import llm_stub
+from app.utils.llm_cache import LLMCache
+from app.utils.llm_connector import LLMClient
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setenv("GEMINI_BASE_URL", "http://llm-stub")
+    monkeypatch.setenv("LONGCAT_BASE_URL", "http://llm-stub")
+    monkeypatch.setattr(llm_stub.app.state, "chunks", 4)
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=llm_stub.app))
+    return LLMClient(gemini_key="k", longcat_key="k", http_client=http, cache=LLMCache(ttl=0))
+
+
+@pytest.mark.asyncio
+async def test_stub_speaks_both_provider_protocols(llm):
+    for call in (llm.gemini_chat, llm.longcat_chat):
+        res = await call("sys", "hi", cache=False)
+        assert res["ok"] and res["output"] == llm_stub.REPLY
+    for stream in (llm.gemini_stream, llm.longcat_stream):
+        chunks = [c async for c in stream("sys", "hi")]
+        assert len(chunks) == 4 and "".join(chunks) == llm_stub.REPLY
+    await llm.close()
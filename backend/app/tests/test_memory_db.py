@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.memory_db import HashingEmbedder, MemoryDB, _UserIndex
+
+
+def test_embedder_is_stable_and_normalised():
+    emb = HashingEmbedder(64)
+    a = emb.embed("Monthly grocery budget")
+    assert a.dtype == np.float32
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert np.array_equal(a, HashingEmbedder(64).embed("monthly  GROCERY budget"))
+    assert not emb.embed("").any()
+
+
+@pytest.mark.asyncio
+async def test_query_ranks_by_similarity_per_user():
+    mem = MemoryDB(dim=128, capacity=100)
+    await mem.add("u1", "Q: how much did I spend on groceries\nA: 4200 on groceries")
+    await mem.add("u1", "Q: what is my salary\nA: income 50000")
+    await mem.add("u2", "groceries for someone else")
+    hits = await mem.query("u1", "grocery spend", top_k=1)
+    assert hits == ["Q: how much did I spend on groceries\nA: 4200 on groceries"]
+    assert await mem.query("u3", "grocery") == []
+
+
+@pytest.mark.asyncio
+async def test_capacity_evicts_oldest_and_persists(tmp_path):
+    mem = MemoryDB(dim=64, capacity=3, directory=str(tmp_path))
+    for i in range(5):
+        await mem.add("u1", f"note {i} rent")
+    assert sorted(await mem.query("u1", "rent note", top_k=10)) == ["note 2 rent", "note 3 rent", "note 4 rent"]
+    mem.close()
+
+    reopened = MemoryDB(dim=64, capacity=3, directory=str(tmp_path))
+    assert sorted(await reopened.query("u1", "rent", top_k=10)) == ["note 2 rent", "note 3 rent", "note 4 rent"]
+    await reopened.add("u1", "note 5 rent")
+    assert "note 2 rent" not in await reopened.query("u1", "rent", top_k=10)
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_file_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    for name in ("load", "_append_log"):
+        original = getattr(_UserIndex, name)
+
+        def spy(self, *args, _original=original):
+            threads.append(threading.get_ident())
+            return _original(self, *args)
+
+        monkeypatch.setattr(_UserIndex, name, spy)
+    mem = MemoryDB(dim=64, capacity=10, directory=str(tmp_path))
+    await mem.add("u1", "rent paid")
+    assert await mem.query("u1", "rent") == ["rent paid"]
+    mem.close()
+    assert threads and threading.get_ident() not in threads
+
+
+def test_default_exact_limit_leaves_room_for_lsh():
+    mem = MemoryDB()
+    assert mem.exact_limit < mem.capacity
+
+
+@pytest.mark.asyncio
+async def test_lsh_path_matches_exact_for_near_duplicates():
+    mem = MemoryDB(dim=128, capacity=500, exact_limit=10, lsh_bits=4)
+    for i in range(200):
+        await mem.add("u1", f"expense entry {i} category misc")
+    await mem.add("u1", "vacation flight tickets to goa")
+    assert (await mem.query("u1", "flight tickets goa", top_k=1)) == ["vacation flight tickets to goa"]
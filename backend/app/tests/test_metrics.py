@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.utils import metrics
+from app.utils.llm_cache import LLMCache
+from app.utils.llm_connector import LLMClient
+from app.utils.metrics import CommandMetrics, Counter, Histogram, MetricsMiddleware
+
+
+def _event(name, command, request_id, micros=2000):
+    return SimpleNamespace(command_name=name, command=command, request_id=request_id, connection_id=("db", 27017), duration_micros=micros)
+
+
+def test_histogram_and_counter_text_format():
+    h = Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    h.observe(0.05, route='/a"b')
+    h.observe(0.5, route='/a"b')
+    c = Counter("t_total", "Test.", ("kind",))
+    c.inc(kind="x")
+    c.inc(2, kind="x")
+    lines = h.render() + c.render()
+    assert 't_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{route="/a\\"b",le="+Inf"} 2' in lines
+    assert 't_seconds_count{route="/a\\"b"} 2' in lines
+    assert "# TYPE t_total counter" in lines and 't_total{kind="x"} 3.0' in lines
+
+
+def test_command_listener_attributes_commands_to_the_request():
+    listener = CommandMetrics()
+    stats = metrics.RequestStats()
+    token = metrics._current.set(stats)
+    try:
+        with metrics.section("unit"):
+            listener.started(_event("find", {"find": "goals", "filter": {}}, 1))
+            listener.succeeded(_event("find", {}, 1, micros=3000))
+        listener.started(_event("getMore", {"getMore": 123, "collection": "expenses"}, 2))
+        listener.failed(_event("getMore", {}, 2))
+        listener.started(_event("hello", {"hello": 1}, 3))
+        listener.succeeded(_event("hello", {}, 3))
+    finally:
+        metrics._current.reset(token)
+    assert stats.db == [("goals", "find", 0.003), ("expenses", "getMore", 0.002)]
+    assert stats.db_breakdown() == {"goals.find": {"count": 1, "ms": 3.0}, "expenses.getMore": {"count": 1, "ms": 2.0}}
+    assert metrics.DB_SECONDS.count(collection="goals", command="find", route="unmatched", section="unit") >= 1
+    assert metrics.DB_FAILURES.value(collection="expenses", command="getMore") >= 1
+
+
+@pytest.mark.asyncio
+async def test_slow_request_log_has_query_breakdown(caplog):
+    listener = CommandMetrics()
+    demo = FastAPI()
+    demo.add_middleware(MetricsMiddleware, slow_ms=20)
+
+    @demo.get("/items/{item_id}")
+    async def item(item_id: str):
+        async def query():
+            # a task the request spawned still counts for the request
+            listener.started(_event("aggregate", {"aggregate": "ledger_rollups"}, 10))
+            listener.succeeded(_event("aggregate", {}, 10, micros=15000))
+        await asyncio.ensure_future(query())
+        metrics.observe_llm("gemini", "m", "chat", "ok", 0.01)
+        await asyncio.sleep(0.03)
+        return {"id": item_id}
+
+    before = metrics.SLOW_REQUESTS.value(route="/items/{item_id}")
+    with caplog.at_level(logging.WARNING, logger="app.utils.metrics"):
+        async with AsyncClient(transport=ASGITransport(app=demo), base_url="http://test") as ac:
+            assert (await ac.get("/items/7")).status_code == 200
+    assert metrics.SLOW_REQUESTS.value(route="/items/{item_id}") == before + 1
+    assert metrics.HTTP_SECONDS.count(method="GET", route="/items/{item_id}", status="200") >= 1
+    msg = caplog.records[-1].getMessage()
+    assert "GET /items/{item_id} -> 200" in msg
+    assert "'ledger_rollups.aggregate': {'count': 1, 'ms': 15.0}" in msg and "'provider': 'gemini'" in msg
+
+
+@pytest.mark.asyncio
+async def test_llm_calls_are_timed_by_provider_model_and_status():
+    def handler(request: httpx.Request):
+        if "generateContent" in request.url.path:
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "hi"}]}}]})
+        return httpx.Response(500, json={})
+
+    llm = LLMClient(gemini_key="k", longcat_key="k", http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)), cache=LLMCache(ttl=0))
+    ok = metrics.LLM_SECONDS.count(provider="gemini", model="stub-model", call="chat", status="ok")
+    err = metrics.LLM_SECONDS.count(provider="longcat", model="LongCat-Flash-Chat", call="chat", status="error")
+    assert (await llm.gemini_chat("s", "u", model="stub-model", cache=False))["ok"]
+    assert not (await llm.longcat_chat("s", "u", cache=False))["ok"]
+    await llm.close()
+    assert metrics.LLM_SECONDS.count(provider="gemini", model="stub-model", call="chat", status="ok") == ok + 1
+    assert metrics.LLM_SECONDS.count(provider="longcat", model="LongCat-Flash-Chat", call="chat", status="error") == err + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/health")
+        r = await ac.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    assert 'finaura_http_request_seconds_count{method="GET",route="/health",status="200"}' in r.text
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.utils import notifier, realtime
+from app.tests.conftest import FakeDB
+from app.utils.notifier import NotificationPipeline
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    b = realtime.RealtimeBus()
+    monkeypatch.setattr(realtime, "_BUS", b)
+    return b
+
+
+@pytest.mark.asyncio
+async def test_notify_batches_and_publishes(monkeypatch, bus):
+    pipeline = NotificationPipeline(batch_size=10, flush_ms=50)
+    monkeypatch.setattr(notifier, "_PIPELINE", pipeline)
+    db = FakeDB()
+    q = bus.subscribe("u1")
+    await pipeline.start()
+    ids = [await notifier.notify(db, "u1", type="expense", title=f"t{i}") for i in range(3)]
+    assert db["notifications"].calls == []  # nothing written on the caller's path
+    await pipeline.stop()
+    assert len(db["notifications"].calls) == 1
+    assert db["notifications"].calls[0][0] == "insert_many"
+    assert [d["_id"] for d in db["notifications"].calls[0][1]] == ids
+    events = [q.get_nowait() for _ in range(3)]
+    assert [e["title"] for e in events] == ["t0", "t1", "t2"]
+    assert events[0]["_id"] == str(ids[0])
+    assert pipeline.stats()["written"] == 3
+
+
+@pytest.mark.asyncio
+async def test_notify_flushes_on_size_and_writes_inline_when_stopped(monkeypatch, bus):
+    pipeline = NotificationPipeline(batch_size=2, flush_ms=1000)
+    monkeypatch.setattr(notifier, "_PIPELINE", pipeline)
+    db = FakeDB()
+    await pipeline.start()
+    for i in range(4):
+        await notifier.notify(db, "u1", title=str(i))
+    for _ in range(20):
+        if len(db["notifications"].calls) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert [len(docs) for _, docs in db["notifications"].calls] == [2, 2]
+    await pipeline.stop()
+    await notifier.notify(db, "u1", title="late")
+    op, doc = db["notifications"].calls[-1]
+    assert op == "insert_one" and doc["title"] == "late"
@@ -0,0 +1,61 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.tests.conftest import FakeDB
+from app.utils.pagination import MAX_LIMIT, PageParams, build_query, decode_cursor, encode_cursor, page_params, paginate, projection
+
+
+def test_cursor_roundtrip_and_rejects_garbage():
+    oid = ObjectId()
+    cursor = encode_cursor("2025-01-31", oid)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2025-01-31", oid)
+    with pytest.raises(HTTPException) as e:
+        decode_cursor("not-a-cursor")
+    assert e.value.status_code == 400
+
+
+def test_build_query_keyset_and_range():
+    oid = ObjectId()
+    params = PageParams(after=encode_cursor("2025-02-10", oid), start="2025-01-01", end="2025-02-28")
+    q = build_query({"userId": "u1"}, params, "date")
+    assert q["userId"] == "u1"
+    assert q["date"] == {"$gte": "2025-01-01", "$lte": "2025-02-28￿"}
+    assert q["$or"] == [{"date": {"$lt": "2025-02-10"}}, {"date": "2025-02-10", "_id": {"$lt": oid}}, {"date": None}]
+    # missing sort keys sort last, so only the _id tiebreak remains
+    q = build_query({"userId": "u1"}, PageParams(after=encode_cursor(None, oid)), "date")
+    assert q["$or"] == [{"date": None, "_id": {"$lt": oid}}]
+
+
+def test_page_params_caps_limit_and_validates_fields():
+    assert page_params(limit=10**6, after=None, start=None, end=None, fields=None).limit == MAX_LIMIT
+    p = page_params(limit=None, after=None, start=None, end=None, fields="amount, category")
+    assert projection(p, "date") == {"amount": 1, "category": 1, "date": 1}
+    with pytest.raises(HTTPException):
+        page_params(limit=5, after=None, start=None, end=None, fields="amount,$where")
+
+
+@pytest.mark.asyncio
+async def test_paginate_walks_ties_and_missing_dates_exactly_once():
+    dates = ["2025-03-01", "2025-02-01", "2025-02-01", "2025-02-01", "2025-01-15", None, None, "missing"]
+    docs = []
+    for d in dates:
+        doc = {"_id": ObjectId(), "userId": "u1"}
+        if d != "missing":
+            doc["date"] = d
+        docs.append(doc)
+    db = FakeDB({"expenses": docs + [{"_id": ObjectId(), "userId": "u2", "date": "2025-02-01"}]})
+    seen, after, pages = [], None, 0
+    while True:
+        page, after = await paginate(db["expenses"], {"userId": "u1"}, PageParams(limit=2, after=after))
+        seen.extend(page)
+        pages += 1
+        if after is None:
+            break
+    assert pages == 4
+    assert sorted(d["_id"] for d in seen) == sorted(d["_id"] for d in docs)
+    # newest first, ties broken by _id descending, undated entries last
+    assert [d.get("date") for d in seen] == ["2025-03-01", "2025-02-01", "2025-02-01", "2025-02-01", "2025-01-15", None, None, None]
+    tied = [d["_id"] for d in seen if d.get("date") == "2025-02-01"]
+    assert tied == sorted(tied, reverse=True)
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from app.utils import passwords
+
+
+@pytest.mark.asyncio
+async def test_hash_verify_and_rehash_detection():
+    hashed = await passwords.hash_password("s3cret", rounds=4)
+    assert passwords.hash_rounds(hashed) == 4
+    assert await passwords.verify_password("s3cret", hashed)
+    assert not await passwords.verify_password("wrong", hashed)
+    assert not await passwords.verify_password("s3cret", "")
+    assert not await passwords.verify_password("s3cret", "not-a-bcrypt-hash")
+    assert passwords.needs_rehash(hashed, rounds=5)
+    assert not passwords.needs_rehash(hashed, rounds=4)
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_the_loop(monkeypatch):
+    monkeypatch.setattr(passwords, "CONCURRENCY", 2)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.001)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await asyncio.gather(*(passwords.hash_password("pw", rounds=8) for _ in range(4)))
+    task.cancel()
+    assert ticks > 5
@@ -0,0 +1,88 @@
+import hashlib
+import hmac
+import json
+import time
+
+import httpx
+import pytest
+
+from app.tests import stripe_stub
+from app.utils.payment import StripeClient, StripeError, encode_form, verify_webhook
+
+
+@pytest.fixture
+def stub():
+    app = stripe_stub.app
+    app.state.sessions.clear()
+    app.state.idempotency.clear()
+    app.state.requests.clear()
+    app.state.fail_next = 0
+    app.state.fail_status = 500
+    return app
+
+
+def _client(app, **kw):
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stripe.test")
+    return StripeClient("sk_test_stub", api_base="http://stripe.test", http_client=http, backoff=0, **kw)
+
+
+def test_encode_form_nests_like_stripe():
+    assert encode_form({"a": {"b": [{"c": 1}, "x"]}, "ok": True, "skip": None}) == [
+        ("a[b][0][c]", "1"),
+        ("a[b][1]", "x"),
+        ("ok", "true"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_create_and_retrieve_session_with_retry(stub):
+    client = _client(stub, max_retries=2)
+    stub.state.fail_next = 2
+    created = await client.create_checkout_session({
+        "mode": "payment",
+        "line_items": [{"price_data": {"currency": "inr", "unit_amount": 50000}, "quantity": 1}],
+        "metadata": {"userId": "u1"},
+    })
+    assert created["amount_total"] == 50000 and created["metadata"] == {"userId": "u1"}
+    posts = [h for m, p, h in stub.state.requests if m == "POST"]
+    assert len(posts) == 3
+    assert len({h["idempotency-key"] for h in posts}) == 1  # retries reuse the key
+    fetched = await client.retrieve_checkout_session(created["id"])
+    assert fetched["id"] == created["id"]
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(stub):
+    client = _client(stub, max_retries=3)
+    with pytest.raises(StripeError) as e:
+        await client.retrieve_checkout_session("cs_missing")
+    assert e.value.status == 404
+    assert len(stub.state.requests) == 1
+    stub.state.fail_next, stub.state.fail_status = 5, 503
+    with pytest.raises(StripeError):
+        await client.retrieve_checkout_session("cs_missing")
+    assert len(stub.state.requests) == 1 + 4
+
+
+@pytest.mark.asyncio
+async def test_session_id_cannot_escape_the_sessions_path(stub):
+    client = _client(stub)
+    for bad in ("../../customers/cus_x", "cs_ok/../../customers/cus_x", "cs_x%2F..", "cs_x\n", "", "cus_x"):
+        with pytest.raises(StripeError) as e:
+            await client.retrieve_checkout_session(bad)
+        assert e.value.status == 400
+    assert stub.state.requests == []
+
+
+def test_verify_webhook_signature():
+    payload = json.dumps({"type": "checkout.session.completed"}).encode()
+    ts = int(time.time())
+    sig = hmac.new(b"whsec", f"{ts}.".encode() + payload, hashlib.sha256).hexdigest()
+    assert verify_webhook(f"t={ts},v1={sig}", payload, secret="whsec")["type"] == "checkout.session.completed"
+    with pytest.raises(StripeError):
+        verify_webhook(f"t={ts},v1={'0' * 64}", payload, secret="whsec")
+    with pytest.raises(StripeError):
+        verify_webhook(f"t={ts},v1={sig}", payload, secret="whsec", now=ts + 3600)
+    with pytest.raises(StripeError) as missing:
+        verify_webhook(f"t={ts},v1={sig}", payload, secret="")
+    assert missing.value.status == 503
@@ -0,0 +1,101 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.controllers import goalController
+from app.main import app
+from app.services import progress_cache
+from app.services.progress_cache import ProgressCache, etag_matches, get_progress_cache
+from app.services.snapshot import get_snapshot
+from app.utils.jwtHandler import get_current_user_id
+
+
+class FakeSnapshot:
+    def __init__(self, version, goal=True):
+        self.version = version
+        self.has_goal = goal
+        self.reads = 0
+
+    async def user(self):
+        self.reads += 1
+        return {"dataVersion": self.version}
+
+    async def goal(self):
+        return {"name": "Car"} if self.has_goal else None
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    runs = []
+
+    async def compute(user_id, snap=None):
+        runs.append(user_id)
+        return {"progressPercent": len(runs)}
+
+    monkeypatch.setattr(goalController, "compute_goal_progress", compute)
+    return runs
+
+
+@pytest.mark.asyncio
+async def test_cached_until_version_or_month_changes(computed, monkeypatch):
+    cache = ProgressCache()
+    etag1, first = await cache.lookup("u1", FakeSnapshot(3))
+    etag2, again = await cache.lookup("u1", FakeSnapshot(3))
+    assert etag1 == etag2 and again is first and len(computed) == 1
+
+    etag3, fresh = await cache.lookup("u1", FakeSnapshot(4))
+    assert etag3 != etag1 and fresh["progressPercent"] == 2
+
+    monkeypatch.setattr(progress_cache, "_month", lambda: "2099-01")
+    etag4, _ = await cache.lookup("u1", FakeSnapshot(4))
+    assert etag4 != etag3 and len(computed) == 3
+    # users never share an etag
+    assert (await cache.lookup("u2", FakeSnapshot(4)))[0] != etag4
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 4, "notModified": 0}
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_skips_the_computation(computed):
+    cache = ProgressCache()
+    etag, _ = await cache.lookup("u1", FakeSnapshot(1))
+    assert await cache.lookup("u1", FakeSnapshot(1), f'"old", W/{etag}') == (etag, None)
+    assert len(computed) == 1
+    assert etag_matches("*", etag) and not etag_matches('"gp-x"', etag) and not etag_matches(None, etag)
+
+
+@pytest.mark.asyncio
+async def test_wildcard_if_none_match_needs_a_goal(computed):
+    cache = ProgressCache()
+    etag, _ = await cache.lookup("u1", FakeSnapshot(1))
+    assert await cache.lookup("u1", FakeSnapshot(1), "*") == (etag, None)
+    assert (await cache.lookup("u2", FakeSnapshot(1, goal=False), "*"))[1] is not None
+    assert len(computed) == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_bound(computed):
+    cache = ProgressCache(max_entries=2)
+    for uid in ("a", "b", "c"):
+        await cache.lookup(uid, FakeSnapshot(0))
+    assert list(cache._entries) == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_progress_route_returns_304_for_current_etag(computed, monkeypatch):
+    monkeypatch.setattr(progress_cache, "_CACHE", ProgressCache())
+    snap = FakeSnapshot(7)
+    app.dependency_overrides[get_snapshot] = lambda: snap
+    app.dependency_overrides[get_current_user_id] = lambda: "u1"
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            r = await ac.get("/api/goals/progress")
+            assert r.status_code == 200 and r.json() == {"progressPercent": 1}
+            etag = r.headers["etag"]
+            r2 = await ac.get("/api/goals/progress", headers={"If-None-Match": etag})
+            assert r2.status_code == 304 and r2.content == b"" and r2.headers["etag"] == etag
+            snap.version = 8
+            r3 = await ac.get("/api/goals/progress", headers={"If-None-Match": etag})
+            assert r3.status_code == 200 and r3.headers["etag"] != etag
+    finally:
+        app.dependency_overrides.clear()
+    assert len(computed) == 2
+    assert get_progress_cache().stats()["notModified"] == 1
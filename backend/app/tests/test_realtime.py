@@ -0,0 +1,103 @@
+import pytest
+
+from app.tests.conftest import FakeDB
+
+from app.utils.realtime import RESYNC, RealtimeBus
+
+
+@pytest.mark.asyncio
+async def test_fanout_and_metrics():
+    bus = RealtimeBus(queue_size=10)
+    a, b = bus.subscribe("u1"), bus.subscribe("u1")
+    other = bus.subscribe("u2")
+    await bus.publish("u1", {"title": "hi"})
+    assert a.get_nowait() == b.get_nowait() == {"title": "hi"}
+    assert other.empty()
+    stats = bus.stats()
+    assert stats["users"]["u1"] == {"published": 1, "delivered": 2, "dropped": 0, "subscribers": 2, "queued": 0}
+    bus.unsubscribe("u1", a)
+    bus.unsubscribe("u1", b)
+    assert "u1" not in bus.stats()["users"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy,expected,dropped", [
+    ("drop_oldest", [{"n": 1}, {"n": 2}], 1),
+    ("drop_new", [{"n": 0}, {"n": 1}], 1),
+    # the two queued events are discarded along with the incoming one
+    ("coalesce", [{"event": RESYNC, "dropped": 3}], 3),
+])
+async def test_overflow_policies(policy, expected, dropped):
+    bus = RealtimeBus(queue_size=2, policy=policy)
+    q = bus.subscribe("u1")
+    for n in range(3):
+        await bus.publish("u1", {"n": n})
+    got = []
+    while not q.empty():
+        got.append(q.get_nowait())
+    assert got == expected
+    assert bus.stats()["dropped"] == bus.stats()["users"]["u1"]["dropped"] == dropped
+
+
+@pytest.mark.asyncio
+async def test_coalesce_does_not_count_the_resync_marker():
+    bus = RealtimeBus(queue_size=1, policy="coalesce")
+    q = bus.subscribe("u1")
+    for n in range(3):
+        await bus.publish("u1", {"n": n})
+    assert q.get_nowait() == {"event": RESYNC, "dropped": 3}
+    assert bus.stats()["dropped"] == 3
+
+
+@pytest.mark.asyncio
+async def test_mongo_publish_failure_is_logged_not_raised(monkeypatch, caplog):
+    async def get_db():
+        raise RuntimeError("mongo down")
+
+    monkeypatch.setattr("app.utils.dbConnect.get_db", get_db)
+    bus = RealtimeBus(backend="mongo")
+    bus._shared = True  # as after a successful start()
+    q = bus.subscribe("u1")
+    await bus.publish("u1", {"title": "hi"})
+    assert q.get_nowait() == {"title": "hi"}
+    assert bus.stats()["failed"] == 1
+    assert "mongo down" in caplog.text
+
+
+async def _patched_db(monkeypatch, db):
+    async def get_db():
+        return db
+
+    monkeypatch.setattr("app.utils.dbConnect.get_db", get_db)
+
+
+@pytest.mark.asyncio
+async def test_start_creates_the_capped_collection_before_publishing(monkeypatch):
+    db = FakeDB()
+    await _patched_db(monkeypatch, db)
+    bus = RealtimeBus(backend="mongo", capped_bytes=4096)
+    await bus.publish("u1", {"n": 0})
+    assert "realtime_events" not in db  # nothing written before start()
+    await bus.start()
+    try:
+        assert db["realtime_events"].collection_options == {"capped": True, "size": 4096}
+        await bus.publish("u1", {"n": 1})
+        assert [d["event"] for d in db["realtime_events"].docs.values()] == [{"n": 1}]
+        assert bus.stats()["shared"] is True
+    finally:
+        await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_uncapped_collection_is_reported_and_left_alone(monkeypatch, caplog):
+    db = FakeDB()
+    db["realtime_events"]  # an earlier insert created it as a plain collection
+    await _patched_db(monkeypatch, db)
+    bus = RealtimeBus(backend="mongo")
+    await bus.start()
+    q = bus.subscribe("u1")
+    await bus.publish("u1", {"n": 1})
+    assert q.get_nowait() == {"n": 1}
+    assert db["realtime_events"].docs == {}
+    assert bus.stats()["shared"] is False and bus._tail_task is None
+    assert "not capped" in caplog.text
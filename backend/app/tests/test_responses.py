@@ -0,0 +1,130 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+
+from app.utils.compression import CompressionMiddleware, choose_encoding
+from app.utils.pagination import NEXT_CURSOR_HEADER, page_response
+from app.utils.responses import ORJSONResponse
+
+
+class Point(BaseModel):
+    x: int
+
+
+def test_orjson_response_handles_mongo_types():
+    oid = ObjectId()
+    body = ORJSONResponse([{
+        "_id": oid,
+        "createdAt": datetime(2024, 3, 1, 12, 30),
+        "amount": Decimal("12.5"),
+        "score": np.float64(0.25),
+        "tags": {"a"},
+        "point": Point(x=1),
+        2024: "int key",
+    }]).body
+    assert json.loads(body) == [{
+        "_id": str(oid),
+        "createdAt": "2024-03-01T12:30:00",
+        "amount": 12.5,
+        "score": 0.25,
+        "tags": ["a"],
+        "point": {"x": 1},
+        "2024": "int key",
+    }]
+    with pytest.raises(TypeError):
+        ORJSONResponse({"x": object()})
+
+
+def test_page_response_sets_cursor_header():
+    oid = ObjectId()
+    r = page_response([{"_id": oid}], "abc")
+    assert json.loads(r.body) == [{"_id": str(oid)}] and r.headers[NEXT_CURSOR_HEADER] == "abc"
+    assert NEXT_CURSOR_HEADER not in page_response([], None).headers
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate, br", brotli_available=True) == "br"
+    assert choose_encoding("gzip, deflate, br", brotli_available=False) == "gzip"
+    assert choose_encoding("br;q=0, gzip;q=0.5", brotli_available=True) == "gzip"
+    assert choose_encoding("*", brotli_available=False) == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+
+def _app():
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    rows = [{"_id": ObjectId(), "note": f"row {i}"} for i in range(50)]
+
+    @app.get("/big")
+    async def big():
+        return ORJSONResponse(rows, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def gen():
+            for i in range(3):
+                yield ("x" * 100 + "\n").encode()
+        return StreamingResponse(gen(), media_type="text/plain")
+
+    @app.get("/events")
+    async def events():
+        return PlainTextResponse("data: x\n\n" * 50, media_type="text/event-stream")
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_compresses_only_large_buffered_bodies():
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as ac:
+        # keep the raw bytes so we can see what went over the wire
+        async with ac.stream("GET", "/big", headers={"Accept-Encoding": "gzip"}) as r:
+            raw = b"".join([part async for part in r.aiter_raw()])
+        assert r.headers["content-encoding"] == "gzip" and r.headers["vary"] == "Accept-Encoding"
+        assert r.headers["etag"] == 'W/"v1"'
+        assert int(r.headers["content-length"]) == len(raw)
+        assert len(json.loads(gzip.decompress(raw))) == 50
+
+        for path in ("/small", "/stream", "/events"):
+            r = await ac.get(path, headers={"Accept-Encoding": "gzip"})
+            assert "content-encoding" not in r.headers, path
+        r = await ac.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in r.headers and len(r.json()) == 50
+        assert r.headers["etag"] == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_event_stream_headers_are_not_held_back():
+    sent = []
+    release = asyncio.Event()
+
+    async def idle_feed(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        await release.wait()
+        await send({"type": "http.response.body", "body": b"data: x\n\n" * 500, "more_body": False})
+
+    async def record(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    task = asyncio.ensure_future(CompressionMiddleware(idle_feed, minimum_size=10)(scope, None, record))
+    await asyncio.sleep(0.01)
+    # the client sees the stream open before any event arrives
+    assert [m["type"] for m in sent] == ["http.response.start"]
+    release.set()
+    await task
+    assert sent[1]["body"].startswith(b"data: x")
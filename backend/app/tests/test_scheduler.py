@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.scheduler import LEASES, CronSchedule, Job, Scheduler, each_user
+from app.tests.conftest import FakeDB
+
+
+def _db_with_users(n):
+    db = FakeDB()
+    for _ in range(n):
+        oid = ObjectId()
+        db["users"].docs[oid] = {"_id": oid}
+    return db
+
+
+def _job(handler, **kw):
+    opts = dict(shards=4, batch_size=50, concurrency=2, jitter=0, poll_seconds=0.01)
+    opts.update(kw)
+    return Job("test", CronSchedule("@daily"), handler, **opts)
+
+
+def test_cron_next_after():
+    at = datetime(2024, 1, 5, 3, 0)  # a Friday
+    assert CronSchedule("30 2 * * *").next_after(at) == datetime(2024, 1, 6, 2, 30)
+    assert CronSchedule("*/15 * * * *").next_after(at) == datetime(2024, 1, 5, 3, 15)
+    assert CronSchedule("0 9 * * 1-5").next_after(datetime(2024, 1, 5, 10, 0)) == datetime(2024, 1, 8, 9, 0)
+    assert CronSchedule("0 0 1 */3 *").next_after(at) == datetime(2024, 4, 1)
+    # day of month and day of week both restricted: either one matches
+    assert CronSchedule("0 0 13 * 0").next_after(at) == datetime(2024, 1, 7)
+    assert CronSchedule("@daily").next_after(at) == datetime(2024, 1, 6)
+    for bad in ("* * *", "60 * * * *", "0 0 30 2-1 *", "*/0 * * * *"):
+        with pytest.raises(ValueError):
+            CronSchedule(bad)
+
+
+@pytest.mark.asyncio
+async def test_workers_split_shards_and_cover_every_user_once():
+    db = _db_with_users(1000)
+    seen = []
+
+    async def handler(db, user_ids):
+        seen.extend(user_ids)
+        await asyncio.sleep(0)
+
+    a = Scheduler([_job(handler)], owner="a")
+    b = Scheduler([_job(handler)], owner="b")
+    fire = datetime(2024, 1, 1, 2, 0)
+    ra, rb = await asyncio.gather(a.run_job("test", fire, db), b.run_job("test", fire, db))
+    assert sorted(seen) == sorted(str(k) for k in db["users"].docs)
+    assert ra["shards"] + rb["shards"] == 4
+    assert ra["users"] + rb["users"] == 1000
+    assert a.metrics["test"].shards_skipped + b.metrics["test"].shards_skipped == 4
+    # a late worker finds every shard done
+    c = Scheduler([_job(handler)], owner="c")
+    assert (await c.run_job("test", fire, db))["users"] == 0
+    assert len(seen) == 1000
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_resumes_from_checkpoint():
+    db = _db_with_users(300)
+    ids = sorted(db["users"].docs)
+    fire = datetime(2024, 1, 1, 2, 0)
+    run = f"test@{fire:%Y-%m-%dT%H:%M}"
+    past = datetime.utcnow() - timedelta(seconds=1)
+    db[LEASES].docs[run] = {"_id": run, "bounds": []}
+    db[LEASES].docs[f"{run}#0"] = {"_id": f"{run}#0", "owner": "dead", "done": False, "expiresAt": past, "lastId": ids[99], "processed": 100}
+    seen = []
+
+    async def handler(db, user_ids):
+        seen.extend(user_ids)
+
+    s = Scheduler([_job(handler, shards=1)], owner="new")
+    summary = await s.run_job("test", fire, db)
+    assert seen == [str(i) for i in ids[100:]]
+    assert summary["users"] == 200
+    lease = db[LEASES].docs[f"{run}#0"]
+    assert lease["done"] and lease["owner"] == "new" and lease["processed"] == 300
+
+
+@pytest.mark.asyncio
+async def test_failures_are_counted_and_user_concurrency_is_capped():
+    db = _db_with_users(120)
+    active = peak = 0
+
+    async def per_user(db, uid):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001)
+        active -= 1
+        if uid.endswith("0"):
+            raise RuntimeError("boom")
+
+    s = Scheduler([_job(each_user(per_user, limit=3), shards=1)], owner="x")
+    summary = await s.run_job("test", datetime(2024, 1, 1), db)
+    assert peak <= 3
+    assert summary["users"] == 120
+    assert summary["errors"] == sum(1 for k in db["users"].docs if str(k).endswith("0"))
+    stats = s.stats()["jobs"]["test"]
+    assert stats["batches"] == 3 and stats["batchP50Ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_waiting_worker_takes_over_a_stalled_live_owner():
+    db = _db_with_users(200)
+    ids = sorted(str(k) for k in db["users"].docs)
+    fire = datetime(2024, 1, 1, 2, 0)
+    stalled = asyncio.Event()
+    by_a, by_b = [], []
+
+    async def handler_a(db, user_ids):
+        if by_a:
+            stalled.set()
+            await asyncio.Event().wait()  # owner is alive but stops renewing
+        by_a.extend(user_ids)
+
+    async def handler_b(db, user_ids):
+        by_b.extend(user_ids)
+
+    opts = dict(shards=1, lease_seconds=0.2, batch_timeout=60)
+    a = Scheduler([_job(handler_a, **opts)], owner="a")
+    b = Scheduler([_job(handler_b, **opts)], owner="b")
+    task_a = asyncio.ensure_future(a.run_job("test", fire, db))
+    await stalled.wait()
+    # b finds the shard held, then takes it over from a's checkpoint once the lease expires
+    summary = await asyncio.wait_for(b.run_job("test", fire, db), 5)
+    task_a.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task_a
+    assert by_a == ids[:50] and by_b == ids[50:]
+    assert summary["users"] == 150 and summary["shards"] == 1
+    lease = db[LEASES].docs[f"test@{fire:%Y-%m-%dT%H:%M}#0"]
+    assert lease["done"] and lease["owner"] == "b" and lease["processed"] == 200
@@ -0,0 +1,119 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from bson import ObjectId
+from httpx import ASGITransport, AsyncClient
+
+from app.controllers.goalController import compute_goal_progress
+from app.main import app
+from app.services import ledger_rollups
+from app.services.snapshot import UserFinancialSnapshot, get_snapshot
+from app.tests.conftest import FakeDB
+from app.utils.jwtHandler import get_current_user_id
+from app.utils.llm_connector import get_llm_client
+
+UID = str(ObjectId())
+GOAL = {"_id": ObjectId(), "userId": UID, "name": "Phone", "targetAmount": 12000.0, "targetDate": "2030-01", "active": True, "createdAt": "2024-01-01T00:00:00"}
+LEDGER = {
+    "incomeByMonth": {"2024-01": 5000.0, "2024-02": 5000.0},
+    "expenseByMonth": {"2024-01": 2000.0, "2024-02": 2000.0},
+    "incomeBySource": {"Salary": 10000.0},
+    "expenseByCategory": {"food": 4000.0},
+    "totalIncome": 10000.0,
+    "totalExpense": 4000.0,
+}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    c = Counter()
+
+    async def summary(db, user_id):
+        c["ledger"] += 1
+        await asyncio.sleep(0.01)
+        return LEDGER
+
+    monkeypatch.setattr(ledger_rollups, "summary", summary)
+    return c
+
+
+def _snapshot(calls):
+    db = FakeDB({
+        "users": [{"_id": ObjectId(UID), "walletBalance": 500, "riskProfile": "low", "passwordHash": "x"}],
+        "goals": [GOAL],
+        "investments": [
+            {"_id": ObjectId(), "userId": UID, "type": "Stock", "amount": 100, "roi": 0.1},
+            {"_id": ObjectId(), "userId": UID, "type": "MF", "amount": 250, "roi": 0.04},
+        ],
+    }, latency=0.01)
+    calls.db = db
+    return UserFinancialSnapshot(db, UID)
+
+
+def _reads(calls):
+    """Round trips per collection, plus the patched ledger summary."""
+    return Counter({name: len(col.calls) for name, col in calls.db.items() if col.calls}) + calls
+
+
+@pytest.mark.asyncio
+async def test_parts_are_fetched_once_and_concurrently(calls):
+    snap = _snapshot(calls)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    user, goal, ledger, invested = await snap.load("user", "goal", "ledger", "invested")
+    # four 10 ms fetches overlap instead of adding up
+    assert loop.time() - t0 < 0.035
+    assert user["riskProfile"] == "low" and goal["name"] == "Phone" and invested == 350.0
+    assert "passwordHash" not in user
+    await asyncio.gather(snap.goal(), snap.ledger(), snap.load("goal", "user"))
+    assert _reads(calls) == Counter(users=1, goals=1, ledger=1, investments=1)
+    with pytest.raises(ValueError):
+        await snap.load("password")
+
+
+@pytest.mark.asyncio
+async def test_goal_progress_reuses_snapshot(calls):
+    snap = _snapshot(calls)
+    await snap.load("goal", "ledger")
+    stats = await compute_goal_progress(UID, snap)
+    assert stats["currentSaved"] == 6000.0 and stats["progressPercent"] == 50
+    assert _reads(calls) == Counter(goals=1, ledger=1)
+
+
+@pytest.mark.asyncio
+async def test_suggestions_route_has_no_duplicate_reads(calls):
+    snap = _snapshot(calls)
+
+    class NoLLM:
+        async def gemini_chat(self, system, prompt):
+            return {"ok": False}
+
+    app.dependency_overrides[get_snapshot] = lambda: snap
+    app.dependency_overrides[get_current_user_id] = lambda: UID
+    app.dependency_overrides[get_llm_client] = lambda: NoLLM()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            r = await ac.get("/api/ai/suggestions")
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    assert any(s["actionType"] == "move_wallet" for s in r.json()["suggestions"] if "actionType" in s)
+    assert _reads(calls) == Counter(users=1, goals=1, ledger=1)
+
+
+@pytest.mark.asyncio
+async def test_summary_route_serves_dashboard_totals(calls):
+    snap = _snapshot(calls)
+    app.dependency_overrides[get_snapshot] = lambda: snap
+    app.dependency_overrides[get_current_user_id] = lambda: UID
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            r = await ac.get("/api/summary")
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    body = r.json()
+    assert body["expenseByMonth"] == LEDGER["expenseByMonth"] and body["totalIncome"] == 10000.0
+    assert body["investments"] == {"total": 350.0, "byType": {"Stock": 100.0, "MF": 250.0}, "weightedRoi": 20 / 350}
+    assert _reads(calls) == Counter(ledger=1, investments=1)
@@ -0,0 +1,42 @@
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.utils import jwtHandler
+from app.utils.jwtHandler import TokenCache, create_access_token, create_refresh_token, verify_token
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(jwtHandler, "token_cache", TokenCache(2))
+
+
+def test_access_tokens_are_cached_until_exp():
+    token = create_access_token("u1")
+    assert verify_token(token)["sub"] == "u1"
+    assert verify_token(token)["sub"] == "u1"
+    assert jwtHandler.token_cache.stats()["hits"] == 1
+
+    key = TokenCache.key(token)
+    exp, payload = jwtHandler.token_cache._entries[key]
+    assert exp == payload["exp"]
+    jwtHandler.token_cache._entries[key] = (time.time() - 1, payload)
+    assert jwtHandler.token_cache.get(key) is None
+    assert key not in jwtHandler.token_cache._entries
+
+
+def test_lru_bound_and_type_claim():
+    for uid in ("a", "b", "c"):
+        verify_token(create_access_token(uid))
+    assert jwtHandler.token_cache.stats()["entries"] == 2
+    assert jwtHandler.token_cache.stats()["evictions"] == 1
+
+    refresh = create_refresh_token("u1")
+    assert verify_token(refresh, refresh=True)["sub"] == "u1"
+    # a refresh token signed with the access secret still isn't an access token
+    forged = jwt.encode({"sub": "u1", "type": "refresh", "exp": int(time.time()) + 60}, jwtHandler.ACCESS_SECRET, algorithm="HS256")
+    with pytest.raises(HTTPException) as e:
+        verify_token(forged)
+    assert e.value.detail == "Invalid token type"
@@ -1,10 +1,7 @@
 from typing import List, Dict, Any
-import numpy as np
+from .lazy import lazy_import
 
-try:
-    from sklearn.linear_model import LinearRegression
-except Exception:  # sklearn may not be installed yet in editor
-    LinearRegression = None
+np = lazy_import("numpy")
 
 
 async def predict_expenses(user_transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -19,17 +16,17 @@ async def predict_expenses(user_transactions: List[Dict[str, Any]]) -> Dict[str,
         m = t.get("month_index", 0)
         monthly[m] = monthly.get(m, 0) + float(t.get("amount", 0))
 
-    xs = np.array(list(monthly.keys()), dtype=float).reshape(-1, 1)
+    xs = np.array(list(monthly.keys()), dtype=float)
     ys = np.array(list(monthly.values()), dtype=float)
 
-    if len(xs) < 2 or LinearRegression is None:
+    if len(xs) < 2:
         pred = float(np.mean(ys)) if len(ys) else 0.0
         return {"next_month_prediction": round(pred, 2), "confidence": 0.5}
 
-    model = LinearRegression()
-    model.fit(xs, ys)
-    next_x = np.array([[max(monthly.keys()) + 1]], dtype=float)
-    pred = float(model.predict(next_x)[0])
+    # Ordinary least squares on [1, x]; see services/forecasting.py for the per-category engine
+    X = np.column_stack([np.ones_like(xs), xs])
+    beta = np.linalg.lstsq(X, ys, rcond=None)[0]
+    pred = float(beta[0] + beta[1] * (xs.max() + 1))
     return {"next_month_prediction": round(max(pred, 0.0), 2), "confidence": 0.75}
 
 
@@ -1,5 +1,4 @@
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
 # Load .env deterministically from backend/app/.env even if CWD differs
@@ -21,8 +20,13 @@ async def get_db():
     """
     global _MONGO_CLIENT
     if _MONGO_CLIENT is None:
+        # imported here so workers that never touch Mongo don't load the driver
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from .metrics import command_listener, metrics_enabled
         uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/finaura")
-        _MONGO_CLIENT = AsyncIOMotorClient(uri)
+        # Per-command timings for /metrics and the slow-request log
+        listeners = [command_listener()] if metrics_enabled() else []
+        _MONGO_CLIENT = AsyncIOMotorClient(uri, event_listeners=listeners)
 
     # Try get_default_database when URI includes a db name
     try:
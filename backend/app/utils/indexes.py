@@ -0,0 +1,197 @@
+"""Index registry and query-plan audit.
+
+`INDEXES` lists every index the controllers rely on, grouped by collection.
+`ensure_indexes` reconciles it idempotently at startup: the collections in
+`UNIQUE_COLLECTIONS`, whose upserts rely on a unique index to avoid
+duplicates, before the app serves traffic and the rest in the background.
+`audit` runs
+`explain()` on the hot queries in `HOT_QUERIES` to flag any that fall back to
+a collection scan. Run the audit against a live database with:
+
+    python -m app.utils.indexes --apply --explain
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    # authController: login/signup look users up by email
+    "users": [IndexModel([("email", ASCENDING)], unique=True)],
+    # goalController: one goal document per user
+    "goals": [IndexModel([("userId", ASCENDING)], unique=True)],
+    # expenseController / aiRoutes: keyset pages newest first (utils/pagination.py), category filters
+    "expenses": [
+        IndexModel([("userId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("userId", ASCENDING), ("category", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    # incomeController
+    "income": [IndexModel([("userId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)])],
+    # investmentController
+    "investments": [IndexModel([("userId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)])],
+    # budgetController lists by month; aiRoutes.apply_set_weekly_cap upserts by user+month+category
+    "budgets": [
+        IndexModel([("userId", ASCENDING), ("month", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("userId", ASCENDING), ("month", ASCENDING), ("category", ASCENDING)]),
+    ],
+    # notificationRoutes: newest first per user
+    "notifications": [IndexModel([("userId", ASCENDING), ("ts", DESCENDING)])],
+    # services.ledger_rollups: one bucket per user/month/kind/category ($merge target)
+    "ledger_rollups": [
+        IndexModel(
+            [("userId", ASCENDING), ("month", ASCENDING), ("kind", ASCENDING), ("category", ASCENDING)],
+            unique=True,
+        ),
+    ],
+    # services.ledger_rollups.repair: users whose rollup update failed
+    "ledger_rollup_repairs": [IndexModel([("userId", ASCENDING), ("at", ASCENDING)])],
+    # services.forecasting.refresh_forecasts: one stored forecast per user
+    "forecasts": [IndexModel([("userId", ASCENDING)], unique=True)],
+    # scheduler: run plans and shard leases, purged a week after the run
+    "scheduler_leases": [IndexModel([("createdAt", ASCENDING)], expireAfterSeconds=7 * 24 * 3600)],
+    # utils.llm_cache: shared response cache tier, expired by MongoDB's TTL monitor
+    "llm_cache": [IndexModel([("expiresAt", ASCENDING)], expireAfterSeconds=0)],
+}
+
+# Collections with a unique index, built before serving (see main.on_startup)
+UNIQUE_COLLECTIONS = [col for col, models in INDEXES.items() if any(m.document.get("unique") for m in models)]
+
+# Placeholder substituted with a real (or dummy) userId when explaining.
+USER = "$user"
+
+# Keyset page order used by the list endpoints.
+NEWEST = [("date", DESCENDING), ("_id", DESCENDING)]
+
+# (name, collection, filter, sort) for the queries on request hot paths.
+HOT_QUERIES = [
+    ("login", "users", {"email": "audit@example.com"}, None),
+    ("list_expenses", "expenses", {"userId": USER}, NEWEST),
+    ("list_expenses_by_category", "expenses", {"userId": USER, "category": "Food"}, NEWEST),
+    ("list_income", "income", {"userId": USER}, NEWEST),
+    ("list_investments", "investments", {"userId": USER}, NEWEST),
+    ("list_budgets", "budgets", {"userId": USER}, [("month", DESCENDING), ("_id", DESCENDING)]),
+    ("weekly_cap_upsert", "budgets", {"userId": USER, "month": "2025-01", "category": "Food"}, None),
+    ("list_notifications", "notifications", {"userId": USER}, [("ts", DESCENDING)]),
+    ("active_goal", "goals", {"userId": USER, "active": True}, None),
+    ("ledger_summary", "ledger_rollups", {"userId": USER, "count": {"$gt": 0}}, None),
+]
+
+
+def _key_of(key: Any) -> tuple:
+    """Normalize an index key (SON or list of pairs) to a comparable tuple."""
+    items = key.items() if hasattr(key, "items") else key
+    return tuple((k, int(v) if isinstance(v, (int, float)) else v) for k, v in items)
+
+
+def _options(spec: Dict[str, Any]) -> tuple:
+    return bool(spec.get("unique")), spec.get("expireAfterSeconds")
+
+
+async def ensure_indexes(db, only: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Create any registry index that is missing. Safe to call on every startup.
+
+    An existing index with the same keys but different options (e.g. not
+    unique) is reported as a conflict and left untouched.
+    """
+    wanted = only if only is not None else INDEXES.keys()
+    report: Dict[str, Any] = {"created": [], "existing": [], "conflicts": []}
+    for col in wanted:
+        models = INDEXES.get(col, [])
+        try:
+            info = await db[col].index_information()
+        except Exception:
+            info = {}
+        have = {_key_of(spec["key"]): spec for spec in info.values()}
+        missing = []
+        for model in models:
+            doc = model.document
+            spec = have.get(_key_of(doc["key"]))
+            if spec is None:
+                missing.append(model)
+            elif _options(spec) != _options(doc):
+                report["conflicts"].append(f"{col}.{doc['name']}")
+                logger.warning("Index %s.%s exists with different options; leaving it", col, doc["name"])
+            else:
+                report["existing"].append(f"{col}.{doc['name']}")
+        if missing:
+            names = await db[col].create_indexes(missing)
+            report["created"].extend(f"{col}.{n}" for n in names)
+    return report
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """Flatten every `stage` name found in an explain() winning plan."""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for v in plan.values():
+            stages.extend(plan_stages(v))
+    elif isinstance(plan, list):
+        for v in plan:
+            stages.extend(plan_stages(v))
+    return stages
+
+
+def _bind(value: Any, user_id: str) -> Any:
+    if value == USER:
+        return user_id
+    if isinstance(value, dict):
+        return {k: _bind(v, user_id) for k, v in value.items()}
+    return value
+
+
+async def audit(db, user_id: str = "000000000000000000000000") -> List[Dict[str, Any]]:
+    """Explain each hot query and flag collection scans and in-memory sorts."""
+    results = []
+    for name, col, flt, sort in HOT_QUERIES:
+        cursor = db[col].find(_bind(flt, user_id))
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = plan_stages((explain.get("queryPlanner") or {}).get("winningPlan"))
+        results.append({
+            "query": name,
+            "collection": col,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            "inMemorySort": "SORT" in stages,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import json
+    import sys
+
+    from .dbConnect import get_db
+
+    parser = argparse.ArgumentParser(description="Reconcile indexes and audit hot query plans")
+    parser.add_argument("--apply", action="store_true", help="create missing registry indexes")
+    parser.add_argument("--explain", action="store_true", help="explain hot queries and flag COLLSCAN")
+    parser.add_argument("--user", default="000000000000000000000000", help="userId to bind into hot queries")
+    args = parser.parse_args()
+
+    async def _main() -> int:
+        db = await get_db()
+        if args.apply:
+            print(json.dumps(await ensure_indexes(db), indent=2))
+        if args.explain:
+            results = await audit(db, args.user)
+            for r in results:
+                flag = "COLLSCAN" if r["collscan"] else ("SORT" if r["inMemorySort"] else "ok")
+                print(f"{flag:9} {r['collection']:15} {r['query']:28} {' > '.join(r['stages'])}")
+            return 1 if any(r["collscan"] for r in results) else 0
+        if not args.apply:
+            parser.print_help()
+        return 0
+
+    sys.exit(asyncio.run(_main()))
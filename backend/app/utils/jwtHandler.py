@@ -1,11 +1,17 @@
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
-import jwt
+from .env import env_int
+from .lazy import lazy_import
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+jwt = lazy_import("jwt")
+
 ACCESS_SECRET = os.getenv("JWT_ACCESS_SECRET", "dev_access_secret")
 REFRESH_SECRET = os.getenv("JWT_REFRESH_SECRET", "dev_refresh_secret")
 
@@ -23,15 +29,83 @@ def create_access_token(user_id: str) -> str:
 def create_refresh_token(user_id: str) -> str:
     return create_token({"sub": user_id, "type": "refresh"}, minutes=60*24*7, secret=REFRESH_SECRET)
 
+class TokenCache:
+    """LRU of verified access-token payloads keyed by the token's SHA-256.
+
+    Entries are dropped once the token's `exp` passes, so a hit is exactly as
+    valid as a fresh `jwt.decode` would be.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        item = self._entries.get(key)
+        if item is not None:
+            if item[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, payload: dict):
+        exp = payload.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+        self._entries[key] = (float(exp), payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache(env_int("AUTH_TOKEN_CACHE_SIZE", 10000))
+
+
 def verify_token(token: str, refresh: bool = False) -> dict:
+    expected = "refresh" if refresh else "access"
+    key = None
+    if not refresh:
+        key = TokenCache.key(token)
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
     try:
         secret = REFRESH_SECRET if refresh else ACCESS_SECRET
         payload = jwt.decode(token, secret, algorithms=["HS256"])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    # access and refresh tokens must not stand in for each other
+    if payload.get("type") != expected:
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    if key is not None:
+        token_cache.put(key, payload)
+    return payload
 
 def get_current_user_id(creds: HTTPAuthorizationCredentials = Depends(security)) -> str:
     token = creds.credentials
@@ -0,0 +1,41 @@
+"""Deferred imports for heavy optional-at-startup dependencies.
+
+`np = lazy_import("numpy")` binds a placeholder module; the real import
+happens on first attribute access, so a worker that only serves `/health`
+never pays for numpy, httpx, bcrypt, PyJWT or the Mongo driver. The import
+budget is enforced by app/tests/test_import_time.py.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_target"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._load(), attr)
+        # cache so later lookups skip __getattr__
+        self.__dict__[attr] = value
+        return value
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return `name` if it is already imported, else a module that imports it on first use."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
@@ -0,0 +1,184 @@
+"""Response cache for LLM provider calls.
+
+Keys are a SHA-256 of (provider, model, system prompt, user text, generation
+params). Entries live in a memory-bounded LRU with a TTL and, when
+LLM_CACHE_MONGO is enabled, in a shared `llm_cache` collection so other
+workers can reuse them. Only successful responses are cached.
+
+Env: LLM_CACHE_TTL (seconds, 0 disables), LLM_CACHE_MAX_ENTRIES,
+LLM_CACHE_MAX_BYTES, LLM_CACHE_MONGO.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .env import env_flag, env_int
+
+COL = "llm_cache"
+
+_CACHE: Optional["LLMCache"] = None
+
+
+class LLMCache:
+    def __init__(
+        self,
+        *,
+        ttl: int = 600,
+        max_entries: int = 1000,
+        max_bytes: int = 8 * 1024 * 1024,
+        mongo: bool = False,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.mongo = mongo
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(provider: str, model: str, system: str, user: str, params: Dict[str, Any]) -> str:
+        raw = json.dumps([provider, model, system, user, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _get_local(self, key: str) -> Optional[dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, size, value = item
+        if expires <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _drop(self, key: str):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1]
+
+    def _put_local(self, key: str, value: dict, ttl: float):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, _ = next(iter(self._entries.items()))
+            self._drop(old_key)
+            self.evictions += 1
+
+    async def _get_mongo(self, key: str) -> Optional[Tuple[dict, float]]:
+        from .dbConnect import get_db
+        db = await get_db()
+        doc = await db[COL].find_one({"_id": key, "expiresAt": {"$gt": datetime.utcnow()}})
+        if not doc:
+            return None
+        remaining = (doc["expiresAt"] - datetime.utcnow()).total_seconds()
+        return doc.get("value") or {}, remaining
+
+    async def _put_mongo(self, key: str, value: dict):
+        from .dbConnect import get_db
+        db = await get_db()
+        expires = datetime.utcnow() + timedelta(seconds=self.ttl)
+        await db[COL].update_one({"_id": key}, {"$set": {"value": value, "expiresAt": expires}}, upsert=True)
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self._get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.mongo:
+            try:
+                found = await self._get_mongo(key)
+            except Exception:
+                found = None
+            if found:
+                value, remaining = found
+                self._put_local(key, value, remaining)
+                self.mongo_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict):
+        value = {k: v for k, v in value.items() if k != "raw"}
+        self._put_local(key, value, self.ttl)
+        if self.mongo:
+            try:
+                await self._put_mongo(key, value)
+            except Exception:
+                pass
+
+    async def fetch(self, key: str, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Return a cached response for `key`, or run `call` once and cache it if ok.
+
+        Concurrent misses for the same key share a single provider call. The
+        call runs in a task the cache owns, so a caller that is cancelled
+        (e.g. its client disconnected) stops waiting without cancelling the
+        call for everyone else.
+        """
+        if not self.enabled:
+            return await call()
+        value = await self.get(key)
+        if value is not None:
+            return {**value, "cached": True}
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._load(key, call))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())  # retrieved even if every caller left
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        try:
+            res = await call()
+            if res.get("ok"):
+                await self.set(key, res)
+            return res
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.mongo_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "mongoHits": self.mongo_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": round((self.hits + self.mongo_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def get_llm_cache() -> LLMCache:
+    """Return the per-process LLM response cache configured from env."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = LLMCache(
+            ttl=env_int("LLM_CACHE_TTL", 600),
+            max_entries=env_int("LLM_CACHE_MAX_ENTRIES", 1000),
+            max_bytes=env_int("LLM_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+            mongo=env_flag("LLM_CACHE_MONGO"),
+        )
+    return _CACHE
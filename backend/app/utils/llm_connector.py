@@ -1,8 +1,126 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
-import httpx
-from typing import Any, Dict, Optional
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional
+
+from . import metrics
+from .env import env_float
+from .lazy import lazy_import
+from .llm_cache import LLMCache, get_llm_cache
+
+httpx = lazy_import("httpx")
+
+
+_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+_LLM_CLIENT: Optional["LLMClient"] = None
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("LLM_HTTP2", "").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401  (httpx needs the h2 package for HTTP/2)
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the per-process pooled client used for all provider calls.
+
+    Pool size, keep-alive, HTTP/2 and timeouts come from env:
+    LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE, LLM_KEEPALIVE_EXPIRY, LLM_HTTP2,
+    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT.
+    """
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        limits = httpx.Limits(
+            max_connections=int(env_float("LLM_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(env_float("LLM_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=env_float("LLM_KEEPALIVE_EXPIRY", 60.0),
+        )
+        read = env_float("LLM_READ_TIMEOUT", 30.0)
+        timeout = httpx.Timeout(connect=env_float("LLM_CONNECT_TIMEOUT", 5.0), read=read, write=read, pool=read)
+        _HTTP_CLIENT = httpx.AsyncClient(limits=limits, timeout=timeout, http2=_http2_enabled())
+    return _HTTP_CLIENT
+
+
+def get_llm_client() -> "LLMClient":
+    """FastAPI dependency returning the shared LLMClient for this worker."""
+    global _LLM_CLIENT
+    if _LLM_CLIENT is None:
+        _LLM_CLIENT = LLMClient()
+    return _LLM_CLIENT
+
+
+async def close_llm_client():
+    """Close the pooled HTTP client; call on application shutdown."""
+    global _HTTP_CLIENT, _LLM_CLIENT
+    client, _HTTP_CLIENT, _LLM_CLIENT = _HTTP_CLIENT, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+GEMINI_FALLBACK_MODELS = ("gemini-2.0-flash", "gemini-1.5-flash-latest", "gemini-1.5-flash")
+GEMINI_VERSIONS = ("v1beta", "v1")
+
+
+class _GeminiRoutes:
+    """Per-process memo of the (model, version) that last worked for a requested model.
+
+    A fresh entry is used as-is; a stale one (older than GEMINI_ROUTE_TTL
+    seconds) is still used but triggers a background re-probe.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._routes: Dict[str, tuple] = {}
+        self._tasks: set = set()
+
+    def get(self, requested: str) -> Optional[tuple]:
+        """Return (model, version, stale) or None."""
+        item = self._routes.get(requested)
+        if item is None:
+            return None
+        model, version, resolved_at = item
+        return model, version, time.monotonic() - resolved_at > self.ttl
+
+    def remember(self, requested: str, model: str, version: str):
+        self._routes[requested] = (model, version, time.monotonic())
+
+    def forget(self, requested: str):
+        self._routes.pop(requested, None)
+
+    def refresh(self, requested: str, probe):
+        """Run `probe()` in the background once per requested model."""
+        if any(getattr(t, "requested", None) == requested for t in self._tasks):
+            return
+        task = asyncio.ensure_future(probe())
+        task.requested = requested
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+_GEMINI_ROUTES = _GeminiRoutes(ttl=env_float("GEMINI_ROUTE_TTL", 3600.0))
+
+
+def _gemini_preferred(requested: str) -> list:
+    """Deterministic (model, version) preference order for a requested model."""
+    models = [m for m in dict.fromkeys([requested, *GEMINI_FALLBACK_MODELS]) if m]
+    return [(m, v) for m in models for v in GEMINI_VERSIONS]
+
+
+class LLMError(RuntimeError):
+    """Raised by the streaming methods when a provider call fails."""
+
+
+def _sse_data(line: str) -> Optional[str]:
+    if not line.startswith("data:"):
+        return None
+    return line[5:].strip()
 
 
 class LLMClient:
@@ -10,35 +128,275 @@ class LLMClient:
 
     - Longcat: currently a placeholder unless LONGCAT_API_KEY and endpoint are wired.
     - Gemini: calls Google's Generative Language API (v1beta) using httpx.
+
+    Requests go through the pooled client from `get_http_client()` unless an
+    explicit `http_client` is passed; prefer `get_llm_client()` over building
+    new instances per request.
     """
 
-    def __init__(self, *, longcat_key: Optional[str] = None, gemini_key: Optional[str] = None):
+    def __init__(
+        self,
+        *,
+        longcat_key: Optional[str] = None,
+        gemini_key: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[LLMCache] = None,
+    ):
         self.longcat_key = longcat_key or os.getenv("LONGCAT_API_KEY")
         self.gemini_key = gemini_key or os.getenv("GEMINI_API_KEY")
-        self._client = httpx.AsyncClient(timeout=30)
+        self._http = http_client
+        self.cache = cache or get_llm_cache()
+        # Delay before a hedged call fires the next provider (LLM_HEDGE_DELAY_MS)
+        self.hedge_delay = env_float("LLM_HEDGE_DELAY_MS", 400.0) / 1000.0
         # Longcat defaults to vendor OpenAI-compatible endpoint if not provided
         self.longcat_base = os.getenv("LONGCAT_BASE_URL") or "https://api.longcat.chat/openai/v1"
         # Use vendor model name by default; override via LONGCAT_MODEL
         self.longcat_model = os.getenv("LONGCAT_MODEL", "LongCat-Flash-Chat")
         # Gemini model can be overridden via env; default to latest flash
         self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-1.5-flash-latest")
+        self.gemini_base = os.getenv("GEMINI_BASE_URL") or "https://generativelanguage.googleapis.com"
+
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        return self._http or get_http_client()
+
+    def _cache_key(self, provider: str, model: str, system: str, user: str, kwargs: Dict[str, Any]) -> str:
+        params = {k: v for k, v in kwargs.items() if k != "model"}
+        return self.cache.make_key(provider, model, system, user, params)
+
+    async def _observed(self, provider: str, model: str, call: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Await a provider call and record its latency (see utils/metrics.py)."""
+        t0 = time.perf_counter()
+        status = "cancelled"  # hedged calls are cancelled when another provider wins
+        try:
+            res = await call
+            status = "ok" if res.get("ok") else "error"
+            model = res.get("model") or model
+            return res
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            metrics.observe_llm(provider, model, "chat", status, time.perf_counter() - t0)
+
+    async def _observed_stream(self, provider: str, model: str, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        t0 = time.perf_counter()
+        status = "cancelled"
+        try:
+            async for chunk in stream:
+                yield chunk
+            status = "ok"
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            await stream.aclose()
+            metrics.observe_llm(provider, model, "stream", status, time.perf_counter() - t0)
+
+    async def longcat_chat(self, system: str, user: str, *, cache: bool = True, **kwargs) -> Dict[str, Any]:
+        """Longcat chat completion, served from the response cache when possible."""
+        model = kwargs.get("model", self.longcat_model)
+        if not cache:
+            return await self._observed("longcat", model, self._longcat_request(system, user, **kwargs))
+        key = self._cache_key("longcat", model, system, user, kwargs)
+        return await self.cache.fetch(key, lambda: self._observed("longcat", model, self._longcat_request(system, user, **kwargs)))
 
-    async def longcat_chat(self, system: str, user: str, **kwargs) -> Dict[str, Any]:
+    async def gemini_chat(self, system: str, user: str, *, cache: bool = True, **kwargs) -> Dict[str, Any]:
+        """Gemini generateContent call, served from the response cache when possible."""
+        model = kwargs.get("model", self.gemini_model)
+        if not cache:
+            return await self._observed("gemini", model, self._gemini_request(system, user, **kwargs))
+        key = self._cache_key("gemini", model, system, user, kwargs)
+        return await self.cache.fetch(key, lambda: self._observed("gemini", model, self._gemini_request(system, user, **kwargs)))
+
+    async def hedged_chat(
+        self,
+        system: str,
+        user: str,
+        *,
+        order: tuple = ("gemini", "longcat"),
+        hedge_delay: Optional[float] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Race providers and return the first successful response.
+
+        Starts `order[0]`; if it hasn't answered after `hedge_delay` seconds (or
+        fails sooner) the next provider is started too. The first ok result
+        wins and any provider still running is cancelled.
+        """
+        delay = self.hedge_delay if hedge_delay is None else hedge_delay
+        calls = {"gemini": self.gemini_chat, "longcat": self.longcat_chat}
+        queue = [p for p in order if p in calls]
+        pending: set = set()
+        last: Optional[Dict[str, Any]] = None
+
+        def launch():
+            provider = queue.pop(0)
+            pending.add(asyncio.ensure_future(calls[provider](system, user, **kwargs)))
+
+        if queue:
+            launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay if queue else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    try:
+                        res = task.result()
+                    except Exception as e:
+                        res = {"ok": False, "message": str(e)}
+                    if res.get("ok"):
+                        return res
+                    last = res
+                if queue:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        return last or {"ok": False, "message": "No LLM provider available"}
+
+    def _longcat_payload(self, system: str, user: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model": kwargs.get("model", self.longcat_model),
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            "temperature": kwargs.get("temperature", 0.4),
+            "max_tokens": kwargs.get("max_tokens", 512),
+        }
+
+    def _gemini_payload(self, system: str, user: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {
+            "contents": [
+                {"role": "user", "parts": [{"text": user}]}
+            ],
+            "generationConfig": {
+                "temperature": kwargs.get("temperature", 0.4),
+                "topP": kwargs.get("top_p", 0.9),
+                "topK": kwargs.get("top_k", 40),
+                "maxOutputTokens": kwargs.get("max_tokens", 512),
+            },
+        }
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        return payload
+
+    def _gemini_pairs(self, requested: str) -> list:
+        """(model, version) pairs in preference order, last known-good pair first."""
+        pairs = _gemini_preferred(requested)
+        route = _GEMINI_ROUTES.get(requested)
+        if route:
+            known = route[:2]
+            if known in pairs:
+                pairs.remove(known)
+            pairs.insert(0, known)
+        return pairs
+
+    def _gemini_resolved(self, requested: str, model: str, version: str):
+        """Record a working pair; a stale memo for the same pair schedules a re-probe."""
+        route = _GEMINI_ROUTES.get(requested)
+        if route is None or route[:2] != (model, version):
+            _GEMINI_ROUTES.remember(requested, model, version)
+        elif route[2]:
+            _GEMINI_ROUTES.refresh(requested, lambda: self._probe_gemini_route(requested))
+
+    async def _probe_gemini_route(self, requested: str):
+        """Find the most preferred pair that exists via cheap model metadata GETs."""
+        headers = {"X-goog-api-key": self.gemini_key}
+        for mdl, ver in _gemini_preferred(requested):
+            try:
+                res = await self._client.get(f"{self.gemini_base}/{ver}/models/{mdl}", headers=headers)
+            except Exception:
+                return  # keep the current memo; try again after the next stale hit
+            if res.status_code == 200:
+                _GEMINI_ROUTES.remember(requested, mdl, ver)
+                return
+
+    def longcat_stream(self, system: str, user: str, **kwargs) -> AsyncIterator[str]:
+        """Yield text deltas from Longcat's OpenAI-compatible `stream: true` endpoint."""
+        model = kwargs.get("model", self.longcat_model)
+        return self._observed_stream("longcat", model, self._longcat_stream(system, user, **kwargs))
+
+    async def _longcat_stream(self, system: str, user: str, **kwargs) -> AsyncIterator[str]:
+        if not self.longcat_key:
+            raise LLMError("Missing LONGCAT_API_KEY")
+        url = self.longcat_base.rstrip('/') + "/chat/completions"
+        payload = {**self._longcat_payload(system, user, kwargs), "stream": True}
+        headers = {"Authorization": f"Bearer {self.longcat_key}"}
+        try:
+            async with self._client.stream("POST", url, json=payload, headers=headers) as res:
+                if res.status_code >= 400:
+                    await res.aread()
+                    raise LLMError(f"Longcat HTTP error: {res.status_code}")
+                async for line in res.aiter_lines():
+                    data = _sse_data(line)
+                    if not data:
+                        continue
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMError(str(e)) from e
+
+    def gemini_stream(self, system: str, user: str, **kwargs) -> AsyncIterator[str]:
+        """Yield text chunks from Gemini `streamGenerateContent` (SSE).
+
+        Model/version fallback on 404 happens before the first chunk is sent.
+        """
+        model = kwargs.get("model", self.gemini_model)
+        return self._observed_stream("gemini", model, self._gemini_stream(system, user, **kwargs))
+
+    async def _gemini_stream(self, system: str, user: str, **kwargs) -> AsyncIterator[str]:
+        if not self.gemini_key:
+            raise LLMError("Missing GEMINI_API_KEY")
+        payload = self._gemini_payload(system, user, kwargs)
+        headers = {"X-goog-api-key": self.gemini_key}
+        requested = kwargs.get("model", self.gemini_model)
+        last_error = "Gemini request failed"
+        for mdl, ver in self._gemini_pairs(requested):
+            url = f"{self.gemini_base}/{ver}/models/{mdl}:streamGenerateContent?alt=sse"
+            try:
+                async with self._client.stream("POST", url, json=payload, headers=headers) as res:
+                    if res.status_code == 404:
+                        await res.aread()
+                        _GEMINI_ROUTES.forget(requested)
+                        last_error = "Gemini HTTP error: 404"
+                        continue
+                    if res.status_code >= 400:
+                        await res.aread()
+                        raise LLMError(f"Gemini HTTP error: {res.status_code}")
+                    self._gemini_resolved(requested, mdl, ver)
+                    async for line in res.aiter_lines():
+                        data = _sse_data(line)
+                        if not data:
+                            continue
+                        chunk = json.loads(data)
+                        parts = (chunk.get("candidates") or [{}])[0].get("content", {}).get("parts", [])
+                        text = "".join(p.get("text", "") for p in parts)
+                        if text:
+                            yield text
+                    return
+            except (httpx.HTTPError, ValueError) as e:
+                raise LLMError(str(e)) from e
+        raise LLMError(last_error)
+
+    async def _longcat_request(self, system: str, user: str, **kwargs) -> Dict[str, Any]:
         """If LONGCAT_BASE_URL is provided, call it as an OpenAI-compatible /chat/completions API.
         Otherwise, return a placeholder echo.
         """
         if self.longcat_base and self.longcat_key:
             url = self.longcat_base.rstrip('/') + "/chat/completions"
-            model = kwargs.get("model", self.longcat_model)
-            payload = {
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-                "temperature": kwargs.get("temperature", 0.4),
-                "max_tokens": kwargs.get("max_tokens", 512),
-            }
+            payload = self._longcat_payload(system, user, kwargs)
+            model = payload["model"]
             headers = {"Authorization": f"Bearer {self.longcat_key}"}
             try:
                 res = await self._client.post(url, json=payload, headers=headers)
@@ -59,67 +417,60 @@ class LLMClient:
             return {"ok": False, "message": "Missing LONGCAT_API_KEY"}
         return {"ok": True, "model": "longcat", "output": f"[Longcat] {user}"}
 
-    async def gemini_chat(self, system: str, user: str, **kwargs) -> Dict[str, Any]:
+    async def _gemini_request(self, system: str, user: str, **kwargs) -> Dict[str, Any]:
         """Call Gemini via REST API with automatic model/version fallback.
 
         - Prefers GEMINI_MODEL if set, else gemini-1.5-flash-latest.
         - Tries v1beta first, then v1 if 404.
         - On persistent 404, tries fallbacks: gemini-2.0-flash, gemini-1.5-flash-latest, gemini-1.5-flash.
+        - The pair that worked is remembered per process, so steady-state calls
+          make exactly one request; only a 404/400 on it re-runs discovery.
         """
         if not self.gemini_key:
             return {"ok": False, "message": "Missing GEMINI_API_KEY"}
 
-        primary_model = kwargs.get("model", self.gemini_model)
-        model_candidates = [m for m in {
-            primary_model,
-            "gemini-2.0-flash",
-            "gemini-1.5-flash-latest",
-            "gemini-1.5-flash",
-        } if m]
-        versions = ["v1beta", "v1"]
+        requested = kwargs.get("model", self.gemini_model)
+        known = _GEMINI_ROUTES.get(requested)
+        payload = self._gemini_payload(system, user, kwargs)
 
         headers = {"X-goog-api-key": self.gemini_key}
         last_error: Dict[str, Any] | None = None
 
-        for mdl in model_candidates:
-            for ver in versions:
-                url = f"https://generativelanguage.googleapis.com/{ver}/models/{mdl}:generateContent"
-                payload = {
-                    "contents": [
-                        {"role": "user", "parts": [{"text": user}]}
-                    ],
-                    "generationConfig": {
-                        "temperature": kwargs.get("temperature", 0.4),
-                        "topP": kwargs.get("top_p", 0.9),
-                        "topK": kwargs.get("top_k", 40),
-                        "maxOutputTokens": kwargs.get("max_tokens", 512),
-                    },
-                }
-                if system:
-                    payload["systemInstruction"] = {"parts": [{"text": system}]}
-                try:
-                    res = await self._client.post(url, json=payload, headers=headers)
-                    if res.status_code == 404:
-                        last_error = {"message": "Gemini HTTP error: 404", "url": url, "details": res.text, "model": mdl, "version": ver}
-                        continue
-                    res.raise_for_status()
-                    data = res.json()
-                    # Try to read text from candidate parts
-                    text = (
-                        data.get("candidates", [{}])[0]
-                        .get("content", {})
-                        .get("parts", [{}])[0]
-                        .get("text", "")
-                    )
-                    if not text:
-                        return {"ok": False, "model": mdl, "version": ver, "message": "Empty response from Gemini", "raw": data}
-                    return {"ok": True, "model": mdl, "version": ver, "output": text, "raw": data}
-                except httpx.HTTPStatusError as e:
-                    last_error = {"message": f"Gemini HTTP error: {e.response.status_code}", "url": url, "details": e.response.text, "model": mdl, "version": ver}
-                except Exception as e:
-                    last_error = {"message": str(e), "url": url, "model": mdl, "version": ver}
+        for mdl, ver in self._gemini_pairs(requested):
+            url = f"{self.gemini_base}/{ver}/models/{mdl}:generateContent"
+            try:
+                res = await self._client.post(url, json=payload, headers=headers)
+                if res.status_code == 404:
+                    last_error = {"message": "Gemini HTTP error: 404", "url": url, "details": res.text, "model": mdl, "version": ver}
+                    _GEMINI_ROUTES.forget(requested)
+                    continue
+                res.raise_for_status()
+                self._gemini_resolved(requested, mdl, ver)
+                data = res.json()
+                # Try to read text from candidate parts
+                text = (
+                    data.get("candidates", [{}])[0]
+                    .get("content", {})
+                    .get("parts", [{}])[0]
+                    .get("text", "")
+                )
+                if not text:
+                    return {"ok": False, "model": mdl, "version": ver, "message": "Empty response from Gemini", "raw": data}
+                return {"ok": True, "model": mdl, "version": ver, "output": text, "raw": data}
+            except httpx.HTTPStatusError as e:
+                last_error = {"message": f"Gemini HTTP error: {e.response.status_code}", "url": url, "details": e.response.text, "model": mdl, "version": ver}
+                if e.response.status_code == 400:
+                    _GEMINI_ROUTES.forget(requested)
+                elif known and known[:2] == (mdl, ver):
+                    break  # transient failure on a known-good route: don't re-probe
+            except Exception as e:
+                last_error = {"message": str(e), "url": url, "model": mdl, "version": ver}
+                if known and known[:2] == (mdl, ver):
+                    break
 
         return {"ok": False, **(last_error or {"message": "Gemini request failed"})}
 
     async def close(self):
-        await self._client.aclose()
+        """Close an explicitly injected client; the shared pool is closed by `close_llm_client()`."""
+        if self._http is not None:
+            await self._http.aclose()
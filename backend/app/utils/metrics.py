@@ -0,0 +1,288 @@
+"""Request, Mongo and LLM metrics in Prometheus text format.
+
+`MetricsMiddleware` times every HTTP request by route template and opens a
+`RequestStats` for it in a contextvar. `CommandMetrics`, installed on the
+Mongo client by `dbConnect.get_db` as a pymongo CommandListener, times each
+command. Motor copies the caller's context into its executor, so the
+listener sees the request that issued the command, including tasks the
+request spawned.
+`LLMClient` reports provider calls through `observe_llm`. Code that several
+routes share can wrap itself in `section(name)`; its DB commands are then
+labelled with that section as well as the route.
+
+`GET /metrics` renders everything. A request slower than SLOW_REQUEST_MS is
+logged with its DB commands grouped by collection and command, and with its
+LLM calls.
+
+Env: SLOW_REQUEST_MS, METRICS_ENABLED.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .env import env_int
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_float(v: float) -> str:
+    return "+Inf" if v == float("inf") else repr(float(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.label_names), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            lines.append(f"{self.name}{_fmt_labels(self.label_names, key)} {_fmt_float(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # per label set: [count per bucket..., sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels.get(n, "")) for n in self.label_names))
+        return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="' + _fmt_float(bound) + '"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.label_names, key)} {_fmt_float(series[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+HTTP_SECONDS = Histogram("finaura_http_request_seconds", "HTTP request latency by route template.", ("method", "route", "status"))
+REQUEST_DB_COMMANDS = Histogram("finaura_http_request_db_commands", "Mongo commands issued per HTTP request.", ("route",), COUNT_BUCKETS)
+DB_SECONDS = Histogram("finaura_db_command_seconds", "Mongo command latency.", ("collection", "command", "route", "section"), DB_BUCKETS)
+DB_FAILURES = Counter("finaura_db_command_failures_total", "Mongo commands that failed.", ("collection", "command"))
+LLM_SECONDS = Histogram("finaura_llm_request_seconds", "LLM provider call latency (streams: until the last chunk).", ("provider", "model", "call", "status"))
+SECTION_SECONDS = Histogram("finaura_section_seconds", "Latency of instrumented code sections.", ("section",))
+SLOW_REQUESTS = Counter("finaura_http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS.", ("route",))
+
+REGISTRY = [HTTP_SECONDS, REQUEST_DB_COMMANDS, DB_SECONDS, DB_FAILURES, LLM_SECONDS, SECTION_SECONDS, SLOW_REQUESTS]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestStats:
+    scope: Optional[dict] = None
+    db: List[Tuple[str, str, float]] = field(default_factory=list)
+    llm: List[Tuple[str, str, str, float]] = field(default_factory=list)
+
+    @property
+    def route(self) -> str:
+        route = (self.scope or {}).get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def db_breakdown(self) -> Dict[str, dict]:
+        """{"collection.command": {"count": n, "ms": total}} for the slow log."""
+        out: Dict[str, dict] = {}
+        for collection, command, seconds in self.db:
+            row = out.setdefault(f"{collection}.{command}", {"count": 0, "ms": 0.0})
+            row["count"] += 1
+            row["ms"] = round(row["ms"] + seconds * 1000, 2)
+        return out
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+_section: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_section", default="")
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@contextmanager
+def section(name: str) -> Iterator[None]:
+    """Time a block and label the DB commands it issues with `name`."""
+    token = _section.set(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        SECTION_SECONDS.observe(time.perf_counter() - t0, section=name)
+        _section.reset(token)
+
+
+def observe_llm(provider: str, model: str, call: str, status: str, seconds: float):
+    LLM_SECONDS.observe(seconds, provider=provider, model=model or "", call=call, status=status)
+    stats = _current.get()
+    if stats is not None:
+        stats.llm.append((provider, model or "", status, seconds))
+
+
+class CommandMetrics:
+    """Times Mongo commands and attributes them to the current request.
+
+    Use `command_listener()` to get an instance pymongo accepts.
+    """
+
+    # handshakes and server monitoring, not application queries
+    IGNORED = frozenset({"hello", "ismaster", "isMaster", "ping", "buildinfo", "buildInfo", "saslStart", "saslContinue", "endSessions"})
+
+    def __init__(self):
+        self._pending: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return (event.request_id, event.connection_id)
+
+    def started(self, event):
+        if event.command_name in self.IGNORED:
+            return
+        target = event.command.get(event.command_name)
+        # getMore carries the cursor id; its collection is a separate field
+        collection = event.command.get("collection") if event.command_name == "getMore" else target
+        with self._lock:
+            self._pending[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            collection = self._pending.pop(self._key(event), None)
+        if collection is None:
+            return
+        seconds = event.duration_micros / 1e6
+        stats = _current.get()
+        route = stats.route if stats is not None else ""
+        DB_SECONDS.observe(seconds, collection=collection, command=event.command_name, route=route, section=_section.get())
+        if failed:
+            DB_FAILURES.inc(collection=collection, command=event.command_name)
+        if stats is not None:
+            stats.db.append((collection, event.command_name, seconds))
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+
+def command_listener() -> CommandMetrics:
+    """A `CommandMetrics` that is also a pymongo CommandListener.
+
+    Built on demand so that importing this module doesn't load pymongo.
+    """
+    from pymongo import monitoring
+
+    class _Listener(CommandMetrics, monitoring.CommandListener):
+        pass
+
+    return _Listener()
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, slow_ms: Optional[int] = None):
+        self.app = app
+        self.slow_ms = env_int("SLOW_REQUEST_MS", 1000) if slow_ms is None else slow_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope=scope)
+        token = _current.set(stats)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def wrapped(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped)
+        finally:
+            _current.reset(token)
+            self._record(scope, stats, status, time.perf_counter() - t0)
+
+    def _record(self, scope: Scope, stats: RequestStats, status: int, seconds: float):
+        route = stats.route
+        HTTP_SECONDS.observe(seconds, method=scope["method"], route=route, status=str(status))
+        REQUEST_DB_COMMANDS.observe(len(stats.db), route=route)
+        if self.slow_ms > 0 and seconds * 1000 >= self.slow_ms:
+            SLOW_REQUESTS.inc(route=route)
+            logger.warning(
+                "Slow request %s %s -> %s in %.0f ms; db=%s (%.0f ms over %d commands) llm=%s",
+                scope["method"], route, status, seconds * 1000,
+                stats.db_breakdown(), sum(s for _, _, s in stats.db) * 1000, len(stats.db),
+                [{"provider": p, "model": m, "status": st, "ms": round(s * 1000, 2)} for p, m, st, s in stats.llm],
+            )
@@ -1,10 +1,155 @@
+"""Notification writes, batched off the request path.
+
+`notify` assigns the document's ObjectId up front and hands it to a
+write-behind pipeline: a bounded buffer drained by one background task that
+`insert_many`s up to NOTIFY_BATCH_SIZE documents at a time (or whatever
+arrived within NOTIFY_FLUSH_MS) and then publishes each saved notification
+to the realtime bus. When the buffer (NOTIFY_BUFFER_SIZE) is full, `notify`
+waits for room instead of dropping. `stop()` flushes what is left.
+
+Until the pipeline is started (scripts, tests) `notify` writes and publishes
+inline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from . import realtime
+from .env import env_int
+from .serialization import serialize_doc
+
+logger = logging.getLogger(__name__)
+
+COL = "notifications"
+
+_PIPELINE: Optional["NotificationPipeline"] = None
+
+_STOP = object()
+
+
+async def _write(db, docs: List[dict]):
+    if len(docs) == 1:
+        await db[COL].insert_one(docs[0])
+    else:
+        await db[COL].insert_many(docs, ordered=False)
+    for doc in docs:
+        try:
+            await realtime.publish(doc["userId"], serialize_doc(doc))
+        except Exception:
+            pass
+
+
+class NotificationPipeline:
+    def __init__(self, *, batch_size: int = 100, flush_ms: int = 200, buffer_size: int = 10000):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0, flush_ms) / 1000.0
+        self.buffer_size = max(1, buffer_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.buffer_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything buffered, then stop the writer task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, db, doc: dict):
+        self.enqueued += 1
+        await self._queue.put((db, doc))
+
+    async def _collect(self) -> Tuple[List[Tuple[Any, dict]], bool]:
+        """Wait for one item, then gather more until the batch is full or the window closes."""
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch: List[Tuple[Any, dict]]):
+        by_db: Dict[int, Tuple[Any, List[dict]]] = {}
+        for db, doc in batch:
+            by_db.setdefault(id(db), (db, []))[1].append(doc)
+        for db, docs in by_db.values():
+            try:
+                await _write(db, docs)
+                self.written += len(docs)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(docs)
+                logger.warning("Dropped %d notifications: %s", len(docs), e)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "buffered": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+
+def get_notification_pipeline() -> NotificationPipeline:
+    """Return the per-process notification pipeline configured from env."""
+    global _PIPELINE
+    if _PIPELINE is None:
+        _PIPELINE = NotificationPipeline(
+            batch_size=env_int("NOTIFY_BATCH_SIZE", 100),
+            flush_ms=env_int("NOTIFY_FLUSH_MS", 200),
+            buffer_size=env_int("NOTIFY_BUFFER_SIZE", 10000),
+        )
+    return _PIPELINE
 
 
 async def notify(db, user_id: str, *, type: str = "general", title: str = "", text: str = "", ts: str | None = None):
     if not user_id:
         return None
     doc = {
+        "_id": ObjectId(),
         "userId": user_id,
         "type": type,
         "title": title,
@@ -12,5 +157,9 @@ async def notify(db, user_id: str, *, type: str = "general", title: str = "", te
         "read": False,
         "ts": ts or datetime.utcnow().isoformat(),
     }
-    res = await db["notifications"].insert_one(doc)
-    return res.inserted_id
+    pipeline = get_notification_pipeline()
+    if pipeline.running:
+        await pipeline.submit(db, doc)
+    else:
+        await _write(db, [doc])
+    return doc["_id"]
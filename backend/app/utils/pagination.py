@@ -0,0 +1,136 @@
+"""Keyset pagination for the per-user list endpoints.
+
+Lists are ordered newest first on (`sort_field`, `_id`) and served by the
+matching `{userId, <sort_field>: -1, _id: -1}` indexes in `utils/indexes.py`.
+The next page starts after an opaque cursor, so deep pages cost the same as
+the first. Response bodies stay plain arrays; the cursor for the next page is
+returned in the `X-Next-Cursor` header and is absent on the last page.
+Pages are the raw documents, rendered straight to JSON by `page_response`.
+
+Env: LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, Query
+
+from .env import env_int
+from .responses import ORJSONResponse
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_FIELD = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+
+DEFAULT_LIMIT = env_int("LIST_DEFAULT_LIMIT", 500)
+MAX_LIMIT = env_int("LIST_MAX_LIMIT", 1000)
+
+
+@dataclass
+class PageParams:
+    limit: int = DEFAULT_LIMIT
+    after: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    fields: Optional[List[str]] = None
+
+
+def page_params(
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> PageParams:
+    """Query parameters shared by the list routes.
+
+    `start`/`end` bound the sort field inclusively (ISO dates, or YYYY-MM for
+    budgets) and `fields` is a comma-separated projection.
+    """
+    names = None
+    if fields:
+        names = [f.strip() for f in fields.split(",") if f.strip()]
+        bad = [f for f in names if not _FIELD.match(f)]
+        if bad:
+            raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(bad)}")
+    return PageParams(
+        limit=min(limit or DEFAULT_LIMIT, MAX_LIMIT),
+        after=after,
+        start=start,
+        end=end,
+        fields=names,
+    )
+
+
+def encode_cursor(value: Any, oid: ObjectId) -> str:
+    raw = json.dumps([value, str(oid)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, oid = json.loads(raw)
+        return value, ObjectId(oid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def range_bounds(start: Optional[str], end: Optional[str]) -> Dict[str, str]:
+    """Inclusive `$gte`/`$lte` bounds for ISO date (or YYYY-MM) strings."""
+    bounds = {}
+    if start:
+        bounds["$gte"] = start
+    if end:
+        # dates may carry a time part, so compare against the end of the day/month
+        bounds["$lte"] = end + "\uffff"
+    return bounds
+
+
+def build_query(base: Dict[str, Any], params: PageParams, sort_field: str) -> Dict[str, Any]:
+    query = dict(base)
+    bounds = range_bounds(params.start, params.end)
+    if bounds:
+        query[sort_field] = bounds
+    if params.after:
+        value, oid = decode_cursor(params.after)
+        tail = {sort_field: value, "_id": {"$lt": oid}}
+        # documents without the sort key sort last, and `$lt` on a string never matches them
+        query["$or"] = [tail] if value is None else [{sort_field: {"$lt": value}}, tail, {sort_field: None}]
+    return query
+
+
+def projection(params: PageParams, sort_field: str) -> Optional[Dict[str, int]]:
+    if not params.fields:
+        return None
+    # the sort key is always returned so the next cursor can be built
+    return {f: 1 for f in [*params.fields, sort_field]}
+
+
+async def paginate(collection, base: Dict[str, Any], params: PageParams, sort_field: str = "date") -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page; returns (raw docs, next cursor or None)."""
+    cursor = (
+        collection.find(build_query(base, params, sort_field), projection(params, sort_field))
+        .sort([(sort_field, -1), ("_id", -1)])
+        .limit(params.limit + 1)
+    )
+    docs = await cursor.to_list(length=params.limit + 1)
+    next_cursor = None
+    if len(docs) > params.limit:
+        docs = docs[: params.limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+    return docs, next_cursor
+
+
+def page_response(items: List[dict], next_cursor: Optional[str]) -> ORJSONResponse:
+    """Render a page without FastAPI's encoder pass; ObjectIds become hex strings."""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return ORJSONResponse(items, headers=headers)
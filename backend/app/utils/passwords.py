@@ -0,0 +1,92 @@
+"""bcrypt hashing off the event loop.
+
+bcrypt releases the GIL, so hashes run in a small dedicated thread pool
+(PASSWORD_HASH_WORKERS) while the loop keeps serving other requests. A
+semaphore (PASSWORD_HASH_CONCURRENCY) caps how many hashes may be queued or
+running at once, so a login storm waits its turn instead of piling work onto
+the pool. BCRYPT_ROUNDS sets the cost for new hashes; `needs_rehash` flags
+stored hashes made with a different cost so login can upgrade them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .env import env_int
+from .lazy import lazy_import
+
+bcrypt = lazy_import("bcrypt")
+
+
+ROUNDS = min(max(env_int("BCRYPT_ROUNDS", 12), 4), 31)
+WORKERS = max(1, env_int("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+CONCURRENCY = max(1, env_int("PASSWORD_HASH_CONCURRENCY", WORKERS * 4))
+
+_executor: Optional[ThreadPoolExecutor] = None
+# one semaphore per event loop (tests and scripts may run several loops)
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def _limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _semaphores.get(loop)
+    if sem is None:
+        sem = _semaphores[loop] = asyncio.Semaphore(CONCURRENCY)
+    return sem
+
+
+async def _run(fn, *args):
+    async with _limit():
+        return await asyncio.get_running_loop().run_in_executor(_pool(), fn, *args)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:
+        # malformed or empty stored hash
+        return False
+
+
+async def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    return await _run(_hash, password, rounds or ROUNDS)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    if not hashed:
+        return False
+    return await _run(_check, password, hashed)
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor of a `$2b$12$...` hash, or None if it isn't one."""
+    parts = (hashed or "").split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed: str, rounds: Optional[int] = None) -> bool:
+    return hash_rounds(hashed) != (rounds or ROUNDS)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
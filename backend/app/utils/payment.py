@@ -1,24 +1,181 @@
+"""Stripe checkout over the async HTTP API.
+
+Calls go through one pooled `httpx.AsyncClient` per worker instead of the
+blocking `stripe` SDK, so a slow Stripe response only delays the user who is
+checking out. Requests have connect/read timeouts and are retried with
+exponential backoff on network errors, 429 and 5xx. POSTs carry an
+`Idempotency-Key` that stays the same across retries, so a retried create
+can't open a second session. Webhook signatures are checked locally with
+HMAC-SHA256, which is what `stripe.Webhook.construct_event` does.
+
+Point STRIPE_API_BASE at a stand-in (see app/tests/stripe_stub.py) to run
+without Stripe.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
 import os
-from typing import Dict, Any
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
 
-import stripe
+from .env import env_float, env_int
+from .lazy import lazy_import
+
+httpx = lazy_import("httpx")
 
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
 STRIPE_SUCCESS_URL = os.getenv("STRIPE_SUCCESS_URL", "http://localhost:5173/pay?status=success")
 STRIPE_CANCEL_URL = os.getenv("STRIPE_CANCEL_URL", "http://localhost:5173/pay?status=cancel")
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "https://api.stripe.com")
+STRIPE_TIMEOUT = env_float("STRIPE_TIMEOUT", 10.0)
+STRIPE_MAX_RETRIES = env_int("STRIPE_MAX_RETRIES", 2)
+# seconds a webhook timestamp may lag behind our clock
+WEBHOOK_TOLERANCE = 300
+# ids come from the client's redirect URL, so they must never steer the path
+SESSION_ID = re.compile(r"cs_[A-Za-z0-9_]+")
+
+_STRIPE_CLIENT: Optional["StripeClient"] = None
+
+
+class StripeError(RuntimeError):
+    def __init__(self, message: str, status: int = 0, code: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def encode_form(params: Dict[str, Any], prefix: str = "") -> List[Tuple[str, str]]:
+    """Flatten nested params into Stripe's bracketed form encoding.
+
+    {"line_items": [{"quantity": 1}]} -> [("line_items[0][quantity]", "1")]
+    """
+    pairs: List[Tuple[str, str]] = []
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else str(key)
+        if isinstance(value, dict):
+            pairs.extend(encode_form(value, name))
+        elif isinstance(value, (list, tuple)):
+            for i, item in enumerate(value):
+                if isinstance(item, dict):
+                    pairs.extend(encode_form(item, f"{name}[{i}]"))
+                else:
+                    pairs.append((f"{name}[{i}]", str(item)))
+        elif isinstance(value, bool):
+            pairs.append((name, "true" if value else "false"))
+        elif value is not None:
+            pairs.append((name, str(value)))
+    return pairs
+
+
+def _should_retry(resp: httpx.Response) -> bool:
+    hint = resp.headers.get("stripe-should-retry")
+    if hint is not None:
+        return hint == "true"
+    return resp.status_code == 429 or resp.status_code >= 500
+
 
-if STRIPE_SECRET_KEY:
-    stripe.api_key = STRIPE_SECRET_KEY
+class StripeClient:
+    def __init__(
+        self,
+        secret_key: Optional[str] = None,
+        *,
+        api_base: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_retries: Optional[int] = None,
+        backoff: float = 0.5,
+    ):
+        self.secret_key = secret_key if secret_key is not None else STRIPE_SECRET_KEY
+        self.api_base = (api_base or STRIPE_API_BASE).rstrip("/")
+        self.max_retries = STRIPE_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = backoff
+        self._http = http_client
+        self._own_http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is not None:
+            return self._http
+        if self._own_http is None or self._own_http.is_closed:
+            self._own_http = httpx.AsyncClient(
+                timeout=httpx.Timeout(STRIPE_TIMEOUT, connect=min(5.0, STRIPE_TIMEOUT)),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._own_http
+
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if not self.secret_key:
+            raise StripeError("Missing STRIPE_SECRET_KEY")
+        headers = {"Authorization": f"Bearer {self.secret_key}"}
+        body = None
+        query = None
+        if method == "POST":
+            headers["Idempotency-Key"] = uuid.uuid4().hex
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            body = urlencode(encode_form(params or {}))
+        elif params:
+            query = encode_form(params)
+        url = f"{self.api_base}{path}"
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                resp = await self._client.request(method, url, headers=headers, content=body, params=query)
+            except httpx.TransportError as e:
+                if last:
+                    raise StripeError(f"Stripe unreachable: {e}") from e
+            else:
+                if resp.status_code < 400:
+                    return resp.json()
+                if last or not _should_retry(resp):
+                    try:
+                        err = resp.json().get("error") or {}
+                    except ValueError:
+                        err = {}
+                    raise StripeError(err.get("message") or f"Stripe error {resp.status_code}", resp.status_code, err.get("code"))
+            # full jitter keeps retrying workers from stampeding together
+            await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+        raise StripeError("Stripe request failed")
+
+    async def create_checkout_session(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.request("POST", "/v1/checkout/sessions", params)
+
+    async def retrieve_checkout_session(self, session_id: str) -> Dict[str, Any]:
+        if not SESSION_ID.fullmatch(session_id or ""):
+            raise StripeError("Invalid checkout session id", 400)
+        return await self.request("GET", f"/v1/checkout/sessions/{quote(session_id, safe='')}")
+
+    async def close(self):
+        if self._own_http is not None and not self._own_http.is_closed:
+            await self._own_http.aclose()
+
+
+def get_stripe_client() -> StripeClient:
+    global _STRIPE_CLIENT
+    if _STRIPE_CLIENT is None:
+        _STRIPE_CLIENT = StripeClient()
+    return _STRIPE_CLIENT
+
+
+async def close_stripe_client():
+    global _STRIPE_CLIENT
+    client, _STRIPE_CLIENT = _STRIPE_CLIENT, None
+    if client is not None:
+        await client.close()
 
 
 async def create_checkout_session(amount_inr_paise: int, customer_ref: str) -> Dict[str, Any]:
-    if not STRIPE_SECRET_KEY:
-        raise RuntimeError("Missing STRIPE_SECRET_KEY")
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        mode="payment",
-        line_items=[{
+    session = await get_stripe_client().create_checkout_session({
+        "payment_method_types": ["card"],
+        "mode": "payment",
+        "line_items": [{
             "price_data": {
                 "currency": "inr",
                 "product_data": {"name": "FinAura Credit"},
@@ -26,19 +183,31 @@ async def create_checkout_session(amount_inr_paise: int, customer_ref: str) -> D
             },
             "quantity": 1,
         }],
-        metadata={"userId": customer_ref},
-        success_url=STRIPE_SUCCESS_URL + "&session_id={CHECKOUT_SESSION_ID}",
-        cancel_url=STRIPE_CANCEL_URL,
-    )
-    return {"id": session.id, "url": session.url}
-
-
-def verify_webhook(signature_header: str, payload: bytes) -> Dict[str, Any]:
-    if not STRIPE_WEBHOOK_SECRET:
-        raise RuntimeError("Missing STRIPE_WEBHOOK_SECRET")
-    event = stripe.Webhook.construct_event(
-        payload=payload,
-        sig_header=signature_header,
-        secret=STRIPE_WEBHOOK_SECRET,
-    )
-    return event
+        "metadata": {"userId": customer_ref},
+        "success_url": STRIPE_SUCCESS_URL + "&session_id={CHECKOUT_SESSION_ID}",
+        "cancel_url": STRIPE_CANCEL_URL,
+    })
+    return {"id": session.get("id"), "url": session.get("url")}
+
+
+async def retrieve_checkout_session(session_id: str) -> Dict[str, Any]:
+    return await get_stripe_client().retrieve_checkout_session(session_id)
+
+
+def verify_webhook(signature_header: str, payload: bytes, secret: Optional[str] = None, now: Optional[float] = None) -> Dict[str, Any]:
+    secret = secret if secret is not None else STRIPE_WEBHOOK_SECRET
+    if not secret:
+        # a server-side misconfiguration: 503 so Stripe retries the delivery later
+        raise StripeError("Missing STRIPE_WEBHOOK_SECRET", 503)
+    parts = [p.split("=", 1) for p in (signature_header or "").split(",") if "=" in p]
+    timestamps = [v for k, v in parts if k.strip() == "t"]
+    signatures = [v for k, v in parts if k.strip() == "v1"]
+    if not timestamps or not timestamps[0].isdigit() or not signatures:
+        raise StripeError("Invalid signature header", 400)
+    ts = int(timestamps[0])
+    expected = hmac.new(secret.encode("utf-8"), f"{ts}.".encode("utf-8") + payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, s) for s in signatures):
+        raise StripeError("Signature mismatch", 400)
+    if abs((now or time.time()) - ts) > WEBHOOK_TOLERANCE:
+        raise StripeError("Timestamp outside tolerance", 400)
+    return json.loads(payload)
@@ -1,34 +1,244 @@
+"""Realtime event bus behind the notification SSE stream.
+
+Subscribers get a bounded queue. When a client falls behind, the queue
+applies REALTIME_POLICY:
+
+- `drop_oldest` discards the oldest queued event (the default),
+- `drop_new` discards the incoming event,
+- `coalesce` empties the queue and leaves a single `{"event": "resync"}`
+  marker so the client refetches instead of replaying a backlog.
+
+Every event a subscriber never receives counts towards `dropped`,
+including the ones a coalesce discards from the queue.
+
+REALTIME_BACKEND selects how events reach other workers:
+
+- `memory` only fans out inside this process,
+- `mongo` also appends every event to the capped `realtime_events`
+  collection and tails it, so a subscriber on any worker receives it.
+  Tailable cursors work on standalone servers, unlike change streams.
+  `start()` creates the collection capped before anything is written to
+  it; if it already exists uncapped, sharing stays off and an error is
+  logged, since tailing an ordinary collection can never work.
+
+Env: REALTIME_BACKEND, REALTIME_QUEUE_SIZE, REALTIME_POLICY,
+REALTIME_CAPPED_BYTES.
+"""
+
+from __future__ import annotations
+
 import asyncio
-from typing import Dict, Set
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
 
+from .env import env_int
 
-_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+logger = logging.getLogger(__name__)
 
+COL = "realtime_events"
+POLICIES = ("drop_oldest", "drop_new", "coalesce")
+RESYNC = "resync"
 
-def subscribe(user_id: str) -> asyncio.Queue:
-    q: asyncio.Queue = asyncio.Queue()
-    _subscribers.setdefault(user_id, set()).add(q)
-    return q
+_BUS: Optional["RealtimeBus"] = None
 
 
-def unsubscribe(user_id: str, q: asyncio.Queue):
-    try:
-        subs = _subscribers.get(user_id)
+class EventQueue(asyncio.Queue):
+    """Bounded subscriber queue that never blocks the publisher."""
+
+    def __init__(self, maxsize: int, policy: str):
+        super().__init__(maxsize=maxsize)
+        self.policy = policy
+        self.dropped = 0
+
+    def offer(self, event: dict) -> bool:
+        """Enqueue `event` according to the overflow policy; False if it was not queued."""
+        if not self.full():
+            self.put_nowait(event)
+            return True
+        self.dropped += 1
+        if self.policy == "drop_new":
+            return False
+        if self.policy == "coalesce":
+            while not self.empty():
+                if self.get_nowait().get("event") != RESYNC:
+                    self.dropped += 1
+            self.put_nowait({"event": RESYNC, "dropped": self.dropped})
+            return False
+        self.get_nowait()
+        self.put_nowait(event)
+        return True
+
+
+class RealtimeBus:
+    def __init__(self, *, backend: str = "memory", queue_size: int = 100, policy: str = "drop_oldest", capped_bytes: int = 16 * 1024 * 1024):
+        self.backend = backend if backend in ("memory", "mongo") else "memory"
+        self.queue_size = max(1, queue_size)
+        self.policy = policy if policy in POLICIES else "drop_oldest"
+        self.capped_bytes = capped_bytes
+        self.origin = uuid.uuid4().hex
+        self._subscribers: Dict[str, Set[EventQueue]] = {}
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._totals = {"published": 0, "delivered": 0, "dropped": 0, "remote": 0, "failed": 0}
+        self._tail_task: Optional[asyncio.Task] = None
+        # set by start() once `realtime_events` is known to be capped
+        self._shared = False
+
+    # --- subscribers -----------------------------------------------------
+
+    def subscribe(self, user_id: str) -> EventQueue:
+        q = EventQueue(self.queue_size, self.policy)
+        self._subscribers.setdefault(user_id, set()).add(q)
+        self._metrics.setdefault(user_id, {"published": 0, "delivered": 0, "dropped": 0})
+        return q
+
+    def unsubscribe(self, user_id: str, q: asyncio.Queue):
+        subs = self._subscribers.get(user_id)
         if subs and q in subs:
             subs.remove(q)
             if not subs:
-                _subscribers.pop(user_id, None)
+                self._subscribers.pop(user_id, None)
+                self._metrics.pop(user_id, None)
+
+    def deliver(self, user_id: str, event: dict) -> int:
+        """Fan `event` out to this process's subscribers of `user_id`."""
+        subs = self._subscribers.get(user_id)
+        if not subs:
+            return 0
+        m = self._metrics.setdefault(user_id, {"published": 0, "delivered": 0, "dropped": 0})
+        delivered = 0
+        for q in list(subs):
+            before = q.dropped
+            if q.offer(event):
+                delivered += 1
+            m["dropped"] += q.dropped - before
+            self._totals["dropped"] += q.dropped - before
+        m["delivered"] += delivered
+        self._totals["delivered"] += delivered
+        return delivered
+
+    # --- publishing ------------------------------------------------------
+
+    async def publish(self, user_id: str, event: dict):
+        self._totals["published"] += 1
+        if user_id in self._metrics:
+            self._metrics[user_id]["published"] += 1
+        self.deliver(user_id, event)
+        if self._shared:
+            from .dbConnect import get_db
+            try:
+                db = await get_db()
+                await db[COL].insert_one({"userId": user_id, "event": event, "origin": self.origin, "ts": datetime.utcnow()})
+            except Exception as e:
+                # local subscribers already have it; only other workers miss out
+                self._totals["failed"] += 1
+                logger.warning("realtime publish for %s not shared with other workers: %s", user_id, e)
+
+    # --- cross-process tail --------------------------------------------
+
+    async def _ensure_capped(self, db) -> bool:
+        """Create `realtime_events` capped; False if it can't be tailed."""
+        try:
+            await db.create_collection(COL, capped=True, size=self.capped_bytes)
+            return True
+        except Exception as e:
+            created_error = e  # usually another worker (or an earlier run) created it
+        try:
+            capped = bool((await db[COL].options()).get("capped"))
+        except Exception as e:
+            logger.error("realtime: cannot create or inspect %s (%s; %s); events stay on this worker", COL, created_error, e)
+            return False
+        if not capped:
+            logger.error(
+                "realtime: %s exists but is not capped, so it cannot be tailed; events stay on this worker. "
+                "Drop it (or run convertToCapped) and restart.", COL,
+            )
+        return capped
+
+    async def _tail(self):
+        from pymongo import CursorType
+
+        from .dbConnect import get_db
+        db = await get_db()
+        last = await db[COL].find_one(sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+        while True:
+            try:
+                flt = {"_id": {"$gt": last_id}} if last_id is not None else {}
+                cursor = db[COL].find(flt, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        last_id = doc["_id"]
+                        if doc.get("origin") == self.origin:
+                            continue
+                        self._totals["remote"] += 1
+                        self.deliver(str(doc.get("userId")), doc.get("event") or {})
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("realtime tail failed, retrying: %s", e)
+            # An empty capped collection yields a dead cursor; back off and re-open
+            await asyncio.sleep(1.0)
+
+    async def start(self):
+        if self.backend == "mongo" and self._tail_task is None:
+            from .dbConnect import get_db
+            # before any publish writes to it, or a plain collection would be created
+            self._shared = await self._ensure_capped(await get_db())
+            if self._shared:
+                self._tail_task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        self._shared = False
+        task, self._tail_task = self._tail_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "shared": self._shared,
+            "policy": self.policy,
+            "queueSize": self.queue_size,
+            **self._totals,
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "users": {
+                uid: {**m, "subscribers": len(self._subscribers.get(uid, ())), "queued": sum(q.qsize() for q in self._subscribers.get(uid, ()))}
+                for uid, m in self._metrics.items()
+            },
+        }
+
+
+def get_bus() -> RealtimeBus:
+    """Return the per-process realtime bus configured from env."""
+    global _BUS
+    if _BUS is None:
+        _BUS = RealtimeBus(
+            backend=os.getenv("REALTIME_BACKEND", "memory").lower(),
+            queue_size=env_int("REALTIME_QUEUE_SIZE", 100),
+            policy=os.getenv("REALTIME_POLICY", "drop_oldest").lower(),
+            capped_bytes=env_int("REALTIME_CAPPED_BYTES", 16 * 1024 * 1024),
+        )
+    return _BUS
+
+
+def subscribe(user_id: str) -> EventQueue:
+    return get_bus().subscribe(user_id)
+
+
+def unsubscribe(user_id: str, q: asyncio.Queue):
+    try:
+        get_bus().unsubscribe(user_id, q)
     except Exception:
         pass
 
 
 async def publish(user_id: str, event: dict):
-    subs = _subscribers.get(user_id)
-    if not subs:
-        return
-    for q in list(subs):
-        try:
-            await q.put(event)
-        except Exception:
-            # drop broken queue
-            unsubscribe(user_id, q)
+    await get_bus().publish(user_id, event)
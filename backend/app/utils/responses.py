@@ -0,0 +1,44 @@
+"""orjson-backed JSON responses.
+
+`ORJSONResponse` is the app's default response class. orjson writes
+`datetime`s, numpy scalars and non-string dict keys natively; `ObjectId`,
+pydantic models, `Decimal` and sets go through `_default`. List routes return
+it directly with the raw Mongo documents, skipping FastAPI's
+`jsonable_encoder` pass and the per-document copy made by `serialize_doc`.
+`_id` comes out as its hex string either way.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+from .lazy import lazy_import
+
+orjson = lazy_import("orjson")
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
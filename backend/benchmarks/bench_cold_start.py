@@ -0,0 +1,125 @@
+"""Cold start: how long until a fresh worker answers `/health`.
+
+Each run spawns `uvicorn app.main:app` on a free port and polls `/health`
+every 5 ms until it returns 200. It reports the wall time from spawn to that
+first healthy response, along with the `import app.main` time measured by
+`-X importtime` in a separate interpreter.
+
+Startup waits for the unique indexes (`UNIQUE_COLLECTIONS` in
+`app/utils/indexes.py`), so a reachable mongod is required. Without one the
+worker would sit in the driver's server selection timeout and the numbers
+would measure that. The run uses its own `finaura_bench_cold` database on
+`--mongo-uri` (no database name) and drops it afterwards.
+
+    python -m benchmarks.bench_cold_start --mongo-uri mongodb://localhost:27017 --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DB_NAME = "finaura_bench_cold"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time_ms() -> float:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    m = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app\.main$", proc.stderr, re.M)
+    return int(m.group(1)) / 1000 if m else float("nan")
+
+
+def check_mongo(uri: str):
+    """Fail fast, instead of timing the driver's 30 s server selection."""
+    from pymongo import MongoClient
+    from pymongo.errors import ConfigurationError, PyMongoError
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=2000)
+    try:
+        try:
+            client.get_default_database()
+            raise SystemExit("--mongo-uri must not name a database; the run uses its own")
+        except ConfigurationError:
+            pass
+        client.admin.command("ping")
+    except PyMongoError as e:
+        raise SystemExit(f"MongoDB at {uri} is not reachable ({e}); startup needs it for the unique indexes")
+    finally:
+        client.close()
+
+
+def drop_bench_db(uri: str):
+    from pymongo import MongoClient
+
+    with MongoClient(uri, serverSelectionTimeoutMS=2000) as client:
+        client.drop_database(DB_NAME)
+
+
+def time_to_healthy(mongo_uri: str, timeout: float = 30.0) -> float:
+    port = _free_port()
+    env = {**os.environ, "MONGO_URI": mongo_uri, "MONGO_DB_NAME": DB_NAME}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as r:
+                    if r.status == 200:
+                        return (time.perf_counter() - t0) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.005)
+        raise TimeoutError("no healthy response")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--mongo-uri", default="mongodb://localhost:27017", help="local mongod, without a database name")
+    args = ap.parse_args()
+    check_mongo(args.mongo_uri)
+    imports = [import_time_ms() for _ in range(args.runs)]
+    try:
+        healthy = [time_to_healthy(args.mongo_uri) for _ in range(args.runs)]
+    finally:
+        drop_bench_db(args.mongo_uri)
+    print(json.dumps({
+        "runs": args.runs,
+        "importAppMainMs": {"median": round(statistics.median(imports), 1), "min": round(min(imports), 1)},
+        "timeToHealthyMs": {"median": round(statistics.median(healthy), 1), "min": round(min(healthy), 1), "max": round(max(healthy), 1)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""End-to-end latency, throughput and DB round trips per route family.
+
+Boots `app.main:app` under uvicorn inside this process and drives it over
+real HTTP. Mongo is either a local mongod (`--mongo-uri`, without a database
+name; the run uses a throwaway `finaura_bench_<id>` database and drops it
+afterwards) or an in-memory mongomock-motor database, the default. Gemini and
+Longcat point at `app/tests/llm_stub.py`, served the same way, with
+configurable latency and streaming.
+
+Seeded users get `--seed-expenses` expenses, six months of income and a goal.
+Each scenario then runs `--requests` requests at `--concurrency`, spread over
+those users, and reports:
+
+- p50/p95/p99/mean latency and throughput;
+- `ttfbP50Ms`/`ttfbP95Ms` for the streams (first delta for chat, event
+  delivery after the POST for notifications);
+- DB round trips per request: every command the server sent while handling
+  it, including tasks it spawned. This is counted with a pymongo
+  CommandListener against mongod. Under mongomock every collection call and
+  cursor counts once, whatever its size.
+
+The client, server and stub share one event loop, so absolute numbers include
+client overhead. Compare runs made the same way. `--compare` exits non-zero
+when a scenario's p95 grows by more than `--tolerance`, or when its DB round
+trips per request go up:
+
+    python -m benchmarks.bench_e2e --requests 200 --concurrency 10 --out bench.json
+    python -m benchmarks.bench_e2e --only ai.chat,ai.chat_stream --llm-latency-ms 300 --llm-chunk-delay-ms 20
+    python -m benchmarks.bench_e2e --mongo-uri mongodb://localhost:27017 --compare bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import uvicorn
+from pymongo import monitoring
+
+from app.main import app as api_app
+from app.services import ledger_rollups
+from app.tests import llm_stub
+from app.utils import dbConnect
+from app.utils.metrics import command_listener
+
+OP_HEADER = "x-bench-op"
+CATEGORIES = ["Food", "Rent", "Travel", "Shopping", "Bills", "Health"]
+
+_trips: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("bench_trips", default=None)
+
+
+def _count_trip():
+    box = _trips.get()
+    if box is not None:
+        box[0] += 1
+
+
+class RoundTripListener(monitoring.CommandListener):
+    """Counts commands against the request that issued them.
+
+    Motor runs pymongo in a thread pool but copies the caller's context, so
+    `_trips` still points at the request's counter here.
+    """
+
+    def started(self, event):
+        _count_trip()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _count_mongomock_calls():
+    """mongomock sends no command events; count collection calls instead."""
+    import mongomock_motor
+
+    col = mongomock_motor.AsyncMongoMockCollection
+
+    def counted(fn):
+        def wrapper(*args, **kwargs):
+            _count_trip()
+            return fn(*args, **kwargs)
+        return wrapper
+
+    for name in ("find_one", "insert_one", "insert_many", "update_one", "update_many", "delete_one",
+                 "delete_many", "replace_one", "bulk_write", "count_documents", "distinct",
+                 "find_one_and_update", "find_one_and_delete", "find_one_and_replace", "find", "aggregate"):
+        setattr(col, name, counted(getattr(col, name)))
+
+
+class TripCountingApp:
+    """ASGI wrapper that gives every tagged request its own round-trip counter."""
+
+    def __init__(self, app):
+        self.app = app
+        self.trips: Dict[str, List[int]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        op = dict(scope["headers"]).get(OP_HEADER.encode(), b"").decode() or None
+        box = [0]
+        token = _trips.set(box)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _trips.reset(token)
+            if op:
+                self.trips.setdefault(op, []).append(box[0])
+
+
+async def serve(app) -> tuple:
+    """Run `app` under uvicorn on a free local port; returns (server, task, base_url)."""
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="auto")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+async def stop(server, task):
+    server.should_exit = True
+    await task
+
+
+@dataclass
+class User:
+    email: str
+    password: str
+    headers: dict
+    token: str
+    etag: Optional[str] = None
+
+
+async def seed(client: httpx.AsyncClient, db, n_users: int, n_expenses: int, run_id: str) -> List[User]:
+    rng = random.Random(0)
+    today = date.today()
+    users = []
+    for i in range(n_users):
+        email = f"bench-{run_id}-{i}@example.com"
+        creds = {"email": email, "password": "bench-password"}
+        r = await client.post("/api/auth/signup", json={"name": f"Bench {i}", **creds})
+        r.raise_for_status()
+        user_id = r.json()["_id"]
+        token = (await client.post("/api/auth/login", json=creds)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        expenses = [{
+            "userId": user_id,
+            "category": rng.choice(CATEGORIES),
+            "amount": round(rng.uniform(50, 3000), 2),
+            "date": (today - timedelta(days=rng.randint(0, 180))).isoformat(),
+            "note": f"seed {j}",
+            "paymentMethod": "Card",
+        } for j in range(n_expenses)]
+        income = [{"userId": user_id, "source": "Salary", "amount": 60000.0, "date": (today - timedelta(days=30 * m)).isoformat()} for m in range(6)]
+        if expenses:
+            await db["expenses"].insert_many(expenses)
+            await ledger_rollups.record_many(db, user_id, "expense", expenses)
+        await db["income"].insert_many(income)
+        await ledger_rollups.record_many(db, user_id, "income", income)
+        goal = {"name": "Emergency fund", "targetAmount": 200000, "targetDate": f"{today.year + 2}-01"}
+        (await client.post("/api/goals", json=goal, headers=headers)).raise_for_status()
+        users.append(User(email, creds["password"], headers, token))
+    return users
+
+
+# Each scenario returns the time to first byte of interest (streams) or None.
+Scenario = Callable[[httpx.AsyncClient, User, int, dict], Awaitable[Optional[float]]]
+
+
+def _ok(r: httpx.Response, *codes: int):
+    if r.status_code not in (codes or (200,)):
+        raise RuntimeError(f"{r.request.method} {r.request.url.path}: HTTP {r.status_code}")
+
+
+async def auth_login(client, user, i, tag):
+    _ok(await client.post("/api/auth/login", json={"email": user.email, "password": user.password}, headers=tag))
+
+
+async def auth_profile(client, user, i, tag):
+    _ok(await client.get("/api/auth/profile", headers={**user.headers, **tag}))
+
+
+async def expenses_create(client, user, i, tag):
+    body = {"category": CATEGORIES[i % len(CATEGORIES)], "amount": 100 + i % 900, "date": date.today().isoformat(), "note": f"bench {i}"}
+    _ok(await client.post("/api/expenses", json=body, headers={**user.headers, **tag}))
+
+
+async def expenses_list(client, user, i, tag):
+    _ok(await client.get("/api/expenses", params={"limit": 50}, headers={**user.headers, **tag}))
+
+
+async def goals_list(client, user, i, tag):
+    _ok(await client.get("/api/goals", headers={**user.headers, **tag}))
+
+
+async def goals_progress(client, user, i, tag):
+    r = await client.get("/api/goals/progress", headers={**user.headers, **tag})
+    _ok(r)
+    user.etag = r.headers.get("etag")
+
+
+async def goals_progress_revalidate(client, user, i, tag):
+    headers = {**user.headers, **tag}
+    if user.etag:
+        headers["If-None-Match"] = user.etag
+    r = await client.get("/api/goals/progress", headers=headers)
+    _ok(r, 200, 304)
+    user.etag = r.headers.get("etag")
+
+
+async def ai_chat(client, user, i, tag):
+    # distinct questions, so every request misses the LLM response cache
+    r = await client.get("/api/ai/chat", params={"q": f"How can I save more this month? ({i})"}, headers={**user.headers, **tag})
+    _ok(r)
+    if not r.json().get("ok"):
+        raise RuntimeError(r.json().get("reply"))
+
+
+async def ai_chat_stream(client, user, i, tag):
+    t0 = time.perf_counter()
+    first = None
+    params = {"q": f"How can I save more this month? (stream {i})", "token": user.token}
+    async with client.stream("GET", "/api/ai/chat/stream", params=params, headers=tag) as r:
+        _ok(r)
+        async for line in r.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if "error" in event:
+                raise RuntimeError(event["error"])
+            if first is None and "delta" in event:
+                first = time.perf_counter() - t0
+            if event.get("done"):
+                break
+    return first
+
+
+async def ai_suggestions(client, user, i, tag):
+    _ok(await client.get("/api/ai/suggestions", headers={**user.headers, **tag}))
+
+
+async def notifications_list(client, user, i, tag):
+    _ok(await client.get("/api/notifications", headers={**user.headers, **tag}))
+
+
+async def notifications_sse(client, user, i, tag):
+    """Open the SSE feed, post a notification, and time its delivery."""
+    marker = uuid.uuid4().hex
+    async with client.stream("GET", "/api/notifications/sse", params={"token": user.token}) as r:
+        _ok(r)
+        lines = r.aiter_lines()
+        t0 = time.perf_counter()
+        _ok(await client.post("/api/notifications", json={"type": "bench", "title": marker, "text": "ping"}, headers={**user.headers, **tag}))
+        async for line in lines:
+            if line.startswith("data: ") and marker in line:
+                return time.perf_counter() - t0
+    raise RuntimeError("notification stream closed before the event arrived")
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "auth.login": auth_login,
+    "auth.profile": auth_profile,
+    "expenses.create": expenses_create,
+    "expenses.list": expenses_list,
+    "goals.list": goals_list,
+    "goals.progress": goals_progress,
+    "goals.progress_304": goals_progress_revalidate,
+    "ai.chat": ai_chat,
+    "ai.chat_stream": ai_chat_stream,
+    "ai.suggestions": ai_suggestions,
+    "notifications.list": notifications_list,
+    "notifications.sse": notifications_sse,
+}
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 2)
+
+
+async def run_scenario(client, name: str, fn: Scenario, users: List[User], requests: int, concurrency: int, warmup: int, counter: TripCountingApp) -> dict:
+    for i in range(warmup):
+        try:
+            await fn(client, users[i % len(users)], -1 - i, {OP_HEADER: "warmup"})
+        except Exception:
+            pass
+    latencies: List[float] = []
+    ttfbs: List[float] = []
+    errors: List[str] = []
+    pending = iter(range(requests))
+    tag = {OP_HEADER: name}
+
+    async def worker():
+        for i in pending:
+            t0 = time.perf_counter()
+            try:
+                first = await fn(client, users[i % len(users)], i, tag)
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - t0)
+            if first is not None:
+                ttfbs.append(first)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    trips = counter.trips.pop(name, [])
+    out = {
+        "requests": requests,
+        "errors": len(errors),
+        "p50Ms": _ms(percentile(latencies, 50)),
+        "p95Ms": _ms(percentile(latencies, 95)),
+        "p99Ms": _ms(percentile(latencies, 99)),
+        "meanMs": _ms(sum(latencies) / len(latencies)) if latencies else None,
+        "throughputRps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "dbRoundTrips": round(sum(trips) / len(trips), 2) if trips else 0,
+        "dbRoundTripsMax": max(trips, default=0),
+    }
+    if ttfbs:
+        out["ttfbP50Ms"] = _ms(percentile(ttfbs, 50))
+        out["ttfbP95Ms"] = _ms(percentile(ttfbs, 95))
+    if errors:
+        out["firstError"] = errors[0]
+    return out
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of `results` against a previous run's JSON."""
+    problems = []
+    for name, now in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if now["errors"] > before.get("errors", 0):
+            problems.append(f"{name}: errors {before.get('errors', 0)} -> {now['errors']}")
+        if before.get("p95Ms") and now["p95Ms"] and now["p95Ms"] > before["p95Ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {before['p95Ms']} ms -> {now['p95Ms']} ms")
+        if now["dbRoundTrips"] > before.get("dbRoundTrips", 0):
+            problems.append(f"{name}: DB round trips {before.get('dbRoundTrips', 0)} -> {now['dbRoundTrips']}")
+    return problems
+
+
+async def main_async(args) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    if args.mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from pymongo.errors import ConfigurationError
+
+        # keep the app's own listener too, so /metrics works during a run
+        client = AsyncIOMotorClient(args.mongo_uri, event_listeners=[RoundTripListener(), command_listener()])
+        try:
+            client.get_default_database()
+            raise SystemExit("--mongo-uri must not name a database; the run creates its own")
+        except ConfigurationError:
+            pass
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        _count_mongomock_calls()
+        client = AsyncMongoMockClient()
+    os.environ["MONGO_DB_NAME"] = f"finaura_bench_{run_id}"
+    dbConnect._MONGO_CLIENT = client
+    db = await dbConnect.get_db()
+
+    llm_stub.app.state.latency_ms = args.llm_latency_ms
+    llm_stub.app.state.chunks = args.llm_chunks
+    llm_stub.app.state.chunk_delay_ms = args.llm_chunk_delay_ms
+    stub_server, stub_task, stub_url = await serve(llm_stub.app)
+    for provider in ("GEMINI", "LONGCAT"):
+        os.environ[f"{provider}_BASE_URL"] = stub_url
+        os.environ[f"{provider}_API_KEY"] = "bench"
+
+    counter = TripCountingApp(api_app)
+    api_server, api_task, api_url = await serve(counter)
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(unknown)}")
+    results = {
+        "config": {
+            "mongo": "mongod" if args.mongo_uri else "mongomock",
+            "users": args.users,
+            "seedExpenses": args.seed_expenses,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llmLatencyMs": args.llm_latency_ms,
+            "llmChunks": args.llm_chunks,
+            "llmChunkDelayMs": args.llm_chunk_delay_ms,
+        },
+        "scenarios": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency * 2 + 4)
+    try:
+        async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=60) as http:
+            users = await seed(http, db, args.users, args.seed_expenses, run_id)
+            for name in names:
+                results["scenarios"][name] = await run_scenario(
+                    http, name, SCENARIOS[name], users, args.requests, args.concurrency, args.warmup, counter
+                )
+                print(f"{name}: {results['scenarios'][name]}", file=sys.stderr)
+    finally:
+        await stop(api_server, api_task)
+        await stop(stub_server, stub_task)
+        if args.mongo_uri:
+            await client.drop_database(os.environ["MONGO_DB_NAME"])
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mongo-uri", help="local mongod, without a database name (default: in-memory mongomock)")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--seed-expenses", type=int, default=200, help="expenses per seeded user")
+    ap.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--warmup", type=int, default=5, help="unrecorded requests before each scenario")
+    ap.add_argument("--only", help="comma-separated scenarios: " + ", ".join(SCENARIOS))
+    ap.add_argument("--llm-latency-ms", type=float, default=50.0, help="stub delay before the first byte")
+    ap.add_argument("--llm-chunks", type=int, default=8, help="pieces per streamed reply")
+    ap.add_argument("--llm-chunk-delay-ms", type=float, default=10.0)
+    ap.add_argument("--out", help="also write the JSON report here")
+    ap.add_argument("--compare", help="previous report; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth for --compare")
+    args = ap.parse_args()
+
+    results = asyncio.run(main_async(args))
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
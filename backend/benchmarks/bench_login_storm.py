@@ -0,0 +1,81 @@
+"""Event-loop lag during a burst of bcrypt password checks.
+
+A ticker task sleeps for 1 ms in a loop and records how late it wakes up,
+which is what every other request on the worker (including SSE streams)
+experiences. The storm runs N concurrent logins two ways:
+
+- inline:  `bcrypt.checkpw` called directly in the coroutine (the old login)
+- pool:    `utils.passwords.verify_password` (thread pool + semaphore)
+
+No database is needed:
+
+    python -m benchmarks.bench_login_storm --logins 50 --rounds 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import bcrypt
+
+from app.utils import passwords
+
+
+async def _ticker(lags: list, stop: asyncio.Event, interval: float = 0.001):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - t0 - interval) * 1000)
+
+
+async def _inline_login(password: str, hashed: str):
+    bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+async def _pool_login(password: str, hashed: str):
+    await passwords.verify_password(password, hashed)
+
+
+async def storm(login, logins: int, password: str, hashed: str) -> dict:
+    lags: list = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    await asyncio.sleep(0.01)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(login(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await ticker
+    lags.sort()
+    return {
+        "logins": logins,
+        "wallSeconds": round(elapsed, 3),
+        "loginsPerSecond": round(logins / elapsed, 1),
+        "lagP50Ms": round(statistics.median(lags), 2),
+        "lagP99Ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 2),
+        "lagMaxMs": round(lags[-1], 2),
+    }
+
+
+async def main(logins: int, rounds: int):
+    password = "correct horse battery staple"
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+    results = {
+        "rounds": rounds,
+        "workers": passwords.WORKERS,
+        "inline": await storm(_inline_login, logins, password, hashed),
+        "pool": await storm(_pool_login, logins, password, hashed),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.rounds))
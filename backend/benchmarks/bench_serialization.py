@@ -0,0 +1,94 @@
+"""Rendering a large list response: old path vs the orjson response layer.
+
+The old path is what a list route did before: `serialize_doc` on every
+document, FastAPI's `jsonable_encoder`, then `JSONResponse` (stdlib json).
+The new path hands the raw Mongo documents to `ORJSONResponse`. Documents
+look like `expenses` rows, with an ObjectId `_id` and a datetime field.
+Compression timings are for the rendered body at the default levels.
+
+    python -m benchmarks.bench_serialization --docs 10000 --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.compression import CompressionMiddleware, brotli
+from app.utils.responses import ORJSONResponse
+from app.utils.serialization import serialize_doc
+
+CATEGORIES = ["Food", "Rent", "Travel", "Shopping", "Bills", "Health"]
+
+
+def make_docs(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    t0 = datetime(2024, 1, 1)
+    docs = []
+    for i in range(n):
+        when = t0 + timedelta(minutes=rng.randint(0, 600000))
+        docs.append({
+            "_id": ObjectId(),
+            "userId": "507f1f77bcf86cd799439011",
+            "category": rng.choice(CATEGORIES),
+            "amount": round(rng.uniform(10, 5000), 2),
+            "date": when.strftime("%Y-%m-%d"),
+            "note": f"entry {i}",
+            "paymentMethod": rng.choice(["Card", "UPI", "Wallet", None]),
+            "createdAt": when,
+        })
+    return docs
+
+
+def old_path(docs: list) -> bytes:
+    return JSONResponse(jsonable_encoder([serialize_doc(d) for d in docs])).body
+
+
+def new_path(docs: list) -> bytes:
+    return ORJSONResponse(docs).body
+
+
+def timed(fn, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(runs), 2)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    docs = make_docs(args.docs)
+    old_body, new_body = old_path(docs), new_path(docs)
+    assert json.loads(old_body) == json.loads(new_body), "renderers disagree"
+    mw = CompressionMiddleware(app=None)
+    out = {
+        "docs": args.docs,
+        "bodyBytes": len(new_body),
+        "oldPathMs": timed(lambda: old_path(docs), args.repeat),
+        "orjsonMs": timed(lambda: new_path(docs), args.repeat),
+        "gzipMs": timed(lambda: mw.compress(new_body, "gzip"), args.repeat),
+        "gzipBytes": len(gzip.compress(new_body, compresslevel=mw.gzip_level)),
+    }
+    out["speedup"] = round(out["oldPathMs"] / out["orjsonMs"], 1)
+    if brotli is not None:
+        out["brotliMs"] = timed(lambda: mw.compress(new_body, "br"), args.repeat)
+        out["brotliBytes"] = len(mw.compress(new_body, "br"))
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compare Python-loop ledger aggregation against the server-side pipelines.
+
+Seeds a throwaway database with N transactions for one synthetic user and
+times three ways of producing the monthly/category summary:
+
+- python:  stream every income/expense doc with `async for` and sum in Python
+           (what compute_goal_progress and ai_suggestions used to do)
+- pipeline: `ledger_queries.raw_summary` ($unionWith + $facet, one round trip)
+- rollups:  `ledger_rollups.summary` over the pre-aggregated buckets
+
+Needs a running MongoDB:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.ledger_aggregation --sizes 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services import ledger_queries, ledger_rollups
+from app.services.ledger_rollups import month_key
+
+USER = "bench-user"
+CATEGORIES = ["Food", "Rent", "Travel", "Shopping", "Utilities", "Health", "Fun", "Other"]
+
+
+async def python_summary(db, user_id: str) -> dict:
+    out = ledger_queries.empty_summary()
+    async for inc in db["income"].find({"userId": user_id}):
+        k = month_key(inc.get("date", ""))
+        out["incomeByMonth"][k] = out["incomeByMonth"].get(k, 0.0) + float(inc.get("amount") or 0)
+        s = inc.get("source") or "Other"
+        out["incomeBySource"][s] = out["incomeBySource"].get(s, 0.0) + float(inc.get("amount") or 0)
+    async for exp in db["expenses"].find({"userId": user_id}):
+        k = month_key(exp.get("date", ""))
+        out["expenseByMonth"][k] = out["expenseByMonth"].get(k, 0.0) + float(exp.get("amount") or 0)
+        c = exp.get("category") or "Other"
+        out["expenseByCategory"][c] = out["expenseByCategory"].get(c, 0.0) + float(exp.get("amount") or 0)
+    out["totalIncome"] = sum(out["incomeByMonth"].values())
+    out["totalExpense"] = sum(out["expenseByMonth"].values())
+    return out
+
+
+async def seed(db, n: int):
+    await db["expenses"].delete_many({"userId": USER})
+    await db["income"].delete_many({"userId": USER})
+    rnd = random.Random(n)
+    n_income = max(1, n // 10)
+    def date():
+        return f"{rnd.randint(2019, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+    expenses = [
+        {"userId": USER, "category": rnd.choice(CATEGORIES), "amount": round(rnd.uniform(10, 5000), 2), "date": date()}
+        for _ in range(n - n_income)
+    ]
+    income = [{"userId": USER, "source": "Salary", "amount": 50000.0, "date": date()} for _ in range(n_income)]
+    for i in range(0, len(expenses), 10000):
+        await db["expenses"].insert_many(expenses[i:i + 10000])
+    await db["income"].insert_many(income)
+    await db["expenses"].create_index([("userId", 1), ("date", 1)])
+    await db["income"].create_index([("userId", 1), ("date", 1)])
+    await ledger_rollups.rebuild(db, USER)
+
+
+async def timeit(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="finaura_bench")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    db = client[args.db]
+    results = []
+    for n in args.sizes:
+        await seed(db, n)
+        py = await python_summary(db, USER)
+        pipe = await ledger_queries.raw_summary(db, USER)
+        assert abs(py["totalExpense"] - pipe["totalExpense"]) < 1e-3 * max(1.0, py["totalExpense"])
+        results.append({
+            "transactions": n,
+            "python": await timeit(lambda: python_summary(db, USER), args.repeat),
+            "pipeline": await timeit(lambda: ledger_queries.raw_summary(db, USER), args.repeat),
+            "rollups": await timeit(lambda: ledger_rollups.summary(db, USER), args.repeat),
+        })
+    await client.drop_database(args.db)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -19,7 +19,7 @@ import Sidebar from './components/Sidebar'
 import ErrorBoundary from './components/ErrorBoundary'
 import AssistantWidget from './components/AssistantWidget'
 import NotificationPanel from './components/NotificationPanel'
-import { useEffect } from 'react'
+import { useEffect, useRef } from 'react'
 import { useNotifications } from './context/NotificationContext'
 import api from './utils/api'
 
@@ -31,7 +31,10 @@ function PrivateRoute({ children }) {
 export default function App() {
   // Setup SSE for real-time notifications once per app mount
   function SSEBridge() {
-    const { addAlert } = useNotifications() || { addAlert: ()=>{} }
+    const { addAlert, reload } = useNotifications() || { addAlert: ()=>{}, reload: ()=>{} }
+    // the stream is opened once; read the current reload (it changes with the user)
+    const reloadRef = useRef(reload)
+    reloadRef.current = reload
     useEffect(() => {
       let es
       try {
@@ -48,6 +51,11 @@ export default function App() {
             if (typeof window.__refreshSuggestions === 'function') window.__refreshSuggestions()
           } catch {}
         }
+        // Server dropped queued events for this client; refetch instead of replaying them
+        es.addEventListener('resync', () => {
+          reloadRef.current()
+          if (typeof window.__refreshSuggestions === 'function') window.__refreshSuggestions()
+        })
       } catch {}
       return () => { try { es && es.close() } catch {} }
     }, [])
@@ -1,6 +1,6 @@
 import { useEffect, useMemo, useRef, useState } from 'react'
 import { AnimatePresence, motion } from 'framer-motion'
-import api from '../utils/api'
+import { streamChat } from '../utils/api'
 import { useAuth } from '../context/AuthContext'
 
 export default function AssistantWidget() {
@@ -24,12 +24,17 @@ export default function AssistantWidget() {
     const q = text.trim()
     setMsgs(m => [...m, { role:'user', content:q, ts: Date.now() }])
     setInput(''); setBusy(true)
+    // The reply streams into its own message, found again by ts
+    const ts = Date.now()
+    const edit = (fn) => setMsgs(m => m.map(x => (x.role === 'assistant' && x.ts === ts ? fn(x) : x)))
+    setMsgs(m => [...m, { role:'assistant', content:'', ts }])
     try {
-      const { data } = await api.get('/api/ai/chat', { params: { q, model } })
-      const answer = data.reply || data.final_answer || JSON.stringify(data)
-      setMsgs(m => [...m, { role:'assistant', content:answer, ts: Date.now() }])
+      await streamChat(q, model, {
+        onDelta: (d) => edit(x => ({ ...x, content: x.content + d })),
+        onReplace: (text) => edit(x => ({ ...x, content: text })),
+      })
     } catch (e) {
-      setMsgs(m => [...m, { role:'assistant', content:'Sorry, I could not process that right now.', ts: Date.now(), error: true }])
+      edit(x => ({ ...x, content: 'Sorry, I could not process that right now.', error: true }))
     } finally {
       setBusy(false)
     }
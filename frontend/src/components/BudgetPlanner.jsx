@@ -1,19 +1,16 @@
 import { useEffect, useMemo, useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import api from '../utils/api'
+import usePagedList from '../utils/usePagedList'
 
 export default function BudgetPlanner() {
-  const [budgets, setBudgets] = useState([])
+  const { items: budgets, hasMore, loading, reload: load, loadMore } = usePagedList('/api/budget')
   const [showModal, setShowModal] = useState(false)
   const [editing, setEditing] = useState(null)
   const [form, setForm] = useState({ month: '', limit: '' })
   const [saving, setSaving] = useState(false)
 
-  const load = async () => {
-    const { data } = await api.get('/api/budget')
-    setBudgets(data)
-  }
-  useEffect(() => { load() }, [])
+  useEffect(() => { load() }, [load])
 
   const openAdd = () => {
     setEditing(null)
@@ -112,6 +109,12 @@ export default function BudgetPlanner() {
         })}
       </div>
 
+      {hasMore && (
+        <div className="flex justify-center">
+          <button className="btn-secondary" onClick={loadMore} disabled={loading}>{loading ? 'Loading...' : 'Load more'}</button>
+        </div>
+      )}
+
       {/* Modal */}
       <AnimatePresence>
         {showModal && (
@@ -1,4 +1,4 @@
-import { createContext, useContext, useEffect, useMemo, useState } from 'react'
+import { createContext, useCallback, useContext, useEffect, useMemo, useState } from 'react'
 import api from '../utils/api'
 import { useAuth } from './AuthContext'
 
@@ -11,28 +11,32 @@ export function NotificationProvider({ children }) {
   const [alerts, setAlerts] = useState(initialAlerts)
   const { user } = useAuth() || {}
 
+  // Fetch the user's notifications and replace the store; also used after an
+  // SSE `resync`, when the server dropped events instead of delivering them
+  const fetchAlerts = useCallback(async () => {
+    if (!user) return []
+    try {
+      const { data } = await api.get('/api/notifications').catch(() => ({ data: [] }))
+      return Array.isArray(data) ? data.map(n => ({
+        id: n.id || n._id || String(n.id || n._id || Date.now()),
+        ts: n.ts,
+        type: n.type,
+        title: n.title,
+        text: n.text,
+        read: !!n.read,
+      })) : []
+    } catch {
+      return []
+    }
+  }, [user])
+  const reload = useCallback(async () => setAlerts(await fetchAlerts()), [fetchAlerts])
+
   // Load notifications per-user from backend if available
   useEffect(() => {
     let cancelled = false
-    const load = async () => {
-      if (!user) { setAlerts([]); return }
-      try {
-        const { data } = await api.get('/api/notifications').catch(() => ({ data: [] }))
-        if (!cancelled) setAlerts(Array.isArray(data) ? data.map(n => ({
-          id: n.id || n._id || String(n.id || n._id || Date.now()),
-          ts: n.ts,
-          type: n.type,
-          title: n.title,
-          text: n.text,
-          read: !!n.read,
-        })) : [])
-      } catch {
-        if (!cancelled) setAlerts([])
-      }
-    }
-    load()
+    fetchAlerts().then(list => { if (!cancelled) setAlerts(list) })
     return () => { cancelled = true }
-  }, [user])
+  }, [fetchAlerts])
 
   const unreadCount = useMemo(() => alerts.filter(a=>!a.read).length, [alerts])
 
@@ -40,7 +44,7 @@ export function NotificationProvider({ children }) {
   const clearAll = () => setAlerts([])
   const addAlert = (alert) => setAlerts(list => [{ id: alert.id || alert._id || String(Date.now()), read: false, ...alert }, ...list])
 
-  const value = { open, setOpen, toggle: ()=>setOpen(v=>!v), alerts, setAlerts, markRead, clearAll, addAlert, unreadCount }
+  const value = { open, setOpen, toggle: ()=>setOpen(v=>!v), alerts, setAlerts, reload, markRead, clearAll, addAlert, unreadCount }
   return <NotificationCtx.Provider value={value}>{children}</NotificationCtx.Provider>
 }
 
@@ -10,6 +10,7 @@ import GoalPlannerCore from '../components/GoalPlannerCore'
 import GoalProgressCard from '../components/GoalProgressCard'
 import SmartSuggestions from '../components/SmartSuggestions'
 import api from '../utils/api'
+import { breakdown, monthlySeries } from '../utils/summary'
 import { motion } from 'framer-motion'
 import { useNotifications } from '../context/NotificationContext'
 import {
@@ -26,9 +27,8 @@ import {
 } from 'recharts'
 
 export default function Dashboard() {
-  const [expenses, setExpenses] = useState([])
-  const [income, setIncome] = useState([])
-  const [investments, setInvestments] = useState([])
+  // Totals and chart series are aggregated server-side (/api/summary)
+  const [summary, setSummary] = useState(null)
   const [wallet, setWallet] = useState(0)
   // Removed AI Assistant state variables
   const [tab, setTab] = useState('expenses')
@@ -41,17 +41,13 @@ export default function Dashboard() {
   const { addAlert } = useNotifications() || { addAlert: ()=>{} }
 
   const load = async () => {
-    const [e, i, inv, gList, gActive, prof] = await Promise.all([
-      api.get('/api/expenses'),
-      api.get('/api/income'),
-      api.get('/api/investment'),
+    const [sum, gList, gActive, prof] = await Promise.all([
+      api.get('/api/summary'),
       api.get('/api/goals').catch(()=>({ data: [] })),
       api.get('/api/goals/active').catch(()=>({ data: null })),
       api.get('/api/auth/profile')
     ])
-    setExpenses(e.data)
-    setIncome(i.data)
-    setInvestments(inv.data)
+    setSummary(sum.data)
     setGoals(Array.isArray(gList.data) ? gList.data : [])
     setGoal(gActive.data)
     setWallet(Number(prof.data?.walletBalance||0))
@@ -79,78 +75,35 @@ export default function Dashboard() {
 
   // After data loads, generate useful notifications (client-side heuristic)
   useEffect(() => {
-    if (!income.length && !expenses.length) return
-    const totalExpenses = expenses.reduce((s, x) => s + (x.amount||0), 0)
-    const totalIncome = income.reduce((s, x) => s + (x.amount||0), 0)
+    if (!summary || (!summary.totalIncome && !summary.totalExpense)) return
+    const totalExpenses = Number(summary.totalExpense) || 0
+    const totalIncome = Number(summary.totalIncome) || 0
     const net = totalIncome - totalExpenses
     if (net < 0) {
       addAlert({ type: 'critical', title: 'You are overspending', text: `Overspent by ₹${Math.abs(net).toLocaleString()}`, ts: new Date().toISOString() })
     }
     // Category overspend (naive): if any single category > 40% of income
-    const catSums = expenses.reduce((m, e)=>{ const k=e.category||'Other'; m[k]=(m[k]||0)+(e.amount||0); return m }, {})
-    const top = Object.entries(catSums).sort((a,b)=>b[1]-a[1])[0]
+    const top = Object.entries(summary.expenseByCategory || {}).sort((a,b)=>b[1]-a[1])[0]
     if (top && totalIncome>0 && top[1] > 0.4 * totalIncome) {
       addAlert({ type: 'expense', title: `High spend on ${top[0]}`, text: `₹${Math.round(top[1]).toLocaleString()} this period`, ts: new Date().toISOString() })
     }
   // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [income, expenses])
+  }, [summary])
 
-  const totalExpenses = expenses.reduce((s, x) => s + (x.amount||0), 0)
-  const totalIncome = income.reduce((s, x) => s + (x.amount||0), 0)
+  const totalExpenses = Number(summary?.totalExpense) || 0
+  const totalIncome = Number(summary?.totalIncome) || 0
   const savings = totalIncome - totalExpenses
 
-  const weightedAvgRoi = useMemo(() => {
-    const totAmt = investments.reduce((s, x) => s + (Number(x.amount)||0), 0)
-    if (!totAmt) return 0
-    const numer = investments.reduce((s, x) => s + (Number(x.amount)||0) * (Number(x.roi)||0), 0)
-    return (numer / totAmt) * 100
-  }, [investments])
-
-  // Helpers to group by YYYY-MM
-  const ym = (d) => {
-    if (!d) return 'Unknown'
-    const dt = new Date(d)
-    if (isNaN(dt)) return 'Unknown'
-    return `${dt.getFullYear()}-${String(dt.getMonth()+1).padStart(2,'0')}`
-  }
+  const weightedAvgRoi = (Number(summary?.investments?.weightedRoi) || 0) * 100
 
   // Monthly income vs expense
-  const monthlyData = useMemo(() => {
-    const map = new Map()
-    income.forEach(i => {
-      const k = ym(i.date)
-      const obj = map.get(k) || { month: k, income: 0, expenses: 0 }
-      obj.income += Number(i.amount)||0
-      map.set(k, obj)
-    })
-    expenses.forEach(e => {
-      const k = ym(e.date)
-      const obj = map.get(k) || { month: k, income: 0, expenses: 0 }
-      obj.expenses += Number(e.amount)||0
-      map.set(k, obj)
-    })
-    return [...map.values()].sort((a,b)=>a.month.localeCompare(b.month))
-  }, [income, expenses])
+  const monthlyData = useMemo(() => monthlySeries(summary), [summary])
 
   // Expense breakdown by category (all-time)
-  const categoryData = useMemo(() => {
-    const cat = new Map()
-    expenses.forEach(e => {
-      const k = e.category || 'Other'
-      cat.set(k, (cat.get(k)||0) + (Number(e.amount)||0))
-    })
-    return [...cat.entries()].map(([name, value]) => ({ name, value }))
-  }, [expenses])
+  const categoryData = useMemo(() => breakdown(summary?.expenseByCategory), [summary])
 
   // Investments by type (amount)
-  const investTypeData = useMemo(() => {
-    const map = new Map()
-    investments.forEach(inv => {
-      const k = inv.type || 'Other'
-      map.set(k, (map.get(k)||0) + (Number(inv.amount)||0))
-    })
-    return [...map.entries()].map(([name, value]) => ({ name, value }))
-  }, [investments])
+  const investTypeData = useMemo(() => breakdown(summary?.investments?.byType), [summary])
 
   const container = { hidden: { opacity: 0 }, show: { opacity: 1, transition: { staggerChildren: 0.08 } } }
   const item = { hidden: { opacity: 0, y: -8 }, show: { opacity: 1, y: 0, transition: { duration: 0.4 } } }
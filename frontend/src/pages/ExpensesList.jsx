@@ -1,12 +1,13 @@
 import { useEffect, useMemo, useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import api from '../utils/api'
+import usePagedList from '../utils/usePagedList'
 
 const categories = ['Food', 'Rent', 'Transport', 'Bills', 'Shopping', 'Health', 'Entertainment', 'Other']
 const methods = ['UPI', 'Card', 'Cash', 'NetBanking', 'Wallet']
 
 export default function ExpensesList() {
-  const [items, setItems] = useState([])
+  const { items, hasMore, loading, reload: load, loadMore } = usePagedList('/api/expenses')
   const [q, setQ] = useState('')
   const [cat, setCat] = useState('')
   const [from, setFrom] = useState('')
@@ -15,11 +16,7 @@ export default function ExpensesList() {
   const [editing, setEditing] = useState(null) // record being edited
   const [form, setForm] = useState({ category: '', amount: '', date: '', note: '', paymentMethod: 'UPI' })
 
-  const load = async () => {
-    const { data } = await api.get('/api/expenses')
-    setItems(data)
-  }
-  useEffect(()=>{ load() }, [])
+  useEffect(()=>{ load() }, [load])
 
   const cats = useMemo(()=> Array.from(new Set(items.map(i=>i.category).filter(Boolean))).sort(), [items])
 
@@ -134,10 +131,16 @@ export default function ExpensesList() {
 
       {/* Summary Footer */}
       <div className="flex items-center justify-between text-sm text-slate-400">
-        <div>{filtered.length} entries</div>
+        <div>{filtered.length} entries{hasMore ? ' loaded' : ''}</div>
         <div>Total: <span className="text-red-400">-₹{total.toLocaleString()}</span></div>
       </div>
 
+      {hasMore && (
+        <div className="flex justify-center">
+          <button className="btn-secondary" onClick={loadMore} disabled={loading}>{loading ? 'Loading...' : 'Load more'}</button>
+        </div>
+      )}
+
       {/* Edit Modal */}
       <AnimatePresence>
         {editing && (
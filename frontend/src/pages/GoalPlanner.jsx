@@ -1,52 +1,31 @@
 import { useEffect, useMemo, useState } from 'react'
 import GoalPlannerCore from '../components/GoalPlannerCore'
 import api from '../utils/api'
+import { monthlySeries } from '../utils/summary'
 
 export default function GoalPlannerPage({ monthlyData: incomingMonthly }) {
   const [goals, setGoals] = useState([])
   const [goal, setGoal] = useState(null)
-  const [expenses, setExpenses] = useState([])
-  const [income, setIncome] = useState([])
+  const [summary, setSummary] = useState(null)
 
   useEffect(() => {
     const load = async () => {
       try {
-        const [e, i, gList, gActive] = await Promise.all([
-          api.get('/api/expenses'),
-          api.get('/api/income'),
+        const [sum, gList, gActive] = await Promise.all([
+          api.get('/api/summary'),
           api.get('/api/goals').catch(()=>({ data: [] })),
           api.get('/api/goals/active').catch(()=>({ data: null })),
         ])
-        setExpenses(e.data); setIncome(i.data); setGoals(Array.isArray(gList.data)?gList.data:[]); setGoal(gActive.data)
+        setSummary(sum.data); setGoals(Array.isArray(gList.data)?gList.data:[]); setGoal(gActive.data)
       } catch {}
     }
     load()
   }, [])
 
-  // Accept monthlyData via props or try to reconstruct minimal from local cache (fallback none)
-  const ym = (d) => {
-    if (!d) return 'Unknown'
-    const dt = new Date(d)
-    if (isNaN(dt)) return 'Unknown'
-    return `${dt.getFullYear()}-${String(dt.getMonth()+1).padStart(2,'0')}`
-  }
-  const monthlyData = useMemo(() => {
-    if (incomingMonthly && incomingMonthly.length) return incomingMonthly
-    const map = new Map()
-    income.forEach(i => {
-      const k = ym(i.date)
-      const obj = map.get(k) || { month: k, income: 0, expenses: 0 }
-      obj.income += Number(i.amount)||0
-      map.set(k, obj)
-    })
-    expenses.forEach(e => {
-      const k = ym(e.date)
-      const obj = map.get(k) || { month: k, income: 0, expenses: 0 }
-      obj.expenses += Number(e.amount)||0
-      map.set(k, obj)
-    })
-    return [...map.values()].sort((a,b)=>a.month.localeCompare(b.month))
-  }, [incomingMonthly, income, expenses])
+  // Prefer monthlyData passed in by the caller, else the server-side summary
+  const monthlyData = useMemo(() => (
+    incomingMonthly && incomingMonthly.length ? incomingMonthly : monthlySeries(summary)
+  ), [incomingMonthly, summary])
 
   return (
     <div className="space-y-4">
@@ -1,9 +1,10 @@
 import { useEffect, useMemo, useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import api from '../utils/api'
+import usePagedList from '../utils/usePagedList'
 
 export default function IncomeList() {
-  const [items, setItems] = useState([])
+  const { items, hasMore, loading, reload: load, loadMore } = usePagedList('/api/income')
   const [q, setQ] = useState('')
   const [from, setFrom] = useState('')
   const [to, setTo] = useState('')
@@ -11,11 +12,7 @@ export default function IncomeList() {
   const [editing, setEditing] = useState(null)
   const [form, setForm] = useState({ source: 'Salary', amount: '', date: '' })
 
-  const load = async () => {
-    const { data } = await api.get('/api/income')
-    setItems(data)
-  }
-  useEffect(()=>{ load() }, [])
+  useEffect(()=>{ load() }, [load])
 
   const filtered = useMemo(()=>{
     let rows = [...items]
@@ -119,10 +116,16 @@ export default function IncomeList() {
 
       {/* Summary */}
       <div className="flex items-center justify-between text-sm text-slate-400">
-        <div>{filtered.length} entries</div>
+        <div>{filtered.length} entries{hasMore ? ' loaded' : ''}</div>
         <div>Total: <span className="text-emerald-400">₹{total.toLocaleString()}</span></div>
       </div>
 
+      {hasMore && (
+        <div className="flex justify-center">
+          <button className="btn-secondary" onClick={loadMore} disabled={loading}>{loading ? 'Loading...' : 'Load more'}</button>
+        </div>
+      )}
+
       {/* Edit Modal */}
       <AnimatePresence>
         {editing && (
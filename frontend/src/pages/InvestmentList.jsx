@@ -1,9 +1,10 @@
 import { useEffect, useMemo, useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import api from '../utils/api'
+import usePagedList from '../utils/usePagedList'
 
 export default function InvestmentList() {
-  const [items, setItems] = useState([])
+  const { items, hasMore, loading, reload: load, loadMore } = usePagedList('/api/investment')
   const [type, setType] = useState('')
   const [from, setFrom] = useState('')
   const [to, setTo] = useState('')
@@ -12,11 +13,7 @@ export default function InvestmentList() {
   const [editing, setEditing] = useState(null)
   const [form, setForm] = useState({ type: 'Stock', amount: '', roi: '0', date: '', riskLevel: 'Medium' })
 
-  const load = async () => {
-    const { data } = await api.get('/api/investment')
-    setItems(data)
-  }
-  useEffect(()=>{ load() }, [])
+  useEffect(()=>{ load() }, [load])
 
   const types = useMemo(()=> Array.from(new Set(items.map(i=>i.type).filter(Boolean))).sort(), [items])
 
@@ -135,10 +132,16 @@ export default function InvestmentList() {
       </div>
 
       <div className="flex items-center justify-between text-sm text-slate-400">
-        <div>{filtered.length} entries</div>
+        <div>{filtered.length} entries{hasMore ? ' loaded' : ''}</div>
         <div>Total Invested: <span className="text-slate-200">₹{total.toLocaleString()}</span></div>
       </div>
 
+      {hasMore && (
+        <div className="flex justify-center">
+          <button className="btn-secondary" onClick={loadMore} disabled={loading}>{loading ? 'Loading...' : 'Load more'}</button>
+        </div>
+      )}
+
       {/* Edit Modal */}
       <AnimatePresence>
         {editing && (
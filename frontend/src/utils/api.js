@@ -30,3 +30,33 @@ api.interceptors.response.use(
     return Promise.reject(err)
   }
 )
+
+// List endpoints (/api/expenses, /api/income, /api/investment, /api/budget) are
+// paginated newest first. Fetches one page and resolves to `{ data, next }`;
+// pass `next` back as `after` for the following page (null on the last one).
+// Totals and charts come from /api/summary instead of walking every page.
+export async function getPage(path, { after, limit = 100, ...params } = {}) {
+  const res = await api.get(path, { params: { ...params, limit, ...(after ? { after } : {}) } })
+  return { data: res.data, next: res.headers['x-next-cursor'] || null }
+}
+
+// Streams an assistant reply from /api/ai/chat/stream. EventSource can't set
+// headers, so the token goes in the query string. `onDelta` gets each chunk;
+// `onReplace` gets the text that replaces everything so far when the server's
+// guard trips. Resolves on `done`, rejects on `error` or a dropped connection.
+export function streamChat(q, model, { onDelta, onReplace }) {
+  return new Promise((resolve, reject) => {
+    const token = localStorage.getItem('access_token') || ''
+    const params = new URLSearchParams({ q, model, token })
+    const es = new EventSource(`${api.defaults.baseURL || ''}/api/ai/chat/stream?${params}`)
+    es.onmessage = (e) => {
+      let data
+      try { data = JSON.parse(e.data) } catch { return }
+      if (data.delta) onDelta(data.delta)
+      if (typeof data.replace === 'string') onReplace(data.replace)
+      if (data.done) { es.close(); resolve() }
+      if (data.error) { es.close(); reject(new Error(data.error)) }
+    }
+    es.onerror = () => { es.close(); reject(new Error('stream closed')) }
+  })
+}
@@ -0,0 +1,16 @@
+// Chart rows from the /api/summary response: [{ month, income, expenses }],
+// oldest month first.
+export function monthlySeries(summary) {
+  const map = new Map()
+  const add = (byMonth, key) => Object.entries(byMonth || {}).forEach(([month, value]) => {
+    const row = map.get(month) || { month, income: 0, expenses: 0 }
+    row[key] += Number(value) || 0
+    map.set(month, row)
+  })
+  add(summary?.incomeByMonth, 'income')
+  add(summary?.expenseByMonth, 'expenses')
+  return [...map.values()].sort((a, b) => a.month.localeCompare(b.month))
+}
+
+// [{ name, value }] bars from a `{ name: amount }` breakdown
+export const breakdown = (byName) => Object.entries(byName || {}).map(([name, value]) => ({ name, value: Number(value) || 0 }))
@@ -0,0 +1,33 @@
+import { useCallback, useState } from 'react'
+import { getPage } from './api'
+
+// State for a paginated list: `reload` fetches the first page, `loadMore`
+// appends the next one while `hasMore`.
+export default function usePagedList(path, limit = 100) {
+  const [items, setItems] = useState([])
+  const [next, setNext] = useState(null)
+  const [loading, setLoading] = useState(false)
+
+  const reload = useCallback(async () => {
+    setLoading(true)
+    try {
+      const page = await getPage(path, { limit })
+      setItems(page.data); setNext(page.next)
+    } finally {
+      setLoading(false)
+    }
+  }, [path, limit])
+
+  const loadMore = useCallback(async () => {
+    if (!next) return
+    setLoading(true)
+    try {
+      const page = await getPage(path, { limit, after: next })
+      setItems(prev => [...prev, ...page.data]); setNext(page.next)
+    } finally {
+      setLoading(false)
+    }
+  }, [path, limit, next])
+
+  return { items, hasMore: !!next, loading, reload, loadMore }
+}